@@ -107,6 +107,28 @@ except Exception as err:
     db = None
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': env('CACHE_LOCATION', default='redis://localhost:6379/1'),
+        'KEY_PREFIX': 'hw_project',
+    },
+}
+
+# Scrape jobs, run by `manage.py run_scrape_worker`
+
+SCRAPE_WORKER_CONCURRENCY = env.int('SCRAPE_WORKER_CONCURRENCY', default=2)
+SCRAPE_WORKER_POLL_INTERVAL = env.float('SCRAPE_WORKER_POLL_INTERVAL', default=2.0)
+# Seconds between heartbeats of a running job, and without one before the job is taken from its worker.
+SCRAPE_JOB_HEARTBEAT = env.float('SCRAPE_JOB_HEARTBEAT', default=30.0)
+SCRAPE_JOB_STALE_AFTER = env.float('SCRAPE_JOB_STALE_AFTER', default=300.0)
+# Hours between scheduled re-scrapes of a site, see `manage.py refresh_scrapes`.
+SCRAPE_REFRESH_INTERVAL = env.float('SCRAPE_REFRESH_INTERVAL', default=24.0)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Quote, Tag
+from .models import Quote, ScrapedPage, ScrapeJob, Tag
 
 # Register your models here.
 admin.site.register(Quote)
-admin.site.register(Tag)
\ No newline at end of file
+admin.site.register(Tag)
+admin.site.register(ScrapeJob)
+admin.site.register(ScrapedPage)
\ No newline at end of file
@@ -0,0 +1,129 @@
+import hashlib
+import time
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+PAGE_TTL = 600
+PROXY_MAX_AGE = 30
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.05
+LOCK_WAIT_STEPS = 20
+
+# Every cached page and fragment key carries the versions of the scopes it
+# was built from, so invalidation is a version bump and old entries simply
+# expire. A version is the time of the last change in nanoseconds, which
+# also serves as Last-Modified. Scopes:
+#   quotes       - the quote list and the tag sidebar
+#   author:<id>  - an author page
+#   tag:<name>   - a tag page
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def tag_scope(tag_name):
+    # Tag names may contain characters that are not safe in cache keys.
+    return f'tag:{hashlib.md5(tag_name.encode()).hexdigest()}'
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(*scopes):
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A version that fell out of the cache restarts from the clock,
+            # never from a number an older entry may have been built with.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return {scope: versions[key] for scope, key in zip(scopes, keys)}
+
+
+def invalidate(*scopes):
+    cache.set_many({version_key(scope): time.time_ns() for scope in scopes}, timeout=None)
+
+
+def invalidate_on_commit(*scopes):
+    # After commit, so a reader cannot cache the old rows under the new version.
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+def cache_anonymous_page(request, versions, render):
+    # Whole pages are shared only between anonymous visitors without pending
+    # flash messages; everyone else gets a fresh render built from fragments.
+    if request.method != 'GET' or request.user.is_authenticated or len(get_messages(request)):
+        return render()
+
+    key = 'page:{}:{}'.format(request.get_full_path(), ':'.join(str(version) for version in versions.values()))
+    stale_key = f'page:{request.get_full_path()}:stale'
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content)
+
+    # Only one request renders a missing page; the others get the previous
+    # version while it is rebuilt, or wait for the new one.
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            response = render()
+            if response.status_code == 200:
+                cache.set_many({key: response.content, stale_key: response.content}, PAGE_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    stale = cache.get(stale_key)
+    if stale is not None:
+        response = HttpResponse(stale)
+        response.stale = True
+        return response
+    for _ in range(LOCK_WAIT_STEPS):
+        time.sleep(LOCK_WAIT)
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+    return render()
+
+
+def conditional_page(request, versions, render):
+    # The validators come from the versions alone, so a revalidation is
+    # answered with 304 before any query or template rendering.
+    if request.method != 'GET' or len(get_messages(request)):
+        return cache_anonymous_page(request, versions, render)
+
+    anonymous = not request.user.is_authenticated
+    # A logged-in page carries the user's CSRF token, which changes with the session.
+    viewer = 'anonymous' if anonymous else request.session.session_key
+    digest = hashlib.md5(f'{viewer}:{sorted(versions.items())}'.encode()).hexdigest()
+    etag = quote_etag(digest)
+    # If-Modified-Since cannot tell viewers apart, so only anonymous pages offer it.
+    last_modified = max(versions.values()) // 10 ** 9 if anonymous else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = cache_anonymous_page(request, versions, render)
+        if response.status_code != 200:
+            return response
+        if getattr(response, 'stale', False):
+            # The previous version must not be stored under the new validators.
+            add_never_cache_headers(response)
+            return response
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+
+    # Browsers always revalidate; a shared proxy may serve anonymous pages for a few seconds.
+    if anonymous:
+        patch_cache_control(response, public=True, max_age=0, s_maxage=PROXY_MAX_AGE, must_revalidate=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
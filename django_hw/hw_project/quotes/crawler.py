@@ -0,0 +1,257 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urldefrag, urlsplit
+
+import httpx
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import IngestResult, ingest
+from .models import ScrapedPage
+from .parsing import Page, parse_page
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'hw_project-quotes-crawler/1.0'
+CONCURRENCY = 8
+PER_HOST = 2
+DELAY = 0.25
+MAX_PAGES = 500
+TIMEOUT = 10
+BATCH_SIZE = 100
+
+DONE = object()
+
+
+class HostLimiter:
+    # Politeness: at most `concurrency` requests in flight per host, started
+    # at least `delay` seconds apart.
+
+    def __init__(self, concurrency, delay):
+        self.delay = delay
+        self._slots = defaultdict(lambda: asyncio.Semaphore(concurrency))
+        self._locks = defaultdict(asyncio.Lock)
+        self._next_start = defaultdict(float)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host):
+        loop = asyncio.get_running_loop()
+        async with self._slots[host]:
+            async with self._locks[host]:
+                wait = self._next_start[host] - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start[host] = loop.time() + self.delay
+            yield
+
+
+class Crawler:
+    # Follows "Next" pagination and author links from the start page, on the
+    # start page's host only. Pages are fetched by `concurrency` tasks over one
+    # pooled HTTP client and parsed in a process pool, so parsing does not
+    # stall the downloads. `known` maps URLs to the Page seen there last time:
+    # those are requested conditionally, and a 304 or an identical body is
+    # not parsed again.
+
+    def __init__(self, start_url, concurrency=CONCURRENCY, per_host=PER_HOST, delay=DELAY, max_pages=MAX_PAGES,
+                 timeout=TIMEOUT, parse_workers=None, known=None):
+        self.start_url = urldefrag(start_url).url
+        self.host = urlsplit(self.start_url).netloc
+        self.concurrency = concurrency
+        self.limiter = HostLimiter(per_host, delay)
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.parse_workers = parse_workers or min(4, os.cpu_count() or 1)
+        self.known = known or {}
+        self.fetched = 0
+        self.unchanged = 0
+        self.errors = []
+        self._loop = None
+        self._task = None
+
+    def follow(self, url):
+        parts = urlsplit(url)
+        return parts.scheme in ('http', 'https') and parts.netloc == self.host
+
+    async def fetch(self, client, url):
+        # Returns the page's validators and its body, or no body when the page
+        # has not changed since `known`.
+        known = self.known.get(url)
+        headers = {}
+        if known is not None:
+            if known.etag:
+                headers['If-None-Match'] = known.etag
+            if known.last_modified:
+                headers['If-Modified-Since'] = known.last_modified
+        try:
+            async with self.limiter.slot(urlsplit(url).netloc):
+                response = await client.get(url, headers=headers)
+        except httpx.HTTPError as err:
+            self.errors.append(f'{url}: {err!r}')
+            return None, None
+        if response.status_code == 304 and known is not None:
+            body_hash, html = known.body_hash, None
+        elif response.status_code == 200:
+            body_hash, html = hashlib.sha256(response.content).hexdigest(), response.text
+            if known is not None and known.body_hash == body_hash:
+                html = None
+        else:
+            self.errors.append(f'{url}: status code {response.status_code}')
+            return None, None
+        self.fetched += 1
+        page = Page(url, etag=response.headers.get('ETag', known.etag if known else ''),
+                    last_modified=response.headers.get('Last-Modified', known.last_modified if known else ''),
+                    body_hash=body_hash)
+        if html is None:
+            self.unchanged += 1
+            page.links, page.changed = known.links, False
+        return page, html
+
+    async def crawl(self, emit):
+        # emit(page) is called from the event loop for every parsed page.
+        self._loop, self._task = asyncio.get_running_loop(), asyncio.current_task()
+        pending = asyncio.Queue()
+        seen = {self.start_url}
+        pending.put_nowait(self.start_url)
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        # spawn: the pool is started from a thread, where fork is unsafe.
+        pool = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'))
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout, follow_redirects=True,
+                                     headers={'User-Agent': USER_AGENT}) as client:
+
+            async def work():
+                while True:
+                    url = await pending.get()
+                    try:
+                        page, html = await self.fetch(client, url)
+                        if page is None:
+                            continue
+                        if html is not None:
+                            parsed = await self._loop.run_in_executor(pool, parse_page, url, html)
+                            page.quotes, page.authors, page.links = parsed.quotes, parsed.authors, parsed.links
+                        for link in page.links:
+                            link = urldefrag(link).url
+                            if link not in seen and len(seen) < self.max_pages and self.follow(link):
+                                seen.add(link)
+                                pending.put_nowait(link)
+                        emit(page)
+                    except Exception as err:
+                        self.errors.append(f'{url}: {err!r}')
+                    finally:
+                        pending.task_done()
+
+            workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+            try:
+                await pending.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                pool.shutdown(cancel_futures=True)
+
+    def stop(self):
+        if self._loop is not None:
+            with contextlib.suppress(RuntimeError):  # the loop has already finished
+                self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+@dataclass
+class CrawlResult:
+    pages: int = 0
+    unchanged: int = 0
+    errors: list[str] = field(default_factory=list)
+    ingested: IngestResult = field(default_factory=IngestResult)
+
+    def __str__(self):
+        return f'{self.pages} pages ({self.unchanged} unchanged), {self.ingested}, {len(self.errors)} errors'
+
+
+def known_pages(host):
+    return {page.url: Page(page.url, links=page.links, etag=page.etag, last_modified=page.last_modified,
+                           body_hash=page.body_hash)
+            for page in ScrapedPage.objects.filter(host=host)}
+
+
+def record_pages(pages):
+    now = timezone.now()
+    rows = {True: [], False: []}
+    for page in pages:
+        rows[page.changed].append(ScrapedPage(
+            url=page.url, host=urlsplit(page.url).netloc, etag=page.etag, last_modified=page.last_modified,
+            body_hash=page.body_hash, links=page.links, checked_at=now, changed_at=now,
+        ))
+    update_fields = ['etag', 'last_modified', 'checked_at']
+    # An unchanged page keeps its hash, links and changed_at.
+    for changed, fields in ((True, update_fields + ['host', 'body_hash', 'links', 'changed_at']),
+                            (False, update_fields)):
+        if rows[changed]:
+            ScrapedPage.objects.bulk_create(rows[changed], update_conflicts=True, unique_fields=['url'],
+                                            update_fields=fields)
+
+
+def crawl(start_url, batch_size=BATCH_SIZE, progress=None, force=False, **options):
+    # The crawler runs its event loop in a thread and streams parsed pages
+    # back; they are ingested here, in batches, on the caller's database
+    # connection. progress(result) is called after every page. Pages seen
+    # before are only ingested when their content changed, unless `force`.
+    known = {} if force else known_pages(urlsplit(urldefrag(start_url).url).netloc)
+    crawler = Crawler(start_url, known=known, **options)
+    pages = queue.Queue()
+
+    def run():
+        try:
+            asyncio.run(crawler.crawl(pages.put))
+        except asyncio.CancelledError:
+            pass
+        except Exception as err:
+            logger.exception("Crawl of %s failed", start_url)
+            crawler.errors.append(repr(err))
+        finally:
+            pages.put(DONE)
+
+    thread = threading.Thread(target=run, name='quotes-crawler', daemon=True)
+    thread.start()
+
+    result = CrawlResult()
+    batch, rows = [], 0
+
+    def flush():
+        # A page is recorded together with its rows, so one that failed to
+        # ingest is parsed again next time.
+        with transaction.atomic():
+            result.ingested += ingest([quote for page in batch for quote in page.quotes],
+                                      [author for page in batch for author in page.authors])
+            record_pages(batch)
+        batch.clear()
+
+    try:
+        while (page := pages.get()) is not DONE:
+            batch.append(page)
+            rows += len(page.quotes) + len(page.authors)
+            if rows >= batch_size or len(batch) >= batch_size:
+                flush()
+                rows = 0
+            if progress is not None:
+                result.pages, result.unchanged, result.errors = crawler.fetched, crawler.unchanged, list(crawler.errors)
+                progress(result)
+        flush()
+    except BaseException:
+        crawler.stop()
+        raise
+    finally:
+        thread.join()
+
+    result.pages, result.unchanged, result.errors = crawler.fetched, crawler.unchanged, crawler.errors
+    if not result.pages and result.errors:
+        raise Exception(f'Failed to fetch data. {result.errors[0]}')
+    return result
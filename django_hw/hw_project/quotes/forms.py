@@ -1,5 +1,5 @@
 from django import forms
-from .models import Author, Quote, Tag
+from .models import Author, Quote, ScrapeJob, Tag, quote_hash
 
 
 class AuthorForm(forms.ModelForm):
@@ -29,4 +29,25 @@ class QuoteForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['author'].queryset = Author.objects.all()
-        self.fields['tags'].queryset = Tag.objects.all()
\ No newline at end of file
+        self.fields['tags'].queryset = Tag.objects.all()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        quote, author = cleaned_data.get('quote'), cleaned_data.get('author')
+        if quote and author:
+            duplicates = Quote.objects.filter(content_hash=quote_hash(quote), author=author).exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                self.add_error('quote', "This author already has this quote.")
+        return cleaned_data
+
+
+class ScrapeJobForm(forms.ModelForm):
+
+    class Meta:
+        model = ScrapeJob
+        fields = ['url', 'force']
+        labels = {'force': 'Re-parse pages that have not changed'}
+        widgets = {
+            'url': forms.URLInput(attrs={'class': 'form-control', 'placeholder': 'Enter the URL to scrape data from'}),
+            'force': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import author_scope, invalidate_on_commit, tag_scope
+from .models import Author, Quote, Tag, quote_hash
+from .pagination import COUNT_CACHE_KEY
+from .parsing import ParsedAuthor, ParsedQuote  # noqa
+
+AUTHOR_DETAILS = ('born_date', 'born_location', 'description')
+
+
+@dataclass
+class IngestResult:
+    authors: int = 0
+    tags: int = 0
+    quotes: int = 0
+
+    def __add__(self, other):
+        return IngestResult(self.authors + other.authors, self.tags + other.tags, self.quotes + other.quotes)
+
+    def __str__(self):
+        return f'{self.quotes} new quotes, {self.authors} new authors, {self.tags} new tags'
+
+
+def resolve_authors(authors):
+    # Returns fullname -> id, creating missing authors and filling in the
+    # details of existing ones that were created from a quote alone.
+    existing = {author.fullname: author for author in Author.objects.filter(fullname__in=authors)}
+    missing = [Author(fullname=name, **{key: getattr(parsed, key) for key in AUTHOR_DETAILS})
+               for name, parsed in authors.items() if name not in existing]
+    Author.objects.bulk_create(missing, ignore_conflicts=True)
+
+    completed = []
+    for name, author in existing.items():
+        parsed = authors[name]
+        if not author.description and parsed.description:
+            for key in AUTHOR_DETAILS:
+                setattr(author, key, getattr(parsed, key))
+            completed.append(author)
+    Author.objects.bulk_update(completed, AUTHOR_DETAILS)
+
+    if missing:
+        existing.update((author.fullname, author) for author in
+                        Author.objects.filter(fullname__in=[author.fullname for author in missing]))
+    invalidate_on_commit(*(author_scope(author.pk) for author in completed))
+    return {name: author.pk for name, author in existing.items()}, len(missing)
+
+
+def resolve_tags(names):
+    existing = dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+    missing = [Tag(name=name) for name in names if name not in existing]
+    Tag.objects.bulk_create(missing, ignore_conflicts=True)
+    if missing:
+        existing.update(Tag.objects.filter(name__in=[tag.name for tag in missing]).values_list('name', 'pk'))
+    return existing, len(missing)
+
+
+def resolve_quotes(quotes, author_ids):
+    # Returns (content hash, author id) -> quote id for every quote of the
+    # batch, and the keys of the quotes that were created. The lookup uses
+    # the (content_hash, author) unique index instead of comparing texts.
+    texts = {}
+    for parsed in quotes:
+        texts.setdefault((quote_hash(parsed.quote), author_ids[parsed.author]), parsed.quote)
+
+    def lookup(pairs):
+        rows = Quote.objects.filter(content_hash__in={content_hash for content_hash, _ in pairs},
+                                    author_id__in={author_id for _, author_id in pairs})
+        return {(content_hash, author_id): pk
+                for content_hash, author_id, pk in rows.values_list('content_hash', 'author_id', 'pk')
+                if (content_hash, author_id) in pairs}
+
+    existing = lookup(texts)
+    missing = texts.keys() - existing.keys()
+    Quote.objects.bulk_create([Quote(quote=texts[key], content_hash=key[0], author_id=key[1]) for key in missing],
+                              ignore_conflicts=True)
+    if missing:
+        existing.update(lookup(missing))
+    return existing, missing
+
+
+def ingest(quotes, authors=()):
+    # Saves a batch of parsed quotes in one transaction with a fixed number of
+    # queries: one IN lookup and one bulk insert per table, whatever the batch
+    # size. Bulk writes skip model signals, so tag counts and cached pages
+    # are updated here.
+    quotes = [parsed for parsed in quotes if parsed.quote and parsed.author]
+    author_details = {author.fullname: author for author in authors}
+    for parsed in quotes:
+        author_details.setdefault(parsed.author, ParsedAuthor(parsed.author))
+    if not author_details:
+        return IngestResult()
+
+    with transaction.atomic():
+        author_ids, new_authors = resolve_authors(author_details)
+        tag_ids, new_tags = resolve_tags({name for parsed in quotes for name in parsed.tags})
+        quote_ids, new_quotes = resolve_quotes(quotes, author_ids)
+
+        Through = Quote.tags.through
+        links = {(quote_ids[quote_hash(parsed.quote), author_ids[parsed.author]], tag_ids[name])
+                 for parsed in quotes for name in parsed.tags}
+        linked = set(Through.objects.filter(quote_id__in={quote_id for quote_id, _ in links})
+                     .values_list('quote_id', 'tag_id'))
+        new_links = links - linked
+        Through.objects.bulk_create([Through(quote_id=quote_id, tag_id=tag_id) for quote_id, tag_id in new_links],
+                                    ignore_conflicts=True)
+
+        changed_tags = {tag_id for _, tag_id in new_links}
+        if changed_tags:
+            Tag.rebuild_quote_counts(changed_tags)
+        if new_quotes or new_links:
+            tag_names = {tag_id: name for name, tag_id in tag_ids.items()}
+            cache.delete(COUNT_CACHE_KEY)
+            invalidate_on_commit('quotes', *(author_scope(author_id) for _, author_id in new_quotes),
+                                 *(tag_scope(tag_names[tag_id]) for tag_id in changed_tags))
+
+    return IngestResult(new_authors, new_tags, len(new_quotes))
@@ -0,0 +1,153 @@
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .crawler import crawl
+from .models import ScrapeJob
+
+logger = logging.getLogger(__name__)
+
+MAX_ERRORS = 50
+MAX_ATTEMPTS = 3
+
+
+def release_stale_jobs():
+    # A running job without a recent heartbeat belongs to a worker that died.
+    # It is queued again, or failed once it has used up its attempts, so it
+    # neither stays running forever nor holds back refreshes of its site.
+    now = timezone.now()
+    stale = ScrapeJob.objects.filter(status=ScrapeJob.Status.RUNNING,
+                                     heartbeat_at__lt=now - timedelta(seconds=settings.SCRAPE_JOB_STALE_AFTER))
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=ScrapeJob.Status.FAILED, finished_at=now, errors=['The worker running the job stopped responding'])
+    queued = stale.update(status=ScrapeJob.Status.QUEUED, worker='')
+    if failed or queued:
+        logger.warning("Released stale scrape jobs: %s queued again, %s failed", queued, failed)
+
+
+def claim_job(worker):
+    # SKIP LOCKED lets several workers take different jobs without waiting on each other.
+    release_stale_jobs()
+    with transaction.atomic():
+        job = (ScrapeJob.objects.select_for_update(skip_locked=True)
+               .filter(status=ScrapeJob.Status.QUEUED).order_by('created_at').first())
+        if job is None:
+            return None
+        job.status = ScrapeJob.Status.RUNNING
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'worker', 'attempts', 'started_at', 'heartbeat_at'])
+    return job
+
+
+@contextmanager
+def heartbeat(jobs, interval):
+    # Touches heartbeat_at every `interval` seconds from a thread of its own,
+    # so a page that takes long to fetch or ingest does not look like a dead worker.
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                try:
+                    jobs.update(heartbeat_at=timezone.now())
+                except Exception:
+                    logger.exception("Scrape job heartbeat failed")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name='scrape-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(job):
+    # Once the job was released as stale this attempt no longer matches, and its updates are dropped.
+    jobs = ScrapeJob.objects.filter(pk=job.pk, status=ScrapeJob.Status.RUNNING, attempts=job.attempts)
+
+    def progress(result):
+        jobs.update(pages_fetched=result.pages, pages_unchanged=result.unchanged, quotes_inserted=result.ingested.quotes,
+                    authors_inserted=result.ingested.authors, tags_inserted=result.ingested.tags,
+                    errors=result.errors[:MAX_ERRORS])
+
+    logger.info("Scraping %s (job %s)", job.url, job.pk)
+    try:
+        with heartbeat(jobs, settings.SCRAPE_JOB_HEARTBEAT):
+            result = crawl(job.url, progress=progress, force=job.force)
+    except Exception as err:
+        logger.exception("Scrape job %s failed", job.pk)
+        jobs.update(status=ScrapeJob.Status.FAILED, finished_at=timezone.now(), errors=[str(err)])
+        return
+    progress(result)
+    jobs.update(status=ScrapeJob.Status.DONE, finished_at=timezone.now())
+    logger.info("Scrape job %s finished: %s", job.pk, result)
+
+
+def queue_refreshes(interval):
+    # Queues an incremental re-scrape of every site scraped successfully
+    # before, unless one is pending or was queued within `interval`. Pages
+    # are fetched conditionally, so only changed ones are parsed and ingested.
+    release_stale_jobs()
+    recent = ScrapeJob.objects.filter(Q(created_at__gte=timezone.now() - interval)
+                                      | Q(status__in=[ScrapeJob.Status.QUEUED, ScrapeJob.Status.RUNNING]))
+    urls = (ScrapeJob.objects.filter(status=ScrapeJob.Status.DONE).exclude(url__in=recent.values('url'))
+            .order_by('url').values_list('url', flat=True).distinct())
+    return ScrapeJob.objects.bulk_create([ScrapeJob(url=url) for url in urls])
+
+
+def run_next_job(worker):
+    job = claim_job(worker)
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+class Worker:
+    # Runs scrape jobs in `concurrency` threads, each with its own database
+    # connection. Started by the run_scrape_worker command, outside the web
+    # processes.
+
+    def __init__(self, concurrency, poll_interval):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f'{socket.gethostname()}-{os.getpid()}'
+        self._stop = threading.Event()
+
+    def loop(self, name, once):
+        while not self._stop.is_set():
+            try:
+                worked = run_next_job(name)
+            except Exception:
+                logger.exception("Scrape worker %s failed to run a job", name)
+                worked = False
+            finally:
+                close_old_connections()
+            if not worked:
+                if once:
+                    return
+                self._stop.wait(self.poll_interval)
+
+    def run(self, once=False):
+        threads = [threading.Thread(target=self.loop, args=(f'{self.name}-{i}', once), name=f'scrape-worker-{i}')
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def stop(self):
+        self._stop.set()
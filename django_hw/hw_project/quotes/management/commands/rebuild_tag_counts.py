@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from quotes.models import Tag
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the number of quotes of every tag'
+
+    def handle(self, *args, **options):
+        updated = Tag.rebuild_quote_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt quote counts of {updated} tags'))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quotes.jobs import Worker, queue_refreshes
+
+
+class Command(BaseCommand):
+    help = 'Queue re-scrapes of the sites scraped before; meant to be run from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.SCRAPE_REFRESH_INTERVAL,
+                            help='hours since the last scrape of a site')
+        parser.add_argument('--run', action='store_true', help='run the queued jobs here instead of in a worker')
+
+    def handle(self, *args, **options):
+        jobs = queue_refreshes(timedelta(hours=options['interval']))
+        self.stdout.write(f'Queued {len(jobs)} refresh jobs')
+        if options['run']:
+            Worker(settings.SCRAPE_WORKER_CONCURRENCY, settings.SCRAPE_WORKER_POLL_INTERVAL).run(once=True)
+        self.stdout.write(self.style.SUCCESS('Done'))
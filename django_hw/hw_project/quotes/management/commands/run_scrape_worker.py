@@ -0,0 +1,23 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quotes.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued scrape jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.SCRAPE_WORKER_CONCURRENCY,
+                            help='jobs run at the same time')
+        parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], settings.SCRAPE_WORKER_POLL_INTERVAL)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: worker.stop())
+        self.stdout.write(f'Scrape worker {worker.name} started with concurrency {worker.concurrency}')
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS('Scrape worker stopped'))
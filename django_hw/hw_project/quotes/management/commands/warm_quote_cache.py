@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from quotes.models import Author, Tag
+from quotes.pagination import NUMBERED_PAGES
+
+
+class Command(BaseCommand):
+    help = 'Render the most visited quote pages into the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5, help='numbered home pages to render')
+        parser.add_argument('--tags', type=int, default=10, help='most used tags to render')
+        parser.add_argument('--authors', type=int, default=10, help='authors with most quotes to render')
+
+    def handle(self, *args, **options):
+        urls = [reverse('quotes:home')]
+        urls += [reverse('quotes:root_paginate', args=[page])
+                 for page in range(2, min(options['pages'], NUMBERED_PAGES) + 1)]
+        urls += [reverse('quotes:quotes_by_tag', args=[name]) for name in
+                 Tag.objects.order_by('-quote_count').values_list('name', flat=True)[:options['tags']]]
+        urls += [reverse('quotes:author_detail', args=[pk]) for pk in
+                 Author.objects.annotate(num_quotes=Count('quote')).order_by('-num_quotes')
+                 .values_list('pk', flat=True)[:options['authors']]]
+
+        warmed = sum(self.render(url) for url in urls)
+        self.stdout.write(self.style.SUCCESS(f'Warmed {warmed} of {len(urls)} pages'))
+
+
+    @staticmethod
+    def render(url):
+        # An anonymous GET of the same path fills the same key visitors hit.
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        match = resolve(url)
+        try:
+            return match.func(request, *match.args, **match.kwargs).status_code == 200
+        except Http404:
+            return False
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:27
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_quotes(apps, schema_editor):
+    Tag = apps.get_model('quotes', 'Tag')
+    Quote = apps.get_model('quotes', 'Quote')
+    counts = (Quote.tags.through.objects.filter(tag=OuterRef('pk')).order_by()
+              .values('tag').annotate(count=Count('quote')).values('count'))
+    Tag.objects.update(quote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0002_alter_tag_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='quote_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(count_quotes, migrations.RunPython.noop),
+    ]
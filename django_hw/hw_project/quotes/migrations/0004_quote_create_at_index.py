@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0003_tag_quote_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['create_at', 'id'], name='quote_create_at_id_idx'),
+        ),
+    ]
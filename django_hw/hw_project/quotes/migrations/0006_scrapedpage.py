@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0005_scrapejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapedPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('host', models.CharField(db_index=True, max_length=255)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('body_hash', models.CharField(max_length=64)),
+                ('links', models.JSONField(blank=True, default=list)),
+                ('checked_at', models.DateTimeField()),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='scrapejob',
+            name='force',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='scrapejob',
+            name='pages_unchanged',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:02
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+QUOTE_MARKS = '"\'“”„‘’‚«»'
+BATCH_SIZE = 1000
+
+
+def quote_hash(text):
+    # Frozen copy of quotes.models.quote_hash.
+    normalized = unicodedata.normalize('NFKC', text)
+    normalized = re.sub(r'\s+', ' ', normalized).strip().strip(QUOTE_MARKS).strip().casefold()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def hash_quotes(apps, schema_editor):
+    # Fills in content_hash and merges the quotes it shows to be duplicates
+    # into the oldest one, so the unique constraint can be added. That is done
+    # in 0008: on Postgres the deferred foreign key checks of the deletes
+    # here must be committed before quotes_quote can be altered.
+    Quote = apps.get_model('quotes', 'Quote')
+    Tag = apps.get_model('quotes', 'Tag')
+    Through = Quote.tags.through
+
+    kept, duplicates, batch = {}, {}, []
+    for quote in Quote.objects.only('id', 'quote', 'author_id').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        quote.content_hash = quote_hash(quote.quote)
+        key = (quote.content_hash, quote.author_id)
+        if quote.author_id is not None and key in kept:
+            duplicates[quote.id] = kept[key]
+            continue
+        kept[key] = quote.id
+        batch.append(quote)
+        if len(batch) >= BATCH_SIZE:
+            Quote.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Quote.objects.bulk_update(batch, ['content_hash'])
+
+    if duplicates:
+        links = Through.objects.filter(quote_id__in=duplicates).values_list('quote_id', 'tag_id')
+        tags = set()
+        for quote_id, tag_id in links:
+            tags.add(tag_id)
+            Through.objects.get_or_create(quote_id=duplicates[quote_id], tag_id=tag_id)
+        ids = list(duplicates)
+        for start in range(0, len(ids), BATCH_SIZE):
+            Quote.objects.filter(id__in=ids[start:start + BATCH_SIZE]).delete()
+
+        counts = (Through.objects.filter(tag=OuterRef('pk')).order_by()
+                  .values('tag').annotate(count=Count('quote')).values('count'))
+        Tag.objects.filter(pk__in=tags).update(quote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0006_scrapedpage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='fullname',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='content_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(hash_quotes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0007_quote_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='quote',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'author'), name='quote_content_hash_author_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0008_quote_content_hash_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapejob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Jobs running now count as claimed once, with their start as the last heartbeat.
+        migrations.RunSQL(
+            "UPDATE quotes_scrapejob SET attempts = 1, heartbeat_at = started_at WHERE status = 'running'",
+            migrations.RunSQL.noop,
+        ),
+    ]
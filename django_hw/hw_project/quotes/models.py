@@ -1,9 +1,27 @@
+import hashlib
+import re
+import unicodedata
+
+from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 # Create your models here.
 
+QUOTE_MARKS = '"\'“”„‘’‚«»'
+
+
+def quote_hash(text):
+    # Quotes that differ only in case, spacing, Unicode form or the quotation
+    # marks around them hash the same.
+    normalized = unicodedata.normalize('NFKC', text)
+    normalized = re.sub(r'\s+', ' ', normalized).strip().strip(QUOTE_MARKS).strip().casefold()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
 class Author(models.Model):
-    fullname = models.CharField(max_length=50)
+    fullname = models.CharField(max_length=50, db_index=True)
     born_date = models.CharField(max_length=50)
     born_location = models.CharField(max_length=150)
     description = models.TextField()
@@ -15,13 +33,118 @@ class Author(models.Model):
 
 class Tag(models.Model):
     name = models.CharField(max_length=150, null=False, unique=True)
+    # Number of quotes with this tag, kept up to date by quotes.signals.
+    quote_count = models.PositiveIntegerField(default=0, db_index=True)
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def rebuild_quote_counts(cls, tag_ids=None):
+        counts = (Quote.tags.through.objects.filter(tag=OuterRef('pk')).order_by()
+                  .values('tag').annotate(count=Count('quote')).values('count'))
+        tags = cls.objects.all() if tag_ids is None else cls.objects.filter(pk__in=tag_ids)
+        return tags.update(quote_count=Coalesce(Subquery(counts), 0))
+
 
 class Quote(models.Model):
     quote = models.TextField()
+    # quote_hash(quote), kept up to date by save(); duplicates are found by it, not by comparing texts.
+    content_hash = models.CharField(max_length=64, editable=False)
     tags = models.ManyToManyField(Tag)
     author = models.ForeignKey(Author, on_delete=models.CASCADE, default=None, null=True)
-    create_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    create_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the home page, newest first.
+            models.Index(fields=['create_at', 'id'], name='quote_create_at_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['content_hash', 'author'], name='quote_content_hash_author_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.content_hash = quote_hash(self.quote)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'quote' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        super().save(*args, **kwargs)
+
+
+class ScrapeJob(models.Model):
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    url = models.URLField(max_length=500)
+    # Re-parse every page, even those the site reports as unchanged.
+    force = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    # Times the job was claimed; a job whose worker died is queued again until it runs out of attempts.
+    attempts = models.PositiveIntegerField(default=0)
+    pages_fetched = models.PositiveIntegerField(default=0)
+    pages_unchanged = models.PositiveIntegerField(default=0)
+    quotes_inserted = models.PositiveIntegerField(default=0)
+    authors_inserted = models.PositiveIntegerField(default=0)
+    tags_inserted = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker while the job runs.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers pick the oldest queued job.
+            models.Index(fields=['status', 'created_at'], name='scrapejob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.url} ({self.status})'
+
+    @property
+    def finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'url': self.url,
+            'status': self.status,
+            'finished': self.finished,
+            'force': self.force,
+            'pages_fetched': self.pages_fetched,
+            'pages_unchanged': self.pages_unchanged,
+            'quotes_inserted': self.quotes_inserted,
+            'authors_inserted': self.authors_inserted,
+            'tags_inserted': self.tags_inserted,
+            'errors': self.errors,
+            'attempts': self.attempts,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ScrapedPage(models.Model):
+    # What the crawler saw at a URL the last time, so a re-scrape can ask the
+    # site for changes only and skip pages whose body is the same.
+    url = models.URLField(max_length=500, unique=True)
+    host = models.CharField(max_length=255, db_index=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    body_hash = models.CharField(max_length=64)
+    # Links found on the page, followed without re-parsing it while it is unchanged.
+    links = models.JSONField(default=list, blank=True)
+    checked_at = models.DateTimeField()
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.url
@@ -0,0 +1,72 @@
+import base64
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import BadRequest
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Pages reachable by number (OFFSET); later pages are only linked by cursor.
+NUMBERED_PAGES = 20
+COUNT_CACHE_KEY = 'quotes:count'
+COUNT_CACHE_TTL = 60
+
+
+def encode_cursor(quote):
+    value = f'{quote.create_at.isoformat()}|{quote.id}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        create_at, quote_id = value.split('|')
+        return datetime.fromisoformat(create_at), int(quote_id)
+    except ValueError:
+        raise BadRequest('Invalid page cursor')
+
+
+class CachedCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        return cache.get_or_set(COUNT_CACHE_KEY, self.object_list.count, COUNT_CACHE_TTL)
+
+
+class KeysetPage:
+    # Quotes newest first, ordered by (create_at, id) so that quotes created
+    # in the same instant still have a stable position. A page is read with
+    # an index range scan from the cursor instead of an OFFSET.
+
+    def __init__(self, items, has_previous, has_next):
+        self.object_list = items
+        self.has_previous = has_previous
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self.object_list else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self.object_list else None
+
+
+def keyset_page(queryset, per_page, after=None, before=None):
+    if after:
+        create_at, quote_id = decode_cursor(after)
+        newer = Q(create_at__lt=create_at) | Q(create_at=create_at, id__lt=quote_id)
+        items = list(queryset.filter(newer).order_by('-create_at', '-id')[:per_page + 1])
+        return KeysetPage(items[:per_page], True, len(items) > per_page)
+
+    create_at, quote_id = decode_cursor(before)
+    older = Q(create_at__gt=create_at) | Q(create_at=create_at, id__gt=quote_id)
+    items = list(queryset.filter(older).order_by('create_at', 'id')[:per_page + 1])
+    return KeysetPage(items[:per_page][::-1], len(items) > per_page, True)
@@ -0,0 +1,70 @@
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+# Kept free of Django imports: parse_page runs in crawler worker processes.
+
+
+@dataclass
+class ParsedAuthor:
+    fullname: str
+    born_date: str = ''
+    born_location: str = ''
+    description: str = ''
+
+
+@dataclass
+class ParsedQuote:
+    quote: str
+    author: str
+    tags: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Page:
+    url: str
+    quotes: list[ParsedQuote] = field(default_factory=list)
+    authors: list[ParsedAuthor] = field(default_factory=list)
+    links: list[str] = field(default_factory=list)
+    # Filled in by the crawler from the response.
+    etag: str = ''
+    last_modified: str = ''
+    body_hash: str = ''
+    changed: bool = True
+
+
+def text_of(soup, selector):
+    element = soup.select_one(selector)
+    return element.get_text(strip=True) if element is not None else ''
+
+
+def parse_page(url, html):
+    # Understands the quotes.toscrape.com layout: quote lists with "Next"
+    # pagination and "(about)" links, and author detail pages.
+    soup = BeautifulSoup(html, 'html.parser')
+    page = Page(url)
+
+    for quote_item in soup.select('.quote'):
+        page.quotes.append(ParsedQuote(
+            quote=text_of(quote_item, '.text'),
+            author=text_of(quote_item, '.author'),
+            tags=[tag_elem.get_text(strip=True) for tag_elem in quote_item.select('.tag')],
+        ))
+        about = quote_item.select_one('a[href*="/author/"]')
+        if about is not None:
+            page.links.append(urljoin(url, about['href']))
+
+    details = soup.select_one('.author-details')
+    if details is not None:
+        page.authors.append(ParsedAuthor(
+            fullname=text_of(details, '.author-title'),
+            born_date=text_of(details, '.author-born-date'),
+            born_location=text_of(details, '.author-born-location'),
+            description=text_of(details, '.author-description'),
+        ))
+
+    next_link = soup.select_one('li.next a')
+    if next_link is not None:
+        page.links.append(urljoin(url, next_link['href']))
+    return page
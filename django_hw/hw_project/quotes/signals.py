@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import author_scope, invalidate_on_commit, tag_scope
+from .models import Author, Quote, Tag
+from .pagination import COUNT_CACHE_KEY
+
+
+def change_counts(tag_ids, delta):
+    if tag_ids:
+        Tag.objects.filter(pk__in=tag_ids).update(quote_count=F('quote_count') + delta)
+
+
+def tag_scopes(tags):
+    return [tag_scope(name) for name in tags.values_list('name', flat=True)]
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def update_tag_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    # pk_set holds only the rows really added or removed. On the reverse
+    # side (tag.quote_set) the instance is the tag and pk_set the quotes.
+    if action in ('post_add', 'post_remove'):
+        delta = 1 if action == 'post_add' else -1
+        if reverse:
+            change_counts([instance.pk], delta * len(pk_set))
+            invalidate_on_commit('quotes', tag_scope(instance.name))
+        else:
+            change_counts(pk_set, delta)
+            invalidate_on_commit('quotes', *tag_scopes(Tag.objects.filter(pk__in=pk_set)))
+    elif action == 'pre_clear' and not reverse:
+        instance._cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        if reverse:
+            Tag.objects.filter(pk=instance.pk).update(quote_count=0)
+            invalidate_on_commit('quotes', tag_scope(instance.name))
+        else:
+            tag_ids = instance.__dict__.pop('_cleared_tag_ids', [])
+            change_counts(tag_ids, -1)
+            invalidate_on_commit('quotes', *tag_scopes(Tag.objects.filter(pk__in=tag_ids)))
+
+
+@receiver(pre_save, sender=Quote)
+def remember_author(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_author_id = Quote.objects.filter(pk=instance.pk).values_list('author_id', flat=True).first()
+
+
+@receiver(post_save, sender=Quote)
+def quote_saved(sender, instance, created, **kwargs):
+    if created:
+        # A new quote has no tags yet; they arrive through m2m_changed.
+        cache.delete(COUNT_CACHE_KEY)
+        invalidate_on_commit('quotes', author_scope(instance.author_id))
+        return
+    previous_author_id = instance.__dict__.pop('_previous_author_id', None)
+    invalidate_on_commit('quotes', author_scope(instance.author_id), author_scope(previous_author_id),
+                         *tag_scopes(instance.tags.all()))
+
+
+@receiver(pre_delete, sender=Quote)
+def remember_tags(sender, instance, **kwargs):
+    # Deleting a quote removes its tag rows without m2m_changed, so the tags
+    # are read before and decremented once the quote is gone.
+    instance._deleted_tags = list(instance.tags.values_list('pk', 'name'))
+
+
+@receiver(post_delete, sender=Quote)
+def quote_deleted(sender, instance, **kwargs):
+    tags = instance.__dict__.pop('_deleted_tags', [])
+    change_counts([pk for pk, _ in tags], -1)
+    cache.delete(COUNT_CACHE_KEY)
+    invalidate_on_commit('quotes', author_scope(instance.author_id), *(tag_scope(name) for _, name in tags))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    # The author's name is shown on the quote list and on tag pages.
+    if not created:
+        invalidate_on_commit('quotes', author_scope(instance.pk),
+                             *tag_scopes(Tag.objects.filter(quote__author=instance).distinct()))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    invalidate_on_commit(author_scope(instance.pk))
+
+
+@receiver(pre_save, sender=Tag)
+def remember_name(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_name = Tag.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    previous_name = instance.__dict__.pop('_previous_name', None)
+    if previous_name is not None and previous_name != instance.name:
+        invalidate_on_commit('quotes', tag_scope(previous_name), tag_scope(instance.name))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    invalidate_on_commit('quotes', tag_scope(instance.name))
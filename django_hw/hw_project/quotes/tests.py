@@ -1,3 +1,598 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import get_versions
+from .crawler import HostLimiter, crawl
+from .ingest import ParsedAuthor, ParsedQuote, ingest
+from .jobs import MAX_ATTEMPTS, claim_job, heartbeat, queue_refreshes, run_job, run_next_job
+from .models import Author, Quote, ScrapedPage, ScrapeJob, Tag, quote_hash
+
+
+# The pages and the ingest layer go through the cache; keep the tests off the Redis in settings.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'quotes-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    # The number of queries of a page must not grow with the number of quotes on it.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(fullname='Albert Einstein', born_date='March 14, 1879',
+                                           born_location='Ulm, Germany', description='Physicist')
+        other = Author.objects.create(fullname='Jane Austen', born_date='December 16, 1775',
+                                      born_location='Steventon, England', description='Novelist')
+        cls.tag = Tag.objects.create(name='life')
+        tags = [cls.tag] + [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        for i in range(12):
+            quote = Quote.objects.create(quote=f'Quote {i}', author=cls.author if i % 2 else other)
+            quote.tags.set(tags[:i % 4 + 1])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_home_page(self):
+        # count, quotes with authors, their tags, top tags
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('quotes:home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Albert Einstein')
+
+    def test_paginated_page(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('quotes:root_paginate', args=[2]))
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch('quotes.views.NUMBERED_PAGES', 1)
+    def test_cursor_page(self):
+        first = self.client.get(reverse('quotes:home'))
+        # quotes with authors, their tags; the sidebar is a cached fragment by now
+        with self.assertNumQueries(2):
+            response = self.client.get(first.context['next_url'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_author_detail(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('quotes:author_detail', args=[self.author.id]))
+        self.assertContains(response, 'Quote 1')
+
+    def test_quotes_by_tag(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('quotes:quotes_by_tag', args=[self.tag.name]))
+        self.assertContains(response, 'Jane Austen')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(fullname='Oscar Wilde')
+        cls.quotes = [Quote.objects.create(quote=f'Quote {i}', author=author) for i in range(25)]
+        # Several quotes created in the same instant must still be paged without gaps.
+        Quote.objects.filter(id__in=[q.id for q in cls.quotes[8:14]]).update(create_at=cls.quotes[8].create_at)
+
+    def setUp(self):
+        cache.clear()
+
+    def quote_ids(self, response):
+        return [quote.id for quote in response.context['quotes']]
+
+    @mock.patch('quotes.views.NUMBERED_PAGES', 1)
+    def test_walk_forward_and_back(self):
+        response = self.client.get(reverse('quotes:home'))
+        pages = [self.quote_ids(response)]
+        self.assertIsNone(response.context['previous_url'])
+        while response.context['next_url']:
+            response = self.client.get(response.context['next_url'])
+            pages.append(self.quote_ids(response))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        expected = Quote.objects.order_by('-create_at', '-id').values_list('id', flat=True)
+        self.assertEqual(sum(pages, []), list(expected))
+
+        for page in reversed(pages[:-1]):
+            response = self.client.get(response.context['previous_url'])
+            self.assertEqual(self.quote_ids(response), page)
+        self.assertIsNone(response.context['previous_url'])
+
+    def test_numbered_pages(self):
+        response = self.client.get(reverse('quotes:root_paginate', args=[3]))
+        self.assertEqual(len(response.context['quotes']), 5)
+        self.assertIsNone(response.context['next_url'])
+        self.assertEqual(self.client.get(reverse('quotes:root_paginate', args=[4])).status_code, 404)
+
+    @mock.patch('quotes.views.NUMBERED_PAGES', 2)
+    def test_pages_past_numbered_limit(self):
+        response = self.client.get(reverse('quotes:root_paginate', args=[2]))
+        self.assertIn('?after=', response.context['next_url'])
+        self.assertEqual(self.client.get(reverse('quotes:root_paginate', args=[3])).status_code, 404)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('quotes:home'), {'after': 'bogus'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(fullname='Albert Einstein')
+        cls.tag = Tag.objects.create(name='science')
+        quote = Quote.objects.create(quote='Imagination is more important than knowledge.', author=cls.author)
+        quote.tags.add(cls.tag)
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'secret-pass-123')
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [reverse('quotes:home'), reverse('quotes:author_detail', args=[self.author.id]),
+                     reverse('quotes:quotes_by_tag', args=[self.tag.name])]
+
+    def test_anonymous_pages_are_cached(self):
+        for url in self.urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(first.content, second.content)
+
+    def test_logged_in_pages_are_not_shared(self):
+        self.client.get(self.urls[0])
+        self.client.force_login(self.user)
+        response = self.client.get(self.urls[0])
+        self.assertContains(response, 'Logout')
+
+    def test_add_quote_invalidates(self):
+        for url in self.urls:
+            self.client.get(url)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('quotes:add_quote'), {'quote': 'Life is like riding a bicycle.',
+                                                           'author': self.author.id, 'tags': [self.tag.id]})
+        self.client.logout()
+        for url in self.urls:
+            self.assertContains(self.client.get(url), 'riding a bicycle')
+
+    def test_author_edit_invalidates(self):
+        for url in self.urls:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.fullname = 'A. Einstein'
+            self.author.save()
+        for url in self.urls:
+            self.assertContains(self.client.get(url), 'A. Einstein')
+
+    def test_other_scopes_are_kept(self):
+        other = Author.objects.create(fullname='Jane Austen')
+        for url in self.urls[1:]:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.description = 'Novelist'
+            other.save()
+        for url in self.urls[1:]:
+            with self.assertNumQueries(0):
+                self.client.get(url)
+
+    def test_stale_page_while_rebuilding(self):
+        self.client.get(self.urls[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            Quote.objects.create(quote='New quote', author=self.author)
+        # Another request holds the lock for the new version.
+        key = 'page:{}:{}'.format(self.urls[0], get_versions('quotes')['quotes'])
+        cache.add(f'{key}:lock', 1)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.urls[0])
+        self.assertNotContains(response, 'New quote')
+
+    def test_warm_up_command(self):
+        call_command('warm_quote_cache', stdout=StringIO())
+        for url in self.urls:
+            with self.assertNumQueries(0):
+                self.client.get(url)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(fullname='Albert Einstein')
+        cls.tag = Tag.objects.create(name='science')
+        Quote.objects.create(quote='Imagination is more important than knowledge.', author=cls.author).tags.add(cls.tag)
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'secret-pass-123')
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [reverse('quotes:home'), reverse('quotes:author_detail', args=[self.author.id]),
+                     reverse('quotes:quotes_by_tag', args=[self.tag.name])]
+
+    def test_not_modified_without_queries(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertIn('public', response['Cache-Control'])
+            with self.assertNumQueries(0):
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.urls[0])
+        revalidated = self.client.get(self.urls[0], HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_change_gives_new_etag(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            Quote.objects.create(quote='Life is like riding a bicycle.', author=self.author).tags.add(self.tag)
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'riding a bicycle')
+
+    def test_logged_in_pages_have_private_validators(self):
+        anonymous = self.client.get(self.urls[0])
+        self.client.force_login(self.user)
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TagQuoteCountTests(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(fullname='Mark Twain')
+        self.life, self.humor = Tag.objects.create(name='life'), Tag.objects.create(name='humor')
+        self.quote = Quote.objects.create(quote='Quote', author=self.author)
+
+    def assertCounts(self, life, humor):
+        self.life.refresh_from_db()
+        self.humor.refresh_from_db()
+        self.assertEqual((self.life.quote_count, self.humor.quote_count), (life, humor))
+
+    def test_add_and_remove(self):
+        self.quote.tags.add(self.life, self.humor)
+        self.quote.tags.add(self.life)
+        self.assertCounts(1, 1)
+        self.quote.tags.remove(self.humor)
+        self.assertCounts(1, 0)
+
+    def test_set_and_clear(self):
+        self.quote.tags.set([self.life])
+        self.quote.tags.set([self.humor])
+        self.assertCounts(0, 1)
+        self.quote.tags.clear()
+        self.assertCounts(0, 0)
+
+    def test_reverse_side(self):
+        other = Quote.objects.create(quote='Other', author=self.author)
+        self.life.quote_set.add(self.quote, other)
+        self.assertCounts(2, 0)
+        self.life.quote_set.clear()
+        self.assertCounts(0, 0)
+
+    def test_delete_quote(self):
+        self.quote.tags.add(self.life, self.humor)
+        self.quote.delete()
+        self.assertCounts(0, 0)
+
+    def test_delete_author_cascades(self):
+        self.quote.tags.add(self.life)
+        self.author.delete()
+        self.assertCounts(0, 0)
+
+    def test_rebuild_command(self):
+        self.quote.tags.add(self.life)
+        Tag.objects.update(quote_count=7)
+        call_command('rebuild_tag_counts', stdout=StringIO())
+        self.assertCounts(1, 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IngestTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def batch(self, size, offset=0):
+        return [ParsedQuote(quote=f'Quote {i}', author=f'Author {i % 7}', tags=[f'tag{i % 5}', f'tag{i % 3}'])
+                for i in range(offset, offset + size)]
+
+    def test_small_batch_queries(self):
+        # savepoint, then lookup, insert, re-read for authors, tags and quotes,
+        # lookup and insert of tag links, tag counts, release
+        with self.assertNumQueries(14):
+            result = ingest(self.batch(10))
+        self.assertEqual((result.quotes, result.authors, result.tags), (10, 7, 5))
+
+    def test_large_batch_queries(self):
+        with self.assertNumQueries(14):
+            result = ingest(self.batch(200))
+        self.assertEqual((result.quotes, result.authors, result.tags), (200, 7, 5))
+
+    def test_rerun_adds_nothing(self):
+        ingest(self.batch(20))
+        links = Quote.tags.through.objects.count()
+        result = ingest(self.batch(20))
+        self.assertEqual((result.quotes, result.authors, result.tags), (0, 0, 0))
+        self.assertEqual(Quote.tags.through.objects.count(), links)
+
+    def test_tag_counts_and_links(self):
+        ingest(self.batch(30))
+        quote = Quote.objects.get(quote='Quote 4')
+        self.assertEqual(sorted(quote.tags.values_list('name', flat=True)), ['tag1', 'tag4'])
+        self.assertEqual(quote.author.fullname, 'Author 4')
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.quote_count, tag.quote_set.count())
+
+    def test_author_details_are_completed(self):
+        ingest([ParsedQuote(quote='Quote', author='Jane Austen')])
+        ingest([], [ParsedAuthor('Jane Austen', 'December 16, 1775', 'Steventon, England', 'Novelist')])
+        author = Author.objects.get()
+        self.assertEqual((author.born_location, author.description), ('Steventon, England', 'Novelist'))
+
+    def test_normalized_duplicates(self):
+        variants = ['“Be yourself.”', 'be   yourself.', '\u201cBe yourself.\u201d ']
+        result = ingest([ParsedQuote(quote=text, author='Oscar Wilde', tags=['honesty']) for text in variants])
+        self.assertEqual(result.quotes, 1)
+        self.assertEqual(ingest([ParsedQuote(quote='Be Yourself.', author='Oscar Wilde')]).quotes, 0)
+        self.assertEqual(ingest([ParsedQuote(quote='Be yourself.', author='Someone Else')]).quotes, 1)
+        self.assertEqual(Tag.objects.get(name='honesty').quote_count, 1)
+
+    def test_invalidates_cached_pages(self):
+        self.client.get(reverse('quotes:home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest(self.batch(3))
+        self.assertContains(self.client.get(reverse('quotes:home')), 'Quote 2')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuoteHashTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('editor', 'editor@example.com', 'secret-pass-123')
+        cls.author = Author.objects.create(fullname='Oscar Wilde')
+
+    def test_hash_is_kept_up_to_date(self):
+        quote = Quote.objects.create(quote='Be yourself.', author=self.author)
+        self.assertEqual(quote.content_hash, quote_hash('“be yourself.”'))
+        quote.quote = 'Everyone else is already taken.'
+        quote.save(update_fields=['quote'])
+        quote.refresh_from_db()
+        self.assertEqual(quote.content_hash, quote_hash('Everyone else is already taken.'))
+
+    def test_form_rejects_duplicate(self):
+        Quote.objects.create(quote='Be yourself.', author=self.author)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('quotes:add_quote'), {'quote': ' be yourself. ', 'author': self.author.id})
+        self.assertContains(response, 'This author already has this quote.')
+        self.assertEqual(Quote.objects.count(), 1)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureSiteMixin:
+    # Serves saved quotes.toscrape.com pages from quotes/testdata/site.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handler = partial(QuietHandler, directory=Path(__file__).parent / 'testdata' / 'site')
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CrawlerTests(FixtureSiteMixin, TestCase):
+
+    def test_follows_pagination_and_author_pages(self):
+        result = crawl(self.url, delay=0, parse_workers=1, batch_size=2)
+        self.assertEqual(result.pages, 4)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('Marilyn-Monroe', result.errors[0])
+
+        self.assertEqual(Quote.objects.count(), 4)
+        self.assertEqual(Quote.objects.filter(author__fullname='Albert Einstein').count(), 2)
+        einstein = Author.objects.get(fullname='Albert Einstein')
+        self.assertEqual((einstein.born_date, einstein.born_location), ('March 14, 1879', 'in Ulm, Germany'))
+        self.assertEqual(Tag.objects.get(name='life').quote_count, 1)
+
+    def test_recrawl_adds_nothing(self):
+        crawl(self.url, delay=0, parse_workers=1)
+        result = crawl(self.url, delay=0, parse_workers=1)
+        self.assertEqual(result.ingested.quotes, 0)
+        self.assertEqual(Author.objects.count(), 3)
+
+    def test_recrawl_skips_unchanged_pages(self):
+        crawl(self.url, delay=0, parse_workers=1)
+        self.assertEqual(ScrapedPage.objects.count(), 4)
+        Quote.objects.all().delete()
+
+        # The fixture server answers If-Modified-Since with 304: nothing is parsed, so nothing comes back.
+        result = crawl(self.url, delay=0, parse_workers=1)
+        self.assertEqual((result.pages, result.unchanged), (4, 4))
+        self.assertFalse(Quote.objects.exists())
+
+        result = crawl(self.url, delay=0, parse_workers=1, force=True)
+        self.assertEqual((result.unchanged, result.ingested.quotes), (0, 4))
+
+    def test_same_body_is_not_parsed(self):
+        crawl(self.url, delay=0, parse_workers=1)
+        ScrapedPage.objects.update(last_modified='')
+        result = crawl(self.url, delay=0, parse_workers=1)
+        self.assertEqual(result.unchanged, 4)
+
+    def test_changed_page_is_ingested(self):
+        crawl(self.url, delay=0, parse_workers=1)
+        ScrapedPage.objects.filter(url=self.url + 'page/2/').update(last_modified='', body_hash='stale')
+        Quote.objects.all().delete()
+
+        result = crawl(self.url, delay=0, parse_workers=1)
+        self.assertEqual((result.unchanged, result.ingested.quotes), (3, 2))
+        self.assertNotEqual(ScrapedPage.objects.get(url=self.url + 'page/2/').body_hash, 'stale')
+
+    def test_max_pages(self):
+        result = crawl(self.url, delay=0, parse_workers=1, max_pages=1)
+        self.assertEqual(result.pages, 1)
+        self.assertEqual(Quote.objects.count(), 2)
+
+    def test_host_politeness(self):
+        starts = []
+
+        async def request(limiter, host):
+            async with limiter.slot(host):
+                starts.append((host, time.monotonic()))
+
+        async def run():
+            limiter = HostLimiter(concurrency=2, delay=0.05)
+            await asyncio.gather(*(request(limiter, 'a') for _ in range(3)), request(limiter, 'b'))
+
+        asyncio.run(run())
+        times = [started for host, started in starts if host == 'a']
+        self.assertGreaterEqual(times[2] - times[0], 0.09)
+        self.assertLess(dict(starts)['b'] - times[0], 0.05)
+
+    def test_unreachable_site(self):
+        with self.assertRaisesMessage(Exception, 'Failed to fetch data'):
+            crawl(self.url + 'missing/', delay=0, parse_workers=1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ScrapeJobTests(FixtureSiteMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('scraper', 'scraper@example.com', 'secret-pass-123')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_view_only_queues(self):
+        response = self.client.post(reverse('quotes:scrape_data'), {'url': self.url})
+        job = ScrapeJob.objects.get()
+        self.assertRedirects(response, reverse('quotes:scrape_job', args=[job.id]))
+        self.assertEqual((job.status, job.created_by), (ScrapeJob.Status.QUEUED, self.user))
+        self.assertFalse(Quote.objects.exists())
+
+    def test_invalid_url(self):
+        response = self.client.post(reverse('quotes:scrape_data'), {'url': 'not a url'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ScrapeJob.objects.exists())
+
+    @mock.patch('quotes.jobs.crawl', partial(crawl, delay=0, parse_workers=1))
+    def test_worker_runs_job(self):
+        job = ScrapeJob.objects.create(url=self.url, created_by=self.user)
+        self.assertTrue(run_next_job('test'))
+        self.assertFalse(run_next_job('test'))
+
+        status = self.client.get(reverse('quotes:scrape_job_status', args=[job.id])).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertTrue(status['finished'])
+        self.assertEqual((status['pages_fetched'], status['quotes_inserted'], status['authors_inserted']), (4, 4, 3))
+        self.assertEqual(len(status['errors']), 1)
+        self.assertContains(self.client.get(reverse('quotes:scrape_job', args=[job.id])), 'Done')
+
+    @mock.patch('quotes.jobs.crawl', partial(crawl, delay=0, parse_workers=1))
+    def test_failed_job(self):
+        job = ScrapeJob.objects.create(url=self.url + 'missing/', created_by=self.user)
+        run_next_job('test')
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScrapeJob.Status.FAILED)
+        self.assertIn('Failed to fetch data', job.errors[0])
+        self.assertIsNotNone(job.finished_at)
+
+    def test_jobs_are_private(self):
+        other = User.objects.create_user('other', 'other@example.com', 'secret-pass-123')
+        job = ScrapeJob.objects.create(url=self.url, created_by=other)
+        self.assertEqual(self.client.get(reverse('quotes:scrape_job', args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('quotes:scrape_job_status', args=[job.id])).status_code, 404)
+
+    def test_refresh_queues_scraped_sites(self):
+        ScrapeJob.objects.create(url=self.url, status=ScrapeJob.Status.DONE)
+        ScrapeJob.objects.create(url=self.url + 'failed/', status=ScrapeJob.Status.FAILED)
+        self.assertEqual(queue_refreshes(timedelta(hours=1)), [])
+
+        ScrapeJob.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        jobs = queue_refreshes(timedelta(hours=1))
+        self.assertEqual([job.url for job in jobs], [self.url])
+        self.assertEqual(queue_refreshes(timedelta(hours=1)), [])
+
+    def test_job_of_a_dead_worker_is_queued_again(self):
+        stale = timezone.now() - timedelta(seconds=settings.SCRAPE_JOB_STALE_AFTER + 1)
+        dead = ScrapeJob.objects.create(url=self.url, status=ScrapeJob.Status.RUNNING, worker='dead', attempts=1,
+                                        heartbeat_at=stale)
+        alive = ScrapeJob.objects.create(url=self.url + 'alive/', status=ScrapeJob.Status.RUNNING, worker='alive',
+                                         attempts=1, heartbeat_at=timezone.now())
+
+        job = claim_job('test')
+        self.assertEqual((job.pk, job.worker, job.attempts), (dead.pk, 'test', 2))
+        self.assertIsNone(claim_job('test'))
+        alive.refresh_from_db()
+        self.assertEqual((alive.status, alive.worker), (ScrapeJob.Status.RUNNING, 'alive'))
+
+    def test_job_out_of_attempts_fails(self):
+        stale = timezone.now() - timedelta(seconds=settings.SCRAPE_JOB_STALE_AFTER + 1)
+        job = ScrapeJob.objects.create(url=self.url, status=ScrapeJob.Status.RUNNING, attempts=MAX_ATTEMPTS,
+                                       heartbeat_at=stale)
+        self.assertIsNone(claim_job('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScrapeJob.Status.FAILED)
+        self.assertIn('stopped responding', job.errors[0])
+        self.assertIsNotNone(job.finished_at)
+
+    def test_refresh_is_not_blocked_by_a_stale_job(self):
+        stale = timezone.now() - timedelta(seconds=settings.SCRAPE_JOB_STALE_AFTER + 1)
+        ScrapeJob.objects.create(url=self.url, status=ScrapeJob.Status.DONE)
+        ScrapeJob.objects.create(url=self.url, status=ScrapeJob.Status.RUNNING, attempts=1, heartbeat_at=stale)
+        ScrapeJob.objects.update(created_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(queue_refreshes(timedelta(hours=1)), [])
+        # The stale job is queued again rather than a second one added.
+        self.assertEqual(ScrapeJob.objects.filter(url=self.url, status=ScrapeJob.Status.QUEUED).count(), 1)
+
+    @mock.patch('quotes.jobs.crawl', partial(crawl, delay=0, parse_workers=1))
+    def test_released_job_ignores_its_old_worker(self):
+        ScrapeJob.objects.create(url=self.url)
+        job = claim_job('slow')
+        ScrapeJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=settings.SCRAPE_JOB_STALE_AFTER + 1))
+        retry = claim_job('test')
+        run_job(job)
+        retry.refresh_from_db()
+        self.assertEqual((retry.status, retry.worker, retry.pages_fetched), (ScrapeJob.Status.RUNNING, 'test', 0))
+
+    def test_heartbeat_runs_until_the_job_ends(self):
+        jobs = mock.Mock()
+        with heartbeat(jobs, 0.01):
+            time.sleep(0.1)
+        beats = jobs.update.call_count
+        self.assertGreater(beats, 1)
+        time.sleep(0.05)
+        self.assertEqual(jobs.update.call_count, beats)
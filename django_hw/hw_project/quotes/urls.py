@@ -12,4 +12,6 @@ urlpatterns = [
     path('author/<int:author_id>', views.author_detail, name='author_detail'),
     path('tag/<str:tag_name>', views.quotes_by_tag, name='quotes_by_tag'),
     path('scrape/', views.scrape_data, name='scrape_data'),
+    path('scrape/<int:job_id>', views.scrape_job, name='scrape_job'),
+    path('scrape/<int:job_id>/status', views.scrape_job_status, name='scrape_job_status'),
 ]
\ No newline at end of file
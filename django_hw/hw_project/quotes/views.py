@@ -1,12 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.paginator import InvalidPage
 from django.contrib import messages
-from django.db.models import Count
+from django.http import Http404, JsonResponse
+from django.urls import reverse
 
-from .forms import AuthorForm, QuoteForm
-from .models import Author, Quote, Tag
-from .utils import scrape_and_save_data
+from .forms import AuthorForm, QuoteForm, ScrapeJobForm
+from .cache import author_scope, conditional_page, get_versions, tag_scope
+from .models import Author, Quote, ScrapeJob, Tag
+from .pagination import NUMBERED_PAGES, CachedCountPaginator, encode_cursor, keyset_page
 # Create your views here.
 
 @login_required
@@ -38,37 +40,98 @@ def add_quote(request):
 
 
 def author_detail(request, author_id):
-    author = get_object_or_404(Author, id=author_id)
-    quotes = Quote.objects.filter(author=author)
-    return render(request, 'quotes/author_detail.html', {'author': author, 'quotes': quotes})
+    scope = author_scope(author_id)
+    versions = get_versions(scope)
+
+    def render_page():
+        author = get_object_or_404(Author, id=author_id)
+        quotes = Quote.objects.filter(author=author).only('quote')
+        return render(request, 'quotes/author_detail.html',
+                      {'author': author, 'quotes': quotes, 'version': versions[scope]})
+
+    return conditional_page(request, versions, render_page)
 
 
 def quotes_by_tag(request, tag_name):
-    quotes = Quote.objects.filter(tags__name=tag_name)
-    return render(request, 'quotes/quotes_by_tag.html', {'quotes': quotes, 'tag_name': tag_name})
+    scope = tag_scope(tag_name)
+    versions = get_versions(scope)
+
+    def render_page():
+        quotes = Quote.objects.filter(tags__name=tag_name).select_related('author')
+        return render(request, 'quotes/quotes_by_tag.html',
+                      {'quotes': quotes, 'tag_name': tag_name, 'version': versions[scope]})
+
+    return conditional_page(request, versions, render_page)
 
 
 @login_required
 def scrape_data(request):
+    # The scrape itself runs in `manage.py run_scrape_worker`; this only queues it.
     if request.method == "POST":
-        scrape_url = request.POST.get('scrape_url')
-        try:
-            result = scrape_and_save_data(scrape_url)
-            messages.success(request, result)
-        except Exception as e:
-            messages.error(request, f'Error during scraping: {e}')
-        return redirect('quotes:home')
+        form = ScrapeJobForm(request.POST)
+        if form.is_valid():
+            job = form.save(commit=False)
+            job.created_by = request.user
+            job.save()
+            messages.success(request, "Scraping has been queued.")
+            return redirect('quotes:scrape_job', job_id=job.id)
+    else:
+        form = ScrapeJobForm()
+
+    jobs = ScrapeJob.objects.filter(created_by=request.user).order_by('-created_at')[:10]
+    return render(request, 'quotes/scrape.html', {'form': form, 'jobs': jobs})
 
-    return render(request, 'quotes/scrape.html')
+
+@login_required
+def scrape_job(request, job_id):
+    job = get_object_or_404(ScrapeJob, id=job_id, created_by=request.user)
+    return render(request, 'quotes/scrape_job.html', {'job': job})
+
+
+@login_required
+def scrape_job_status(request, job_id):
+    job = get_object_or_404(ScrapeJob, id=job_id, created_by=request.user)
+    return JsonResponse(job.as_dict())
+
+
+def cursor_url(direction, cursor):
+    return f"{reverse('quotes:home')}?{direction}={cursor}"
 
 
 def main(request, page=1):
-    quotes = Quote.objects.all().order_by('-create_at')
+    versions = get_versions('quotes')
+    return conditional_page(request, versions, lambda: render_main(request, page, versions['quotes']))
 
-    per_page = 10
-    paginator = Paginator(quotes, per_page)
-    quotes_on_page = paginator.page(page)
 
-    top_tags = Tag.objects.annotate(num_quotes=Count('quote')).order_by('-num_quotes')[:10]
+def render_main(request, page, version):
+    # The template reads each quote's author and tags: load them in two queries, not 2 per quote.
+    quotes = Quote.objects.select_related('author').prefetch_related('tags').order_by('-create_at', '-id')
 
-    return render(request, 'quotes/index.html', context={'quotes': quotes_on_page, 'top_tags': top_tags})
\ No newline at end of file
+    per_page = 10
+    after, before = request.GET.get('after'), request.GET.get('before')
+    if after or before:
+        quotes_on_page = keyset_page(quotes, per_page, after=after, before=before)
+        previous_url = cursor_url('before', quotes_on_page.previous_cursor) if quotes_on_page.has_previous else None
+        next_url = cursor_url('after', quotes_on_page.next_cursor) if quotes_on_page.has_next else None
+    else:
+        if page > NUMBERED_PAGES:
+            raise Http404('Use the Next link to browse older quotes')
+        paginator = CachedCountPaginator(quotes, per_page)
+        try:
+            quotes_on_page = paginator.page(page)
+        except InvalidPage:
+            raise Http404('No quotes on this page')
+        previous_url = next_url = None
+        if quotes_on_page.has_previous():
+            previous_url = reverse('quotes:root_paginate', args=[page - 1])
+        if quotes_on_page.has_next():
+            if page < NUMBERED_PAGES:
+                next_url = reverse('quotes:root_paginate', args=[page + 1])
+            else:
+                next_url = cursor_url('after', encode_cursor(quotes_on_page[-1]))
+
+    top_tags = Tag.objects.only('name', 'quote_count').order_by('-quote_count')[:10]
+
+    return render(request, 'quotes/index.html', context={'quotes': quotes_on_page, 'top_tags': top_tags,
+                                                         'previous_url': previous_url, 'next_url': next_url,
+                                                         'version': version})
@@ -1,43 +1,37 @@
 import os
 import django
 
-from quotes.utils import get_mongodb
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hw_project.settings")
 django.setup()
 
-from quotes.models import Quote, Tag, Author  # noqa
+from quotes.ingest import ParsedAuthor, ParsedQuote, ingest  # noqa
+from quotes.utils import get_mongodb  # noqa
 
+BATCH_SIZE = 1000
 
-db = get_mongodb()
 
-authors = db.authors.find()
+db = get_mongodb()
 
-for author in authors:
-    Author.objects.get_or_create(
-        fullname = author['fullname'],
-        born_date = author['born_date'],
-        born_location = author['born_location'],
-        description = author['description']
+authors = {
+    author['_id']: ParsedAuthor(
+        fullname=author['fullname'],
+        born_date=author['born_date'],
+        born_location=author['born_location'],
+        description=author['description'],
     )
-
-quotes = db.quotes.find()
-
-for quote in quotes:
-    tags = []
-    for tag in quote['tags']:
-        tag_name = tag[:100]
-        t, *_ = Tag.objects.get_or_create(name=tag_name)
-        tags.append(t)
-
-    exist_quote = bool(len(Quote.objects.filter(quote=quote['quote'])))
-
-    if not exist_quote:
-        author = db.authors.find_one({'_id': quote['author']})
-        a = Author.objects.get(fullname=author['fullname'])
-        q = Quote.objects.create(
-            quote=quote['quote'],
-            author=a
-        )
-        for tag in tags:
-            q.tags.add(tag)
\ No newline at end of file
+    for author in db.authors.find()
+}
+result = ingest([], authors.values())
+
+batch = []
+for quote in db.quotes.find():
+    author = authors.get(quote['author'])
+    if author is None:
+        continue
+    batch.append(ParsedQuote(quote=quote['quote'], author=author.fullname, tags=[tag[:100] for tag in quote['tags']]))
+    if len(batch) == BATCH_SIZE:
+        result += ingest(batch)
+        batch = []
+result += ingest(batch)
+
+print(f'Migrated: {result}')
@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from src.conf.logging_config import setup_logging
+from src.database.db import sessionmanager
+from src.services.blocking import email_key, name_key, phone_key
+
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill(batch_size: int, pause: float, recompute: bool, after_id: int):
+    # Fills in the blocking keys of contacts saved before they existed, in id
+    # order, one short transaction per batch. Rows without an email key have
+    # not been done yet, so a stopped run picks up where it left off; --all
+    # recomputes every row, e.g. after the key functions change. FOR UPDATE
+    # makes a concurrent edit wait, so the keys never lag behind the row.
+    condition = '' if recompute else 'AND email_key IS NULL'
+    last_id, total = after_id, 0
+    while True:
+        async with sessionmanager.session() as db:
+            rows = (await db.execute(text(f"""
+                SELECT id, first_name, last_name, email, phone FROM contacts
+                WHERE id > :last_id {condition}
+                ORDER BY id LIMIT :limit
+                FOR UPDATE
+            """), {'last_id': last_id, 'limit': batch_size})).all()
+            if not rows:
+                break
+            await db.execute(text(
+                "UPDATE contacts SET email_key = :email_key, phone_key = :phone_key, name_key = :name_key "
+                "WHERE id = :id"
+            ), [{'id': row.id, 'email_key': email_key(row.email), 'phone_key': phone_key(row.phone),
+                 'name_key': name_key(row.first_name, row.last_name)} for row in rows])
+            await db.commit()
+        last_id, total = rows[-1].id, total + len(rows)
+        logger.info("Updated %s rows up to id %s", total, last_id)
+        if pause:
+            await asyncio.sleep(pause)
+    logger.info("Backfill finished, %s rows updated", total)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fill in the duplicate detection keys of existing contacts')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds to sleep between batches')
+    parser.add_argument('--all', action='store_true', help='recompute the keys of every contact')
+    parser.add_argument('--after-id', type=int, default=0, help='skip contacts up to this id')
+    args = parser.parse_args()
+    setup_logging()
+
+    asyncio.run(backfill(args.batch_size, args.pause, args.all, args.after_id))
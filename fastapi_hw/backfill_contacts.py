@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from src.conf.logging_config import setup_logging
+from src.database.db import sessionmanager
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = 'id, first_name, last_name, email, phone, birthday, description, user_id, created_at, updated_at'
+
+
+async def backfill(batch_size: int, pause: float):
+    # Copies contacts into contacts_p in id ranges, one short transaction each.
+    # FOR SHARE makes a concurrent delete wait for the copy, so the sync
+    # trigger then removes the copied row as well. Progress is kept in
+    # contacts_backfill, so the script can be stopped and started again.
+    async with sessionmanager.session() as db:
+        last_id = (await db.execute(text("SELECT last_id FROM contacts_backfill WHERE id = 1"))).scalar_one()
+        max_id = (await db.execute(text("SELECT coalesce(max(id), 0) FROM contacts"))).scalar_one()
+    logger.info("Backfilling contacts %s..%s in batches of %s", last_id + 1, max_id, batch_size)
+
+    while last_id < max_id:
+        upper = min(last_id + batch_size, max_id)
+        async with sessionmanager.session() as db:
+            result = await db.execute(text(f"""
+                INSERT INTO contacts_p ({COLUMNS})
+                SELECT {COLUMNS} FROM contacts
+                WHERE id > :lower AND id <= :upper AND user_id IS NOT NULL
+                FOR SHARE
+                ON CONFLICT (id, user_id) DO NOTHING
+            """), {'lower': last_id, 'upper': upper})
+            await db.execute(text("UPDATE contacts_backfill SET last_id = :upper WHERE id = 1"), {'upper': upper})
+            await db.commit()
+        logger.info("Copied %s rows up to id %s", result.rowcount, upper)
+        last_id = upper
+        if pause:
+            await asyncio.sleep(pause)
+
+    async with sessionmanager.session() as db:
+        # Rows inserted after max_id was read were copied by the trigger.
+        await db.execute(text("UPDATE contacts_backfill SET completed_at = now() WHERE id = 1"))
+        await db.commit()
+    logger.info("Backfill finished")
+
+
+async def verify():
+    async with sessionmanager.session() as db:
+        source = (await db.execute(text("SELECT count(*) FROM contacts WHERE user_id IS NOT NULL"))).scalar_one()
+        target = (await db.execute(text("SELECT count(*) FROM contacts_p"))).scalar_one()
+        orphans = (await db.execute(text("SELECT count(*) FROM contacts WHERE user_id IS NULL"))).scalar_one()
+    logger.info("contacts: %s, contacts_p: %s, without user (not copied): %s", source, target, orphans)
+    return source == target
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Copy contacts into the hash-partitioned contacts_p table')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds to sleep between batches')
+    parser.add_argument('--verify', action='store_true', help='only compare row counts')
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.verify:
+        raise SystemExit(0 if asyncio.run(verify()) else 1)
+    asyncio.run(backfill(args.batch_size, args.pause))
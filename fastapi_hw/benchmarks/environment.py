@@ -0,0 +1,69 @@
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULTS = {
+    'DB_URL': f'sqlite+aiosqlite:///{BASE_DIR / "benchmarks" / "bench.sqlite3"}',
+    'SECRET_KEY_JWT': 'benchmark-secret',
+    'ALGORITHM': 'HS256',
+    'MAIL_USERNAME': 'bench@example.com',
+    'MAIL_PASSWORD': 'bench',
+    'MAIL_FROM': 'bench@example.com',
+    'MAIL_PORT': '465',
+    'MAIL_SERVER': 'localhost',
+    'REDIS_DOMAIN': 'localhost',
+    'REDIS_PORT': '6379',
+    'REDIS_PASSWORD': '',
+    'CLD_NAME': 'bench',
+    'CLD_API_KEY': '0',
+    'CLD_API_SECRET': 'bench',
+    'LOG_LEVEL': 'WARNING',
+    'JOBS_BACKEND': 'memory',
+    'EVENTS_BACKEND': 'memory',
+    'CACHE_USE_REDIS_LOCK': 'False',
+}
+
+
+def setup(use_fakeredis: bool = True) -> None:
+    # Must run before anything under src is imported: config is read and the
+    # Redis clients are created at import time.
+    for key, value in DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+    if use_fakeredis:
+        import fakeredis
+        import redis
+        import redis.asyncio
+
+        redis.Redis = fakeredis.FakeRedis
+        redis.asyncio.Redis = fakeredis.FakeAsyncRedis
+
+    # main.py mounts STATIC_DIR; src/static is not kept in the repository.
+    os.environ.setdefault('STATIC_DIR', tempfile.mkdtemp(prefix='bench-static-'))
+
+    if os.environ['DB_URL'].startswith('sqlite'):
+        use_date_defaults()
+
+
+def use_date_defaults() -> None:
+    # users.created_at/updated_at are Date columns defaulting to now(), which
+    # SQLite stores as a timestamp that no longer reads back as a date.
+    # Setting them here keeps the column defaults out of the INSERT/UPDATE.
+    from sqlalchemy import event
+    from sqlalchemy.orm.attributes import flag_modified
+
+    from src.entity.models import User
+
+    @event.listens_for(User, 'before_insert')
+    def set_created(mapper, connection, user):
+        user.created_at = user.created_at or date.today()
+        user.updated_at = user.updated_at or date.today()
+
+    @event.listens_for(User, 'before_update')
+    def set_updated(mapper, connection, user):
+        # Flagged, so an unchanged date still goes into the UPDATE.
+        user.updated_at = date.today()
+        flag_modified(user, 'updated_at')
@@ -0,0 +1,63 @@
+import asyncio
+import random
+import time
+
+import httpx
+
+from benchmarks.seed import PASSWORD, user_email
+from benchmarks.stats import summarize
+
+
+def scenarios(users: int) -> dict:
+    def login(rng: random.Random) -> dict:
+        return {'method': 'POST', 'url': '/auth/login',
+                'data': {'username': user_email(rng.randint(1, users)), 'password': PASSWORD}}
+
+    return {
+        'POST /auth/login': login,
+        'GET /contacts/all': lambda rng: {'method': 'GET', 'url': '/contacts/all',
+                                          'params': {'limit': 20, 'offset': rng.randrange(0, 40, 10)}},
+        'GET /contacts/search': lambda rng: {'method': 'GET', 'url': '/contacts/search',
+                                             'params': {'last_name': rng.choice(['smi', 'ko', 'bro'])}},
+        'GET /contacts/birthdays': lambda rng: {'method': 'GET', 'url': '/contacts/birthdays'},
+    }
+
+
+async def run_scenario(app, build, tokens: list[str], requests: int, concurrency: int, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    pending = [build(rng) for _ in range(requests)]
+    samples, errors = [], 0
+
+    async def client_loop(client: httpx.AsyncClient, index: int):
+        nonlocal errors
+        headers = {'Authorization': f'Bearer {tokens[index % len(tokens)]}'}
+        while pending:
+            request = pending.pop()
+            start = time.perf_counter()
+            response = await client.request(headers=headers, **request)
+            samples.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench',
+                                 headers={'user-agent': 'benchmark'}) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(samples, elapsed, errors)
+
+
+async def run_load(users: int, requests: int, concurrency: int, seed_value: int = 42) -> dict:
+    from main import app
+    from src.services.auth import auth_service
+
+    async with app.router.lifespan_context(app):
+        tokens = [await auth_service.create_access_token(data={'sub': user_email(index)})
+                  for index in range(1, min(users, concurrency) + 1)]
+        results = {}
+        for name, build in scenarios(users).items():
+            # Login hashes a password per request; keep its share of the run small.
+            count = max(requests // 10, concurrency) if name == 'POST /auth/login' else requests
+            results[name] = await run_scenario(app, build, tokens, count, concurrency, seed_value)
+    return results
@@ -0,0 +1,54 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable
+
+from benchmarks.seed import user_email
+from benchmarks.stats import summarize
+from src.database.db import sessionmanager
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.services.auth import auth_service
+from src.services.sync import SyncToken
+
+
+async def measure(fn: Callable[[], Awaitable[Any]], iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def run_micro(users: int, iterations: int, warmup: int) -> dict:
+    user = SimpleNamespace(id=users // 2 or 1)
+    email = user_email(user.id)
+    token = await auth_service.create_access_token(data={'sub': email})
+    today = date.today()
+    horizon = datetime.now(timezone.utc) + timedelta(seconds=1)
+
+    async def cold_user(db):
+        await auth_service.user_cache.delete(email)
+        return await auth_service.get_current_user(token, db)
+
+    cases: dict[str, Callable] = {
+        'repository.get_contacts': lambda db: repository_contacts.get_contacts(20, 0, db, user),
+        'repository.search_contact': lambda db: repository_contacts.search_contact('jo', None, None, db, user),
+        'repository.get_contact_birthday': lambda db: repository_contacts.get_contact_birthday(today, db, user),
+        'repository.get_contact_changes': lambda db: repository_contacts.get_contact_changes(
+            SyncToken(), horizon, 500, db, user),
+        'repository.get_duplicate_candidates': lambda db: repository_contacts.get_duplicate_candidates(db, user),
+        'repository.get_user_by_email': lambda db: repository_users.get_user_by_email(email, db),
+        'auth.get_current_user.cached': lambda db: auth_service.get_current_user(token, db),
+        'auth.get_current_user.uncached': cold_user,
+    }
+
+    results = {}
+    for name, case in cases.items():
+        async with sessionmanager.session() as db:
+            results[name] = await measure(lambda: case(db), iterations, warmup)
+    return results
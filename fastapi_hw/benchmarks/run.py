@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import environment
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    # A case regresses when its p50 or p99 grows by more than `tolerance`.
+    regressions = []
+    for section in ('micro', 'load'):
+        for name, stats in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if base is None:
+                continue
+            for metric in ('p50_ms', 'p99_ms'):
+                if base[metric] and stats[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f'{section} {name} {metric}: {base[metric]} -> {stats[metric]}')
+            if stats.get('errors') and not base.get('errors'):
+                regressions.append(f'{section} {name}: {stats["errors"]} errors')
+    return regressions
+
+
+async def run(args) -> dict:
+    from benchmarks.load import run_load
+    from benchmarks.micro import run_micro
+    from benchmarks.seed import seed
+    from src.conf.config import config
+
+    if not args.no_seed:
+        await seed(args.users, args.contacts, args.seed)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': config.DB_URL.split(':', 1)[0],
+            'users': args.users,
+            'contacts_per_user': args.contacts,
+            'seed': args.seed,
+            'seeded': not args.no_seed,
+        },
+        'micro': await run_micro(args.users, args.iterations, args.warmup),
+        'load': await run_load(args.users, args.requests, args.concurrency, args.seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the FastAPI service')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--contacts', type=int, default=100, help='contacts per user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-seed', action='store_true', help='reuse the data already in DB_URL')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint in the load test')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--real-redis', action='store_true', help='use REDIS_* instead of fakeredis')
+    parser.add_argument('--output', type=Path, help='defaults to benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', type=Path, help='baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    environment.setup(use_fakeredis=not args.real_redis)
+    results = asyncio.run(run(args))
+
+    output = args.output or RESULTS_DIR / f'{results["meta"]["commit"] or "latest"}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f'Results written to {output}')
+    for section in ('micro', 'load'):
+        for name, stats in results[section].items():
+            print(f'{section:5} {name:40} p50 {stats["p50_ms"]:>9} ms  p99 {stats["p99_ms"]:>9} ms  '
+                  f'{stats["throughput_rps"]:>8} req/s  errors {stats["errors"]}')
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from src.database.db import sessionmanager
+from src.entity.models import Base, Contact, User
+from src.services.auth import auth_service
+from src.services.blocking import email_key, name_key, phone_key
+
+PASSWORD = 'secret1'
+FIRST_NAMES = ['John', 'Jane', 'Alex', 'Maria', 'Ivan', 'Olena', 'Petro', 'Anna', 'Oleh', 'Sofia', 'Taras', 'Iryna']
+LAST_NAMES = ['Smith', 'Shevchenko', 'Kovalenko', 'Bondarenko', 'Tkachenko', 'Brown', 'Melnyk', 'Kravchenko']
+
+
+def user_email(index: int) -> str:
+    return f'user{index}@bench.example.com'
+
+
+def contact_row(rng: random.Random, user_id: int, index: int, now: datetime) -> dict:
+    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = f'{first_name.lower()}.{last_name.lower()}{index}@example.com'
+    phone = f'050{rng.randrange(10 ** 7):07d}'
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        'phone': phone,
+        'birthday': date(1960, 1, 1) + timedelta(days=rng.randrange(365 * 40)),
+        'description': f'Contact number {index}',
+        'email_key': email_key(email),
+        'phone_key': phone_key(phone),
+        'name_key': name_key(first_name, last_name),
+        'user_id': user_id,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+async def seed(users: int, contacts_per_user: int, seed_value: int = 42, chunk: int = 5000) -> None:
+    # Rebuilds the schema and fills it with deterministic data, so runs on the
+    # same scale and seed are comparable.
+    rng = random.Random(seed_value)
+    password = auth_service.get_password_hash(PASSWORD)
+    today, now = date.today(), datetime.now(timezone.utc)
+
+    async with sessionmanager._engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {'id': index, 'username': f'user{index}', 'email': user_email(index), 'password': password,
+             'avatar': 'https://example.com/avatar.png', 'confirmed': True, 'created_at': today, 'updated_at': today}
+            for index in range(1, users + 1)
+        ])
+        rows = []
+        for user_id in range(1, users + 1):
+            for index in range(contacts_per_user):
+                rows.append(contact_row(rng, user_id, index, now))
+                if len(rows) >= chunk:
+                    await conn.execute(insert(Contact), rows)
+                    rows = []
+        if rows:
+            await conn.execute(insert(Contact), rows)
@@ -0,0 +1,19 @@
+import statistics
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: float, errors: int = 0) -> dict:
+    # Latencies are reported in milliseconds.
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3) if samples else None,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3) if samples else None,
+        'p99_ms': round(percentile(samples, 99) * 1000, 3) if samples else None,
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+    }
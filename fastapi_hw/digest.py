@@ -0,0 +1,39 @@
+import argparse
+import asyncio
+import logging
+import signal
+from datetime import date
+
+from src.conf.logging_config import setup_logging
+from src.database.db import sessionmanager
+from src.services.birthdays import BirthdayDigest
+from src.services.mail import mail_pool
+from src.services.tracing import instrument_sqlalchemy, tracer
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run(once: bool, run_date: date | None):
+    if tracer.enabled:
+        instrument_sqlalchemy(sessionmanager._engine.sync_engine)
+    digest = BirthdayDigest()
+    task = asyncio.create_task(digest.run(run_date) if once else digest.run_forever())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        logger.info("Birthday digest stopped")
+    finally:
+        await mail_pool.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Send daily birthday digest emails')
+    parser.add_argument('--once', action='store_true', help='send the digest for one day and exit')
+    parser.add_argument('--date', type=date.fromisoformat, default=None, help='run date for --once (YYYY-MM-DD)')
+    args = parser.parse_args()
+    setup_logging()
+    asyncio.run(run(args.once, args.date))
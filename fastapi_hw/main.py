@@ -1,9 +1,9 @@
+import asyncio
 import re
 from typing import Callable
 import logging
 
 import redis.asyncio as redis
-from pathlib import Path
 from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,19 +12,33 @@ from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
+from src.database.db import get_db, sessionmanager
+from src.middleware.admission import AdmissionControlMiddleware, admission_controller
+from src.middleware.profiling import ProfilingMiddleware
+from src.middleware.tracing import TracingMiddleware
 from src.routes.contacts import router as contacts_router
 from src.routes.auth import router as auth_router
 from src.routes.users import router as users_router
-from src.conf.config import config
-
-
-logging.basicConfig(level=logging.INFO)
+from src.routes.profiler import get_admin_user, router as profiler_router
+from src.conf.config import BASE_DIR, config
+from src.conf.logging_config import setup_logging
+from src.database.redis import redis_client
+from src.services.auth import auth_service
+from src.services.events import event_broker
+from src.services.jobs import InMemoryQueue, Worker, job_queue
+from src.services.mail import mail_pool, precompile_templates
+from src.services.tracing import instrument_redis, instrument_sqlalchemy, tracer
+
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 origins = ['*']
 
+app.add_middleware(ProfilingMiddleware, interval=config.PROFILER_INTERVAL)
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller,
+                   retry_after=config.ADMISSION_RETRY_AFTER)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -43,19 +57,43 @@ async def user_agent_ban_middleware(request: Request, call_next: Callable):
     response = await call_next(request)
     return response
 
+# Added last, so it wraps every other middleware and times the whole request.
+app.add_middleware(TracingMiddleware)
+
 
-BASE_DIR = Path(__file__).resolve().parent
-app.mount('/static', StaticFiles(directory=BASE_DIR / 'src' / 'static'), name='static')
+app.mount('/static', StaticFiles(directory=BASE_DIR / config.STATIC_DIR), name='static')
+if config.AVATAR_STORAGE == 'local':
+    (BASE_DIR / config.AVATAR_LOCAL_DIR).mkdir(parents=True, exist_ok=True)
+    app.mount(config.AVATAR_LOCAL_URL.rstrip('/'), StaticFiles(directory=BASE_DIR / config.AVATAR_LOCAL_DIR), name='media')
 
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(contacts_router)
+app.include_router(profiler_router)
 
 
 @app.on_event('startup')
 async def startup():
     r = await redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT, db=0, password=config.REDIS_PASSWORD)
     await FastAPILimiter.init(r)
+    if tracer.enabled:
+        instrument_sqlalchemy(sessionmanager._engine.sync_engine)
+        for client in (redis_client, auth_service.cache, r):
+            instrument_redis(client)
+    precompile_templates()
+    if isinstance(job_queue, InMemoryQueue):
+        import src.services.tasks  # noqa
+        app.state.job_worker = Worker(job_queue)
+        app.state.job_worker_task = asyncio.create_task(app.state.job_worker.run())
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    if hasattr(app.state, 'job_worker'):
+        app.state.job_worker.stop()
+        await app.state.job_worker_task
+    await event_broker.close()
+    await mail_pool.close()
 
 
 @app.get('/')
@@ -71,5 +109,17 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
             raise HTTPException(status_code=500, detail='Database is not configured correctly')
         return {"message": "Service is running!"}
     except Exception as err:
-        logging.error(f"Database connection error: {err}")
-        raise HTTPException(status_code=500, detail='Database connection error')
\ No newline at end of file
+        logger.error("Database connection error: %s", err)
+        raise HTTPException(status_code=500, detail='Database connection error')
+
+@app.get('/api/jobs/metrics', dependencies=[Depends(get_admin_user)])
+async def jobs_metrics():
+    return await job_queue.metrics()
+
+@app.get('/api/events/metrics', dependencies=[Depends(get_admin_user)])
+async def events_metrics():
+    return event_broker.metrics()
+
+@app.get('/api/admission/metrics', dependencies=[Depends(get_admin_user)])
+async def admission_metrics():
+    return admission_controller.metrics()
@@ -0,0 +1,39 @@
+"""birthday digest
+
+Revision ID: 8e41f6c3a907
+Revises: 5c0e7a9d2b14
+Create Date: 2026-10-19 14:31:05.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41f6c3a907'
+down_revision: Union[str, None] = '5c0e7a9d2b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('digest_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_date', sa.Date(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('run_date')
+    )
+    # Matches the EXTRACT(month/day FROM birthday) filter of the digest scan.
+    op.create_index('ix_contacts_birthday_month_day', 'contacts',
+                    [sa.text('EXTRACT(month FROM birthday)'), sa.text('EXTRACT(day FROM birthday)'), 'user_id'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_birthday_month_day', table_name='contacts')
+    op.drop_table('digest_checkpoints')
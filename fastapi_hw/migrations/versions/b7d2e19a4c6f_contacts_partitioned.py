@@ -0,0 +1,98 @@
+"""contacts partitioned
+
+Revision ID: b7d2e19a4c6f
+Revises: 8e41f6c3a907
+Create Date: 2026-10-19 15:02:47.611384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e19a4c6f'
+down_revision: Union[str, None] = '8e41f6c3a907'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+COLUMNS = ('id', 'first_name', 'last_name', 'email', 'phone', 'birthday', 'description', 'user_id', 'created_at',
+           'updated_at')
+
+
+def upgrade() -> None:
+    # Step 1 of 3: create contacts_p, hash-partitioned by user_id, and keep it in
+    # sync with contacts through a trigger. Step 2 is backfill_contacts.py,
+    # step 3 the swap revision c3a8f5d1e072.
+    op.execute("""
+        CREATE TABLE contacts_p (
+            id integer NOT NULL DEFAULT nextval('contacts_id_seq'),
+            first_name varchar(50) NOT NULL,
+            last_name varchar(50) NOT NULL,
+            email varchar(150) NOT NULL,
+            phone varchar(15) NOT NULL,
+            birthday date NOT NULL,
+            description varchar(250) NOT NULL,
+            user_id integer NOT NULL REFERENCES users (id),
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            updated_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT contacts_p_pkey PRIMARY KEY (id, user_id)
+        ) PARTITION BY HASH (user_id)
+    """)
+    for remainder in range(PARTITIONS):
+        op.execute(f"""
+            CREATE TABLE contacts_p_{remainder:02d} PARTITION OF contacts_p
+            FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})
+        """)
+
+    # Indexes on the parent are created on every partition.
+    op.create_index('ix_contacts_p_user_id_email', 'contacts_p', ['user_id', 'email'])
+    op.create_index('ix_contacts_p_user_id_updated_at', 'contacts_p', ['user_id', 'updated_at', 'id'])
+    op.create_index('ix_contacts_p_birthday_month_day', 'contacts_p',
+                    [sa.text('EXTRACT(month FROM birthday)'), sa.text('EXTRACT(day FROM birthday)'), 'user_id'])
+
+    op.create_table('contacts_backfill',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # With no rows to copy there is nothing for backfill_contacts.py to do:
+    # everything written from now on is copied by the trigger.
+    op.execute("INSERT INTO contacts_backfill (id, last_id, completed_at) "
+               "SELECT 1, 0, CASE WHEN EXISTS (SELECT 1 FROM contacts) THEN NULL ELSE now() END")
+
+    columns = ', '.join(COLUMNS)
+    new_columns = ', '.join(f'NEW.{column}' for column in COLUMNS)
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in COLUMNS if column not in ('id', 'user_id'))
+    op.execute(f"""
+        CREATE FUNCTION contacts_sync_partitioned() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+                DELETE FROM contacts_p WHERE id = OLD.id AND user_id = OLD.user_id;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            IF NEW.user_id IS NOT NULL THEN
+                INSERT INTO contacts_p ({columns}) VALUES ({new_columns})
+                ON CONFLICT (id, user_id) DO UPDATE SET {updates};
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_sync_partitioned
+        AFTER INSERT OR UPDATE OR DELETE ON contacts
+        FOR EACH ROW EXECUTE FUNCTION contacts_sync_partitioned()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER contacts_sync_partitioned ON contacts")
+    op.execute("DROP FUNCTION contacts_sync_partitioned()")
+    op.drop_table('contacts_backfill')
+    op.execute("DROP TABLE contacts_p")
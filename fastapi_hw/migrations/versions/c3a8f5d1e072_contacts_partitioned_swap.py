@@ -0,0 +1,136 @@
+"""contacts partitioned swap
+
+Revision ID: c3a8f5d1e072
+Revises: b7d2e19a4c6f
+Create Date: 2026-10-19 15:20:13.092845
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8f5d1e072'
+down_revision: Union[str, None] = 'b7d2e19a4c6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+COLUMNS = ('id', 'first_name', 'last_name', 'email', 'phone', 'birthday', 'description', 'user_id', 'created_at',
+           'updated_at')
+INDEXES = ('ix_contacts_user_id_updated_at', 'ix_contacts_birthday_month_day')
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def missing_rows(conn, after_id: int) -> bool:
+    # Rows past after_id that are not in contacts_p yet.
+    return conn.execute(sa.text("""
+        SELECT EXISTS (SELECT 1 FROM contacts c WHERE c.id > :after_id AND c.user_id IS NOT NULL
+                       AND NOT EXISTS (SELECT 1 FROM contacts_p p WHERE p.id = c.id AND p.user_id = c.user_id))
+    """), {'after_id': after_id}).scalar()
+
+
+def upgrade() -> None:
+    # Step 3 of 3: swap the partitioned table in. Completeness is checked
+    # before the lock is taken; under the lock only the rows written since
+    # are rechecked and the tables renamed. The old table is kept as
+    # contacts_old and can be dropped once the new one has been checked.
+    conn = op.get_bind()
+    last_id, completed = conn.execute(sa.text("SELECT last_id, completed_at FROM contacts_backfill WHERE id = 1")).one()
+    checked_id = conn.execute(sa.text("SELECT coalesce(max(id), 0) FROM contacts")).scalar()
+    if completed is None and missing_rows(conn, last_id):
+        raise RuntimeError('contacts backfill is not finished, run backfill_contacts.py first')
+    orphans = conn.execute(sa.text("SELECT count(*) FROM contacts WHERE user_id IS NULL")).scalar()
+    if orphans:
+        logger.warning("%s contacts without a user are not copied and stay in contacts_old", orphans)
+
+    op.execute("LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE")
+    if completed is None and missing_rows(conn, checked_id):
+        raise RuntimeError('contacts changed while the backfill was checked, run the migration again')
+
+    op.execute("DROP TRIGGER contacts_sync_partitioned ON contacts")
+    op.execute("DROP FUNCTION contacts_sync_partitioned()")
+    op.drop_table('contacts_backfill')
+
+    op.execute("ALTER TABLE contacts RENAME TO contacts_old")
+    op.execute("ALTER TABLE contacts_old RENAME CONSTRAINT contacts_pkey TO contacts_old_pkey")
+    op.execute("ALTER TABLE contacts_old ALTER COLUMN id DROP DEFAULT")
+    for index in INDEXES:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index.replace('ix_contacts_', 'ix_contacts_old_')}")
+
+    op.execute("ALTER TABLE contacts_p RENAME TO contacts")
+    op.execute("ALTER TABLE contacts RENAME CONSTRAINT contacts_p_pkey TO contacts_pkey")
+    for index in INDEXES + ('ix_contacts_user_id_email',):
+        op.execute(f"ALTER INDEX {index.replace('ix_contacts_', 'ix_contacts_p_')} RENAME TO {index}")
+    for remainder in range(PARTITIONS):
+        op.execute(f"ALTER TABLE contacts_p_{remainder:02d} RENAME TO contacts_{remainder:02d}")
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+
+
+def downgrade() -> None:
+    # Copies rows written since the swap back into contacts_old before
+    # putting it back in place, then restores the step 1 state. Contacts
+    # without a user were never copied, so they are not deleted.
+    columns = ', '.join(COLUMNS)
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in COLUMNS if column != 'id')
+    op.execute("LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE")
+    op.execute("""
+        DELETE FROM contacts_old o
+        WHERE o.user_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM contacts c WHERE c.id = o.id)
+    """)
+    op.execute(f"""
+        INSERT INTO contacts_old ({columns}) SELECT {columns} FROM contacts
+        ON CONFLICT (id) DO UPDATE SET {updates}
+    """)
+
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts_old.id")
+    for remainder in range(PARTITIONS):
+        op.execute(f"ALTER TABLE contacts_{remainder:02d} RENAME TO contacts_p_{remainder:02d}")
+    for index in INDEXES + ('ix_contacts_user_id_email',):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index.replace('ix_contacts_', 'ix_contacts_p_')}")
+    op.execute("ALTER TABLE contacts RENAME CONSTRAINT contacts_pkey TO contacts_p_pkey")
+    op.execute("ALTER TABLE contacts RENAME TO contacts_p")
+
+    for index in INDEXES:
+        op.execute(f"ALTER INDEX {index.replace('ix_contacts_', 'ix_contacts_old_')} RENAME TO {index}")
+    op.execute("ALTER TABLE contacts_old ALTER COLUMN id SET DEFAULT nextval('contacts_id_seq')")
+    op.execute("ALTER TABLE contacts_old RENAME CONSTRAINT contacts_old_pkey TO contacts_pkey")
+    op.execute("ALTER TABLE contacts_old RENAME TO contacts")
+
+    op.create_table('contacts_backfill',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO contacts_backfill (id, last_id, completed_at) "
+               "SELECT 1, coalesce(max(id), 0), now() FROM contacts")
+
+    new_columns = ', '.join(f'NEW.{column}' for column in COLUMNS)
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in COLUMNS if column not in ('id', 'user_id'))
+    op.execute(f"""
+        CREATE FUNCTION contacts_sync_partitioned() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+                DELETE FROM contacts_p WHERE id = OLD.id AND user_id = OLD.user_id;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            IF NEW.user_id IS NOT NULL THEN
+                INSERT INTO contacts_p ({columns}) VALUES ({new_columns})
+                ON CONFLICT (id, user_id) DO UPDATE SET {updates};
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_sync_partitioned
+        AFTER INSERT OR UPDATE OR DELETE ON contacts
+        FOR EACH ROW EXECUTE FUNCTION contacts_sync_partitioned()
+    """)
@@ -0,0 +1,69 @@
+"""contact blocking keys
+
+Revision ID: d9f4b2a6e815
+Revises: c3a8f5d1e072
+Create Date: 2026-10-19 15:48:22.530176
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f4b2a6e815'
+down_revision: Union[str, None] = 'c3a8f5d1e072'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PARTITIONS = 16
+INDEXES = {
+    'ix_contacts_user_id_email_key': 'email_key',
+    'ix_contacts_user_id_phone_key': 'phone_key',
+    'ix_contacts_user_id_name_key': 'name_key',
+}
+
+
+def build_partition_index(conn, index: str, partition: str, column: str) -> None:
+    # A build that failed half way leaves an invalid index behind; it is
+    # dropped and built again, a valid one is kept, so the upgrade can be rerun.
+    valid = conn.execute(sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index)"),
+                         {'index': index}).scalar()
+    if valid is False:
+        op.execute(f"DROP INDEX CONCURRENTLY {index}")
+    if not valid:
+        op.execute(f"CREATE INDEX CONCURRENTLY {index} ON {partition} (user_id, {column})")
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS email_key VARCHAR(150)")
+    op.execute("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS phone_key VARCHAR(15)")
+    op.execute("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS name_key VARCHAR(8)")
+
+    # contacts is partitioned: CREATE INDEX on it would block writes to every
+    # partition for the whole build, and CONCURRENTLY is not supported there.
+    # The parent index is created ON ONLY, empty and invalid, then each
+    # partition's index is built concurrently outside the transaction and
+    # attached; the parent turns valid once all partitions are attached.
+    for index, column in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {index} ON ONLY contacts (user_id, {column})")
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        for index, column in INDEXES.items():
+            for remainder in range(PARTITIONS):
+                partition_index = index.replace('ix_contacts_', f'ix_contacts_{remainder:02d}_')
+                build_partition_index(conn, partition_index, f'contacts_{remainder:02d}', column)
+                op.execute(f"ALTER INDEX {index} ATTACH PARTITION {partition_index}")
+    # Existing rows get their keys from backfill_blocking_keys.py, in short
+    # batches; new and edited rows get them on save.
+
+
+def downgrade() -> None:
+    # Dropping the parent index drops the partition indexes attached to it.
+    for index in reversed(INDEXES):
+        op.drop_index(index, table_name='contacts')
+    op.drop_column('contacts', 'name_key')
+    op.drop_column('contacts', 'phone_key')
+    op.drop_column('contacts', 'email_key')
@@ -1,6 +1,12 @@
+from pathlib import Path
+
 from pydantic import ConfigDict, field_validator, EmailStr
 from pydantic_settings import BaseSettings
 
+# Relative paths in the settings are resolved against the project root, not the working directory.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
 class Config(BaseSettings):
     DB_URL: str
     SECRET_KEY_JWT: str
@@ -10,12 +16,65 @@ class Config(BaseSettings):
     MAIL_FROM: str
     MAIL_PORT: int
     MAIL_SERVER: str
+    MAIL_FROM_NAME: str = 'HW Systems'
+    MAIL_SSL_TLS: bool = True
+    MAIL_STARTTLS: bool = False
+    MAIL_USE_CREDENTIALS: bool = True
+    MAIL_VALIDATE_CERTS: bool = True
+    MAIL_POOL_SIZE: int = 3
+    MAIL_POOL_IDLE_TIMEOUT: int = 60
     REDIS_DOMAIN: str
     REDIS_PORT: int
     REDIS_PASSWORD: str | None
     CLD_NAME: str
     CLD_API_KEY: int
     CLD_API_SECRET: str
+    STATIC_DIR: str = 'src/static'
+    LOG_LEVEL: str = 'INFO'
+    LOG_FORMAT: str = 'json'
+    LOG_SAMPLE_RATES: dict[str, float] = {'src.services.auth.requests': 0.01}
+    CONTACTS_SYNC_SAFETY_WINDOW: int = 2
+    EVENTS_BACKEND: str = 'redis'
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_INTERVAL: float = 15.0
+    DIGEST_DAYS_AHEAD: int = 7
+    DIGEST_BATCH_SIZE: int = 1000
+    DIGEST_SEND_HOUR: int = 8
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 30.0
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+    CACHE_USE_REDIS_LOCK: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 100
+    ADMISSION_RESERVED_CRITICAL: int = 10
+    ADMISSION_MAX_QUEUE: int = 50
+    ADMISSION_QUEUE_TIMEOUT: float = 0.5
+    ADMISSION_RETRY_AFTER: int = 1
+    ADMISSION_CRITICAL_PATHS: list[str] = ['/auth/', '/api/healthchecker']
+    ADMISSION_LOW_PATHS: list[str] = ['/contacts/search']
+    ADMISSION_EXEMPT_PATHS: list[str] = ['/contacts/stream']
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_EXPORTER: str = 'file'
+    TRACING_FILE: str = 'traces.jsonl'
+    TRACING_OTLP_ENDPOINT: str = 'http://localhost:4318'
+    TRACING_SERVICE_NAME: str = 'hw_13'
+    PROFILER_INTERVAL: float = 0.005
+    PROFILER_MAX_SECONDS: int = 60
+    PROFILER_TOKEN_TTL: int = 300
+    ADMIN_EMAILS: list[str] = []
+    JOBS_BACKEND: str = 'redis'
+    JOBS_PREFIX: str = 'jobs'
+    JOBS_CONCURRENCY: int = 10
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_BACKOFF_BASE: float = 2.0
+    JOBS_BACKOFF_MAX: float = 300.0
+    JOBS_VISIBILITY_TIMEOUT: int = 300
+    JOBS_DEDUP_TTL: int = 3600
+    AVATAR_STORAGE: str = 'cloudinary'
+    AVATAR_LOCAL_DIR: str = 'media'
+    AVATAR_LOCAL_URL: str = '/media/'
+    AVATAR_SIZE: int = 250
+    AVATAR_WORKERS: int = 2
 
     @field_validator('ALGORITHM')
     @classmethod
@@ -24,6 +83,41 @@ class Config(BaseSettings):
             raise ValueError('algorithm must be HS256')
         return v
 
+    @field_validator('AVATAR_STORAGE')
+    @classmethod
+    def validate_avatar_storage(cls, v):
+        if v not in ['cloudinary', 'local']:
+            raise ValueError('avatar storage must be cloudinary or local')
+        return v
+
+    @field_validator('LOG_FORMAT')
+    @classmethod
+    def validate_log_format(cls, v):
+        if v not in ['json', 'text']:
+            raise ValueError('log format must be json or text')
+        return v
+
+    @field_validator('EVENTS_BACKEND')
+    @classmethod
+    def validate_events_backend(cls, v):
+        if v not in ['redis', 'memory']:
+            raise ValueError('events backend must be redis or memory')
+        return v
+
+    @field_validator('TRACING_EXPORTER')
+    @classmethod
+    def validate_tracing_exporter(cls, v):
+        if v not in ['file', 'otlp']:
+            raise ValueError('tracing exporter must be file or otlp')
+        return v
+
+    @field_validator('JOBS_BACKEND')
+    @classmethod
+    def validate_jobs_backend(cls, v):
+        if v not in ['redis', 'memory']:
+            raise ValueError('jobs backend must be redis or memory')
+        return v
+
     model_config = ConfigDict(extra='ignore', env_file='.env', env_file_encoding='utf-8') # noqa
 
 config = Config()
\ No newline at end of file
@@ -5,6 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncEngine,async_sessionmaker,create_async_e
 
 from src.conf.config import config
 
+logger = logging.getLogger(__name__)
+
 
 class DataBaseSessionManager:
 
@@ -20,7 +22,7 @@ class DataBaseSessionManager:
         try:
             yield session
         except Exception as err:
-            logging.error(err)
+            logger.error(err)
             await session.rollback()
             raise
         finally:
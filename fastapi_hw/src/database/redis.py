@@ -0,0 +1,10 @@
+import redis.asyncio as redis
+
+from src.conf.config import config
+
+
+redis_client = redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT, db=0, password=config.REDIS_PASSWORD)
+
+
+async def get_redis():
+    return redis_client
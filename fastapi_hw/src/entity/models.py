@@ -1,7 +1,9 @@
-from datetime import date
+from datetime import date, datetime
 
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, relationship
-from sqlalchemy import String, Date, Integer, ForeignKey, func, Boolean
+from sqlalchemy import String, Date, DateTime, Integer, ForeignKey, Index, func, Boolean, event
+
+from src.services.blocking import email_key, name_key, phone_key
 
 
 class Base(DeclarativeBase):
@@ -18,9 +20,53 @@ class Contact(Base):
     birthday: Mapped[date] = mapped_column(Date)
     description: Mapped[str] = mapped_column(String(250))
 
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(),
+                                                 onupdate=func.now())
+
+    email_key: Mapped[str] = mapped_column(String(150), nullable=True)
+    phone_key: Mapped[str] = mapped_column(String(15), nullable=True)
+    name_key: Mapped[str] = mapped_column(String(8), nullable=True)
+
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=True)
     user:Mapped['User'] = relationship('User', backref='contacts', lazy='joined')
 
+    __table_args__ = (
+        Index('ix_contacts_user_id_updated_at', 'user_id', 'updated_at', 'id'),
+        Index('ix_contacts_user_id_email_key', 'user_id', 'email_key'),
+        Index('ix_contacts_user_id_phone_key', 'user_id', 'phone_key'),
+        Index('ix_contacts_user_id_name_key', 'user_id', 'name_key'),
+    )
+
+
+@event.listens_for(Contact, 'before_insert')
+@event.listens_for(Contact, 'before_update')
+def set_blocking_keys(mapper, connection, contact: Contact):
+    contact.email_key = email_key(contact.email)
+    contact.phone_key = phone_key(contact.phone)
+    contact.name_key = name_key(contact.first_name, contact.last_name)
+
+
+class ContactTombstone(Base):
+    __tablename__ = 'contact_tombstones'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    contact_id: Mapped[int] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'))
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_contact_tombstones_user_id_deleted_at', 'user_id', 'deleted_at', 'id'),
+    )
+
+
+class DigestCheckpoint(Base):
+    __tablename__ = 'digest_checkpoints'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    run_date: Mapped[date] = mapped_column(Date, unique=True)
+    last_user_id: Mapped[int] = mapped_column(Integer, default=0)
+    sent: Mapped[int] = mapped_column(Integer, default=0)
+    completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+
 
 class User(Base):
     __tablename__ ='users'
@@ -0,0 +1,132 @@
+import asyncio
+from collections import deque
+from enum import IntEnum
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.conf.config import config
+
+
+class Priority(IntEnum):
+    CRITICAL = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class AdmissionController:
+    # Bounds the number of requests a worker handles at once. Requests over the
+    # limit wait in a short per-priority queue and are woken highest priority
+    # first; the last `reserved` slots are only handed to CRITICAL requests.
+
+    def __init__(self, max_in_flight: int, reserved: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.reserved = reserved
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: dict[Priority, deque[asyncio.Future]] = {priority: deque() for priority in Priority}
+        self._stats = {priority: {'admitted': 0, 'queued': 0, 'shed': 0, 'timed_out': 0} for priority in Priority}
+
+    def _limit(self, priority: Priority) -> int:
+        return self.max_in_flight if priority == Priority.CRITICAL else self.max_in_flight - self.reserved
+
+    def _has_waiters(self, priority: Priority) -> bool:
+        return any(self._waiters[p] for p in Priority if p <= priority)
+
+    async def acquire(self, priority: Priority) -> bool:
+        stats = self._stats[priority]
+        if self.in_flight < self._limit(priority) and not self._has_waiters(priority):
+            self.in_flight += 1
+            stats['admitted'] += 1
+            return True
+
+        waiters = self._waiters[priority]
+        if len(waiters) >= self.max_queue:
+            stats['shed'] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        stats['queued'] += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done() or future.cancelled():
+                stats['timed_out'] += 1
+                stats['shed'] += 1
+                return False
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the client went away.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in waiters:
+                waiters.remove(future)
+        stats['admitted'] += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        for priority in Priority:
+            waiters = self._waiters[priority]
+            while waiters and self.in_flight < self._limit(priority):
+                future = waiters.popleft()
+                if not future.done():
+                    self.in_flight += 1
+                    future.set_result(True)
+                    return
+
+    def metrics(self) -> dict:
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'queued': {priority.name.lower(): len(self._waiters[priority]) for priority in Priority},
+            'totals': {priority.name.lower(): dict(self._stats[priority]) for priority in Priority},
+        }
+
+
+def classify(path: str) -> Priority:
+    if path == '/' or any(path.startswith(prefix) for prefix in config.ADMISSION_CRITICAL_PATHS):
+        return Priority.CRITICAL
+    if any(path.startswith(prefix) for prefix in config.ADMISSION_LOW_PATHS):
+        return Priority.LOW
+    return Priority.NORMAL
+
+
+class AdmissionControlMiddleware:
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, retry_after: int):
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Long-lived streams would hold a slot for as long as they stay open.
+        if scope['type'] != 'http' or scope['path'] in config.ADMISSION_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(classify(scope['path'])):
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={'detail': 'Server is overloaded, please retry later'},
+                headers={'Retry-After': str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+
+admission_controller = AdmissionController(
+    max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+    reserved=config.ADMISSION_RESERVED_CRITICAL,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+)
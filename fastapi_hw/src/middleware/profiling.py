@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.profiler import start_sampler, verify_profile_token
+
+
+class ProfilingMiddleware:
+    # A request carrying a valid signed X-Profile header is sampled on its own
+    # and answered with a speedscope profile instead of its normal body. The
+    # original status code is returned in X-Profiled-Status.
+
+    def __init__(self, app: ASGIApp, interval: float):
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        token = None
+        if scope['type'] == 'http':
+            token = dict(scope['headers']).get(b'x-profile')
+        if token is None or not verify_profile_token(token.decode('latin-1')):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+        sampler = start_sampler(self.interval, asyncio.current_task())
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            sampler.stop()
+
+        body = json.dumps(sampler.speedscope(f"{scope['method']} {scope['path']}")).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'x-profiled-status', str(status_code).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,45 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.tracing import current_span, tracer
+
+
+class TracingMiddleware:
+    # Opens the root span of a request, or continues the caller's trace when a
+    # W3C traceparent header is sent. Database, Redis and SMTP spans created
+    # while the request runs attach to it through the current_span context.
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        parent = dict(scope['headers']).get(b'traceparent')
+        span = tracer.start_span(f"HTTP {scope['method']}", 'server', parent.decode('latin-1') if parent else None,
+                                 **{'http.method': scope['method'], 'http.target': scope['path']})
+        token = current_span.set(span)
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                span.set('http.status_code', message['status'])
+                if span.sampled:
+                    message.setdefault('headers', [])
+                    message['headers'] = [*message['headers'], (b'traceparent', span.traceparent.encode())]
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            route = scope.get('route')
+            if route is not None and span.sampled:
+                # The route template keeps span names low-cardinality: /contacts/{contact_id}, not /contacts/42.
+                span.name = f"HTTP {scope['method']} {route.path}"
+                span.set('http.route', route.path)
+            current_span.reset(token)
+            tracer.end_span(span, error)
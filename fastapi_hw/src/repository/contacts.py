@@ -1,16 +1,24 @@
 import logging
 from datetime import date, timedelta
 
-from sqlalchemy import select, and_, or_, extract
+from sqlalchemy import select, and_, or_, extract, func, DateTime
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 
-from src.entity.models import Contact, User
-from src.schemas.contact import ContactSchema, ContactUpdateSchema
+from src.entity.models import Contact, ContactTombstone, User
+from src.schemas.contact import ContactSchema, ContactBatchSchema, ContactUpdateSchema, ContactSummaryResponse
+from src.services.events import event_broker
+from src.services.sync import Cursor, SyncToken
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def publish_contact_event(event_type: str, contact: Contact, user: User):
+    data = ContactSummaryResponse.model_validate(contact).model_dump(mode='json')
+    await event_broker.publish(user.id, event_type, data)
+
+
 async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User):
     stmt = select(Contact).filter(Contact.user_id == user.id).offset(offset).limit(limit)
     contacts = await db.execute(stmt)
@@ -34,18 +42,41 @@ async def create_contact(body: ContactSchema, db: AsyncSession, user: User):
         db.add(contact)
         await db.commit()
         await db.refresh(contact)
+        await publish_contact_event('contact.created', contact, user)
         return contact
     except Exception as err:
-        logger.error(f"Error creating contact in repository: {err}")
+        logger.error("Error creating contact in repository: %s", err)
         raise
 
 
+async def create_contacts(body: ContactBatchSchema, db: AsyncSession, user: User):
+    emails = [item.email for item in body.contacts]
+    if len(set(emails)) != len(emails):
+        raise ValueError("Duplicate emails in batch")
+    stmt = select(Contact.email).filter(Contact.user_id == user.id, Contact.email.in_(emails))
+    existing = (await db.execute(stmt)).scalars().all()
+    if existing:
+        raise ValueError(f"Email already exists: {', '.join(existing)}")
+
+    contacts = [Contact(**item.model_dump(exclude_unset=True), user_id=user.id) for item in body.contacts]
+    db.add_all(contacts)
+    await db.flush()
+    ids = [contact.id for contact in contacts]
+    await db.commit()
+
+    stmt = select(Contact).filter(Contact.id.in_(ids)).order_by(Contact.id)
+    contacts = (await db.execute(stmt)).unique().scalars().all()
+    for contact in contacts:
+        await publish_contact_event('contact.created', contact, user)
+    return contacts
+
+
 async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSession, user: User):
     stmt = select(Contact).filter(Contact.id == contact_id, Contact.user_id == user.id)
     result = await db.execute(stmt)
     contact = result.scalar_one_or_none()
     if not contact:
-        logger.warning(f"Contact with ID {contact_id} for user {user.id} not found.")
+        logger.warning("Contact with ID %s for user %s not found.", contact_id, user.id)
         return None
 
     if body.email:
@@ -60,6 +91,7 @@ async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSe
 
     await db.commit()
     await db.refresh(contact)
+    await publish_contact_event('contact.updated', contact, user)
     return contact
 
 
@@ -68,10 +100,12 @@ async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     result = await db.execute(stmt)
     contact = result.scalar_one_or_none()
     if not contact:
-        logger.warning(f"Contact with ID {contact_id} for user {user.id} not found.")
+        logger.warning("Contact with ID %s for user %s not found.", contact_id, user.id)
         return None
     await db.delete(contact)
+    db.add(ContactTombstone(contact_id=contact.id, user_id=user.id))
     await db.commit()
+    await event_broker.publish(user.id, 'contact.deleted', {'id': contact_id})
     return contact
 
 
@@ -94,7 +128,7 @@ async def get_contact_birthday(today: date, db: AsyncSession, user: User):
     start_month, start_day = start_date.month, start_date.day
     end_month, end_day = end_date.month, end_date.day
 
-    logger.info(f"Searching for contacts with birthdays between {start_date} and {end_date}")
+    logger.debug("Searching for contacts with birthdays between %s and %s", start_date, end_date)
 
     if start_month == 12 and end_month == 1:
         stmt = select(Contact).filter(
@@ -125,5 +159,102 @@ async def get_contact_birthday(today: date, db: AsyncSession, user: User):
         )
     result = await db.execute(stmt)
     contacts = result.scalars().all()
-    logger.info(f"Found {len(contacts)} contacts with upcoming birthdays")
-    return contacts
\ No newline at end of file
+    logger.debug("Found %d contacts with upcoming birthdays", len(contacts))
+    return contacts
+
+
+class sync_horizon(FunctionElement):
+    # now() minus the given seconds, on the database clock that stamps
+    # updated_at and deleted_at, so app server clock skew cannot move it.
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(sync_horizon, 'postgresql')
+def compile_sync_horizon(element, compiler, **kw):
+    return f"now() - make_interval(secs => {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(sync_horizon, 'sqlite')
+def compile_sync_horizon_sqlite(element, compiler, **kw):
+    return f"datetime('now', -({compiler.process(element.clauses, **kw)}) || ' seconds')"
+
+
+async def get_contact_changes(since: SyncToken, safety_window: int, limit: int, db: AsyncSession, user: User):
+    # Rows are only returned up to `safety_window` seconds ago, so a
+    # transaction that commits late with an older timestamp cannot be
+    # skipped by a client cursor.
+    horizon = sync_horizon(safety_window)
+    stmt = select(Contact).filter(
+        Contact.user_id == user.id,
+        Contact.updated_at < horizon,
+        or_(
+            Contact.updated_at > since.contacts.ts,
+            and_(Contact.updated_at == since.contacts.ts, Contact.id > since.contacts.id),
+        ),
+    ).order_by(Contact.updated_at, Contact.id).limit(limit + 1)
+    contacts = (await db.execute(stmt)).scalars().all()
+
+    stmt = select(ContactTombstone).filter(
+        ContactTombstone.user_id == user.id,
+        ContactTombstone.deleted_at < horizon,
+        or_(
+            ContactTombstone.deleted_at > since.tombstones.ts,
+            and_(ContactTombstone.deleted_at == since.tombstones.ts, ContactTombstone.id > since.tombstones.id),
+        ),
+    ).order_by(ContactTombstone.deleted_at, ContactTombstone.id).limit(limit + 1)
+    tombstones = (await db.execute(stmt)).scalars().all()
+
+    has_more = len(contacts) > limit or len(tombstones) > limit
+    contacts, tombstones = contacts[:limit], tombstones[:limit]
+    next_token = SyncToken(
+        contacts=Cursor(contacts[-1].updated_at, contacts[-1].id) if contacts else since.contacts,
+        tombstones=Cursor(tombstones[-1].deleted_at, tombstones[-1].id) if tombstones else since.tombstones,
+    )
+    return contacts, tombstones, next_token, has_more
+
+
+async def get_duplicate_candidates(db: AsyncSession, user: User):
+    # Only contacts sharing a blocking key with another contact can be duplicates.
+    shared = [
+        select(key).filter(Contact.user_id == user.id, key.is_not(None), key != '')
+        .group_by(key).having(func.count() > 1)
+        for key in (Contact.email_key, Contact.phone_key, Contact.name_key)
+    ]
+    stmt = select(Contact).filter(
+        Contact.user_id == user.id,
+        or_(Contact.email_key.in_(shared[0]), Contact.phone_key.in_(shared[1]), Contact.name_key.in_(shared[2])),
+    )
+    result = await db.execute(stmt)
+    return result.unique().scalars().all()
+
+
+async def merge_contacts(primary_id: int, duplicate_ids: list[int], db: AsyncSession, user: User,
+                         description: str | None = None):
+    ids = [primary_id, *duplicate_ids]
+    stmt = select(Contact).filter(Contact.id.in_(ids), Contact.user_id == user.id).with_for_update(of=Contact)
+    contacts = {contact.id: contact for contact in (await db.execute(stmt)).unique().scalars().all()}
+    if len(contacts) != len(set(ids)):
+        return None
+
+    primary = contacts.pop(primary_id)
+    if description is None:
+        descriptions = [primary.description]
+        for contact in contacts.values():
+            if contact.description not in descriptions:
+                descriptions.append(contact.description)
+        description = '; '.join(descriptions)
+        if len(description) > Contact.description.type.length:
+            raise ValueError(f'Merged description is longer than {Contact.description.type.length} characters, '
+                             f'pass the description to keep')
+    for contact in contacts.values():
+        await db.delete(contact)
+        db.add(ContactTombstone(contact_id=contact.id, user_id=user.id))
+    primary.description = description
+    await db.commit()
+    await db.refresh(primary)
+
+    for contact_id in contacts:
+        await event_broker.publish(user.id, 'contact.deleted', {'id': contact_id})
+    await publish_contact_event('contact.updated', primary, user)
+    return primary
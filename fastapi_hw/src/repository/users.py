@@ -9,6 +9,8 @@ from src.database.db import get_db
 from src.entity.models import User
 from src.schemas.user import UserSchema
 
+logger = logging.getLogger(__name__)
+
 
 async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
     stmt = select(User).filter_by(email=email)
@@ -22,7 +24,7 @@ async def create_user(body: UserSchema, db: AsyncSession):
         g = Gravatar(body.email)
         avatar = g.get_image()
     except Exception as err:
-        logging.error(err)
+        logger.error(err)
 
     new_user = User(**body.model_dump(), avatar=avatar)
     db.add(new_user)
@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request, Form
+from fastapi import APIRouter, HTTPException, Depends, status, Security, Request, Form
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
@@ -13,8 +13,7 @@ from src.repository import users as repository_users
 from src.schemas.user import UserSchema, UserResponse, TokenSchema, RequestEmail, PasswordResetRequestSchema, \
     PasswordResetConfirmSchema
 from src.services.auth import auth_service, RESET_TOKEN_EXPIRE_MINUTES
-from src.services.email import send_email
-from src.services.reset_pass import send_email_pass
+from src.services.jobs import job_queue
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 get_refresh_token = HTTPBearer()
@@ -73,12 +72,13 @@ async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     return {'message': 'Email confirmed'}
 
 @router.post('/request_email')
-async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def request_email(body: RequestEmail, request: Request, db: AsyncSession = Depends(get_db)):
     user = await repository_users.get_user_by_email(body.email, db)
     if user.confirmed:
         return {'message': 'Your email is already confirmed'}
     if user:
-        background_tasks.add_task(send_email, user.email, user.username, str(request.base_url))
+        await job_queue.enqueue('send_email', {'email': user.email, 'username': user.username, 'host': str(request.base_url)},
+                                dedup_key=f'send_email:{user.email}', dedup_ttl=60)
     return {'message': 'Check your email for confirmation.'}
 
 @router.post('/reset_password/{token}')
@@ -99,10 +99,11 @@ async def show_reset_password_form(request: Request, token: str):
     return templates.TemplateResponse('reset_password_form.html', {'request': request, 'token': token})
 
 @router.post('/request_reset_password', dependencies=[Depends(RateLimiter(times=1, seconds=60))])
-async def request_reset_password(body: PasswordResetRequestSchema, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def request_reset_password(body: PasswordResetRequestSchema, request: Request, db: AsyncSession = Depends(get_db)):
     user = await repository_users.get_user_by_email(body.email, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user:
-        background_tasks.add_task(send_email_pass, user.email, user.username, str(request.base_url))
+        await job_queue.enqueue('send_email_pass', {'email': user.email, 'username': user.username, 'host': str(request.base_url)},
+                                dedup_key=f'send_email_pass:{user.email}', dedup_ttl=60)
     return {'message': 'Password reset link sent, please, check your email.'}
\ No newline at end of file
@@ -1,30 +1,58 @@
 import logging
 from datetime import date
 
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
+from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.repository import contacts as repositories_contact
-from src.schemas.contact import ContactSchema, ContactUpdateSchema, ContactResponse
+from src.schemas.contact import (ContactSchema, ContactBatchSchema, ContactUpdateSchema, ContactResponse,
+                                 ContactChangesResponse, ContactMergeSchema, DuplicateClusterResponse)
 from src.entity.models import User
 from src.services.auth import auth_service
+from src.services.duplicates import find_clusters
+from src.services.events import event_broker
+from src.services.idempotency import idempotency_store
+from src.services.sync import SyncToken, decode_sync_token, encode_sync_token
+from src.conf.config import config
 
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 
 
+def serialize_contact(contact) -> dict:
+    return ContactResponse.model_validate(contact).model_dump(mode='json')
+
 @router.post('/', response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
-async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db),
+async def create_contact(request: Request, body: ContactSchema,
+                         idempotency_key: str | None = Header(default=None, max_length=255),
+                         db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
-    try:
-        contact = await repositories_contact.create_contact(body, db, current_user)
-        return contact
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    async def handler():
+        try:
+            contact = await repositories_contact.create_contact(body, db, current_user)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return status.HTTP_201_CREATED, serialize_contact(contact)
+
+    return await idempotency_store.respond(idempotency_key, current_user.id, request, body, handler)
+
+@router.post('/batch', response_model=list[ContactResponse], status_code=status.HTTP_201_CREATED)
+async def create_contacts(request: Request, body: ContactBatchSchema,
+                          idempotency_key: str | None = Header(default=None, max_length=255),
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    async def handler():
+        try:
+            contacts = await repositories_contact.create_contacts(body, db, current_user)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return status.HTTP_201_CREATED, [serialize_contact(contact) for contact in contacts]
+
+    return await idempotency_store.respond(idempotency_key, current_user.id, request, body, handler)
 
 @router.get('/all', response_model=list[ContactResponse])
 async def get_contacts(limit: int = Query(10, ge=10, le=100), offset: int = Query(0, ge=0),
@@ -51,6 +79,49 @@ async def get_contact_birthday(today: date = Depends(get_today), db: AsyncSessio
     contacts = await repositories_contact.get_contact_birthday(today, db, current_user)
     return contacts
 
+@router.get('/changes', response_model=ContactChangesResponse)
+async def get_contact_changes(since: str | None = Query(default=None, title='Sync token'),
+                              limit: int = Query(500, ge=1, le=1000), db: AsyncSession = Depends(get_db),
+                              current_user: User = Depends(auth_service.get_current_user)):
+    try:
+        token = decode_sync_token(since) if since else SyncToken()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    contacts, tombstones, next_token, has_more = await repositories_contact.get_contact_changes(
+        token, config.CONTACTS_SYNC_SAFETY_WINDOW, limit, db, current_user)
+    return {
+        'updated': contacts,
+        'deleted': [tombstone.contact_id for tombstone in tombstones],
+        'next_token': encode_sync_token(next_token),
+        'has_more': has_more,
+    }
+
+@router.get('/duplicates', response_model=list[DuplicateClusterResponse])
+async def get_duplicates(threshold: float = Query(0.8, ge=0.5, le=1.0), db: AsyncSession = Depends(get_db),
+                         current_user: User = Depends(auth_service.get_current_user)):
+    contacts = await repositories_contact.get_duplicate_candidates(db, current_user)
+    clusters = find_clusters(contacts, threshold)
+    return [{'contacts': cluster, 'score': score} for cluster, score in clusters]
+
+@router.post('/duplicates/merge', response_model=ContactResponse)
+async def merge_duplicates(body: ContactMergeSchema, db: AsyncSession = Depends(get_db),
+                           current_user: User = Depends(auth_service.get_current_user)):
+    if body.primary_id in body.duplicate_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Primary contact cannot be merged into itself')
+    try:
+        contact = await repositories_contact.merge_contacts(body.primary_id, body.duplicate_ids, db, current_user,
+                                                            body.description)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if contact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
+    return contact
+
+@router.get('/stream')
+async def stream_contact_changes(current_user: User = Depends(auth_service.get_stream_user)):
+    return StreamingResponse(event_broker.stream(current_user.id), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
 @router.get('/{contact_id}', response_model=ContactResponse)
 async def get_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
@@ -60,16 +131,21 @@ async def get_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(g
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
     return contact
 
-@router.put('/{contact_id}')
-async def update_contact(body: ContactUpdateSchema, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
+@router.put('/{contact_id}', response_model=ContactResponse)
+async def update_contact(request: Request, body: ContactUpdateSchema, contact_id: int = Path(ge=1),
+                         idempotency_key: str | None = Header(default=None, max_length=255),
+                         db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
-    try:
-        contact = await repositories_contact.update_contact(contact_id, body, db, current_user)
+    async def handler():
+        try:
+            contact = await repositories_contact.update_contact(contact_id, body, db, current_user)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         if contact is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
-        return contact
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return status.HTTP_200_OK, serialize_contact(contact)
+
+    return await idempotency_store.respond(idempotency_key, current_user.id, request, body, handler)
 
 @router.delete('/{contact_id}', status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
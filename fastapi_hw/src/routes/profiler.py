@@ -0,0 +1,43 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from src.conf.config import config
+from src.entity.models import User
+from src.services.auth import auth_service
+from src.services.profiler import create_profile_token, start_sampler
+
+router = APIRouter(prefix='/api/profile', tags=['profiler'])
+profile_lock = asyncio.Lock()
+
+
+async def get_admin_user(current_user: User = Depends(auth_service.get_current_user)):
+    if current_user.email not in config.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Admin access required')
+    return current_user
+
+
+@router.get('/')
+async def profile_worker(seconds: float = Query(10, gt=0, le=config.PROFILER_MAX_SECONDS),
+                         interval: float = Query(config.PROFILER_INTERVAL, ge=0.001, le=1),
+                         format: str = Query('speedscope', pattern='^(speedscope|collapsed)$'),
+                         admin: User = Depends(get_admin_user)):
+    if profile_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='A profile is already running')
+    async with profile_lock:
+        sampler = start_sampler(interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+
+    if format == 'collapsed':
+        return PlainTextResponse(sampler.collapsed())
+    return JSONResponse(sampler.speedscope(f'worker profile ({seconds}s)'),
+                        headers={'Content-Disposition': 'attachment; filename="profile.speedscope.json"'})
+
+
+@router.post('/token')
+async def profile_token(admin: User = Depends(get_admin_user)):
+    return {'header': 'X-Profile', 'token': create_profile_token()}
@@ -1,7 +1,3 @@
-import pickle
-
-import cloudinary
-import cloudinary.uploader
 from fastapi import APIRouter, Depends, UploadFile, File
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,27 +6,21 @@ from src.database.db import get_db
 from src.entity.models import User
 from src.schemas.user import UserResponse
 from src.services.auth import auth_service
-from src.conf.config import config
+from src.services.avatar import avatar_service
+from src.services.jobs import job_queue
 from src.repository import users as repository_users
 
 router = APIRouter(prefix='/users', tags=['users'])
-cloudinary.config(
-    cloud_name=config.CLD_NAME,
-    api_key=config.CLD_API_KEY,
-    api_secret=config.CLD_API_SECRET,
-    secure=True,
-)
 
 @router.get('/me', response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=15))])
 async def get_current_user(user: User = Depends(auth_service.get_current_user)):
     return user
 
 @router.patch('/avatar', response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=15))])
-async def update_avatar(file: UploadFile = File(), user: User = Depends(auth_service.get_current_user), db: AsyncSession = Depends(get_db)):
-    public_id = f'hw_13/{user.email}'
-    res = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-    res_url = cloudinary.CloudinaryImage(public_id).build_url(width=250, height=250, crop='fill', version=res.get('version'))
+async def update_avatar(file: UploadFile = File(),
+                        user: User = Depends(auth_service.get_current_user), db: AsyncSession = Depends(get_db)):
+    res_url = await avatar_service.upload(user.email, file.file)
     user = await repository_users.update_avatar_url(user.email, res_url, db)
-    auth_service.cache.set(user.email, pickle.dumps(user))
-    auth_service.cache.expire(user.email, 300)
+    await auth_service.cache_user(user)
+    await job_queue.enqueue('avatar_thumbnail', {'email': user.email})
     return user
\ No newline at end of file
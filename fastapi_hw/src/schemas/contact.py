@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -13,6 +13,10 @@ class ContactSchema(BaseModel):
     description: str = Field(min_length=5, max_length=250)
 
 
+class ContactBatchSchema(BaseModel):
+    contacts: list[ContactSchema] = Field(min_length=1, max_length=100)
+
+
 class ContactUpdateSchema(BaseModel):
     first_name: str | None = Field(min_length=3, max_length=50, default=None)
     last_name: str | None = Field(min_length=3, max_length=50, default=None)
@@ -22,7 +26,7 @@ class ContactUpdateSchema(BaseModel):
     description: str | None = Field(min_length=5, max_length=250, default=None)
 
 
-class ContactResponse(BaseModel):
+class ContactSummaryResponse(BaseModel):
     id: int = 1
     first_name: str
     last_name: str
@@ -30,7 +34,30 @@ class ContactResponse(BaseModel):
     phone: str
     birthday: date
     description: str
-    user: UserResponse | None
+    updated_at: datetime | None = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ContactResponse(ContactSummaryResponse):
+    user: UserResponse | None
+
+
+class ContactMergeSchema(BaseModel):
+    primary_id: int = Field(ge=1)
+    duplicate_ids: list[int] = Field(min_length=1, max_length=50)
+    # Replaces the descriptions of the merged contacts, which are joined otherwise.
+    description: str | None = Field(min_length=5, max_length=250, default=None)
+
+
+class DuplicateClusterResponse(BaseModel):
+    contacts: list[ContactSummaryResponse]
+    score: float
+
+
+class ContactChangesResponse(BaseModel):
+    updated: list[ContactResponse]
+    deleted: list[int]
+    next_token: str
+    has_more: bool
\ No newline at end of file
@@ -1,4 +1,3 @@
-import pickle
 from datetime import datetime, timedelta
 import logging
 from typing import Optional
@@ -11,17 +10,20 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt, ExpiredSignatureError
 
-from src.database.db import get_db
+from src.database.db import get_db, sessionmanager
+from src.database.redis import redis_client
 from src.repository import users as repository_users
 from src.conf.config import config
+from src.services.single_flight import CachedLoader
 
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 RESET_TOKEN_EXPIRE_MINUTES = 30
+USER_CACHE_TTL = 300
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+request_logger = logging.getLogger(f'{__name__}.requests')
 
 class Auth:
 
@@ -30,6 +32,7 @@ class Auth:
     SECRET_KEY_RESET = config.SECRET_KEY_JWT + '_reset'
     ALGORITHM = config.ALGORITHM
     cache = redis.Redis(host=config.REDIS_DOMAIN, port=config.REDIS_PORT, db=0, password=config.REDIS_PASSWORD)
+    user_cache = CachedLoader(redis_client, 'user', USER_CACHE_TTL)
 
     def verify_password(self, plain_password, hashed_password):
         return self.pwt_context.verify(plain_password, hashed_password)
@@ -48,7 +51,7 @@ class Auth:
             expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         to_encode.update({'iat': datetime.utcnow(), 'exp': expire, 'score': 'access_token'})
         encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY_JWT, algorithm=self.ALGORITHM)
-        logger.info(f"Access token created for user: {data.get('sub')}")
+        logger.info("Access token created for user: %s", data.get('sub'))
         return encoded_access_token
 
     async def create_refresh_token(self, data: dict, expires_delta: Optional[float] = None):
@@ -59,22 +62,22 @@ class Auth:
             expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         to_encode.update({'iat': datetime.utcnow(), 'exp': expire, 'score': 'refresh_token'})
         encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY_JWT, algorithm=self.ALGORITHM)
-        logger.info(f"Refresh token created for user: {data.get('sub')}")
+        logger.info("Refresh token created for user: %s", data.get('sub'))
         return encoded_refresh_token
 
     async def decode_refresh_token(self, refresh_token: str):
         try:
             payload = jwt.decode(refresh_token, self.SECRET_KEY_JWT, algorithms=[self.ALGORITHM])
             if payload['score'] == 'refresh_token':
-                logger.info(f"Valid refresh token for user: {payload['sub']}")
+                logger.info("Valid refresh token for user: %s", payload['sub'])
                 email = payload['sub']
                 return email
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError as err:
-            logger.error(f"Invalid refresh token: {str(err)}")
+            logger.error("Invalid refresh token: %s", err)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    def get_email_from_access_token(self, token: str) -> str:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Could not validate credentials',
@@ -85,7 +88,7 @@ class Auth:
             payload = jwt.decode(token, self.SECRET_KEY_JWT, algorithms=[self.ALGORITHM])
             exp = payload.get('exp')
             if exp is None or datetime.utcnow() > datetime.utcfromtimestamp(exp):
-                logger.warning(f"Token expired for user: {payload.get('sub')}")
+                logger.warning("Token expired for user: %s", payload.get('sub'))
                 raise credentials_exception
 
             if payload['score'] != 'access_token':
@@ -99,43 +102,51 @@ class Auth:
                 raise credentials_exception
 
         except JWTError as err:
-            logger.error(f"Error decoding token: {str(err)}")
+            logger.error("Error decoding token: %s", err)
             raise credentials_exception
+        return email
 
-        user_hash = str(email)
-        user = self.cache.get(user_hash)
-
+    async def load_user(self, email: str, db: AsyncSession):
+        user = await self.user_cache.get(str(email), lambda: repository_users.get_user_by_email(email, db))
         if user is None:
-            logger.info('User from DB')
-            user = await repository_users.get_user_by_email(email, db)
-            if user is None:
-                logger.warning(f"User not found for email: {email}")
-                raise credentials_exception
-            self.cache.set(user_hash, pickle.dumps(user))
-            self.cache.expire(user_hash, 300)
-        else:
-            logger.info('User from cache')
-            user = pickle.loads(user)
+            logger.warning("User not found for email: %s", email)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials',
+                                headers={"WWW-Authenticate": "Bearer"})
 
-        logger.info(f"User authenticated: {email}")
+        request_logger.info("User authenticated: %s", email)
         return user
 
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+        return await self.load_user(self.get_email_from_access_token(token), db)
+
+    async def get_stream_user(self, token: str = Depends(oauth2_scheme)):
+        # For long-lived responses: a yield dependency such as get_db is only
+        # cleaned up once the response finishes, which would pin a pooled
+        # connection for the whole stream. The session here is closed before
+        # the handler runs.
+        email = self.get_email_from_access_token(token)
+        async with sessionmanager.session() as db:
+            return await self.load_user(email, db)
+
+    async def cache_user(self, user):
+        await self.user_cache.set(str(user.email), user)
+
     def create_email_token(self, data: dict):
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=1)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire})
         token = jwt.encode(to_encode, self.SECRET_KEY_JWT, algorithm=self.ALGORITHM)
-        logger.info(f"Generated token: {token}")
+        logger.info("Generated token for user: %s", data.get('sub'))
         return token
 
     async def get_email_from_token(self, token: str):
         try:
             payload = jwt.decode(token, self.SECRET_KEY_JWT, algorithms=[self.ALGORITHM])
             email = payload['sub']
-            logger.info(f"Decoded email from token: {email}")
+            logger.info("Decoded email from token: %s", email)
             return email
         except JWTError as err:
-            logger.error(f"Error decoding token: {err}")
+            logger.error("Error decoding token: %s", err)
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid token for email verification")
 
     def create_reset_password_token(self, data: dict):
@@ -143,14 +154,14 @@ class Auth:
         expire = datetime.utcnow() + timedelta(minutes=RESET_TOKEN_EXPIRE_MINUTES)
         to_encode.update({'iat': datetime.utcnow(), 'exp': expire})
         token = jwt.encode(to_encode, self.SECRET_KEY_RESET, algorithm=self.ALGORITHM)
-        logger.info(f"Generated token: {token}")
+        logger.info("Generated token for user: %s", data.get('sub'))
         return token
 
     async def verify_refresh_password_token(self, token: str) -> str | None:
         try:
             payload = jwt.decode(token, self.SECRET_KEY_RESET, algorithms=[self.ALGORITHM])
             email = payload['sub']
-            logger.info(f"Decoded email from token: {email}")
+            logger.info("Decoded email from token: %s", email)
             if self.cache.get(f'used_token:{token}'):
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid or expired token')
             return email
@@ -158,7 +169,7 @@ class Auth:
             logger.error(err)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Token expired')
         except JWTError as err:
-            logger.error(f"Error decoding token: {err}")
+            logger.error("Error decoding token: %s", err)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid token')
 
 auth_service = Auth()
\ No newline at end of file
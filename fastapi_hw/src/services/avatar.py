@@ -0,0 +1,64 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO
+
+from PIL import Image, ImageOps
+
+from src.conf.config import config
+from src.database.db import sessionmanager
+from src.repository import users as repository_users
+from src.services.auth import auth_service
+from src.services.storage import StorageBackend, storage
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as img:
+        thumbnail = ImageOps.fit(ImageOps.exif_transpose(img).convert('RGB'), (size, size))
+    out = io.BytesIO()
+    thumbnail.save(out, format='JPEG', quality=90)
+    return out.getvalue()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=config.AVATAR_WORKERS)
+    return _pool
+
+
+class AvatarService:
+
+    def __init__(self, storage_backend: StorageBackend, size: int):
+        self.storage = storage_backend
+        self.size = size
+
+    @staticmethod
+    def original_key(email: str) -> str:
+        return f'hw_13/{email}'
+
+    def thumbnail_key(self, email: str) -> str:
+        return f'hw_13/{email}_{self.size}x{self.size}'
+
+    async def upload(self, email: str, file: BinaryIO) -> str:
+        return await self.storage.save(self.original_key(email), file)
+
+    async def create_thumbnail(self, email: str) -> str:
+        data = await self.storage.read(self.original_key(email))
+        loop = asyncio.get_running_loop()
+        thumbnail = await loop.run_in_executor(get_pool(), make_thumbnail, data, self.size)
+        url = await self.storage.save(self.thumbnail_key(email), io.BytesIO(thumbnail))
+
+        async with sessionmanager.session() as db:
+            user = await repository_users.update_avatar_url(email, url, db)
+        await auth_service.cache_user(user)
+        logger.info("Avatar thumbnail stored for user: %s", email)
+        return url
+
+
+avatar_service = AvatarService(storage, config.AVATAR_SIZE)
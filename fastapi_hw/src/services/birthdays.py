@@ -0,0 +1,228 @@
+import asyncio
+import calendar
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from email.message import EmailMessage
+from itertools import groupby
+
+from sqlalchemy import and_, extract, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from src.conf.config import config
+from src.database.db import sessionmanager
+from src.entity.models import Contact, DigestCheckpoint, User
+from src.services.mail import SMTPPool, SendFailure, build_message, mail_pool
+from src.services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class Clock:
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class FakeClock(Clock):
+    # Time only moves when the scheduler sleeps, so a test can run several
+    # days of schedule instantly.
+
+    def __init__(self, now: datetime):
+        self.current = now
+
+    def now(self) -> datetime:
+        return self.current
+
+    async def sleep(self, seconds: float) -> None:
+        self.current += timedelta(seconds=max(seconds, 0))
+        await asyncio.sleep(0)
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    for year in (today.year, today.year + 1):
+        day = birthday.day
+        if birthday.month == 2 and day == 29 and not calendar.isleap(year):
+            day = 28
+        upcoming = date(year, birthday.month, day)
+        if upcoming >= today:
+            return upcoming
+
+
+def birthday_window(today: date, days: int):
+    # Today and the next `days` days, like GET /contacts/birthdays. One range
+    # per calendar month covered, so the filter can use the (month, day)
+    # expression index.
+    month_days: dict[int, list[int]] = {}
+    for offset in range(days + 1):
+        day = today + timedelta(days=offset)
+        month_days.setdefault(day.month, []).append(day.day)
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            month_days[2].append(29)
+    month, day = extract('month', Contact.birthday), extract('day', Contact.birthday)
+    return or_(*(and_(month == m, day.between(min(ds), max(ds))) for m, ds in month_days.items()))
+
+
+@dataclass
+class Digest:
+    user_id: int
+    email: str
+    username: str
+    contacts: list[dict] = field(default_factory=list)
+
+
+class BirthdayDigest:
+    # Sends each user one email listing their contacts' birthdays for the
+    # coming days. Users are scanned in user_id order in batches; the last
+    # user_id of every sent batch is checkpointed for the run date, so a
+    # restarted run carries on from there. A digest the server refuses, or
+    # that still fails after `send_attempts`, is logged and set aside in
+    # dead_letters instead of holding up the rest.
+
+    def __init__(self, pool: SMTPPool = mail_pool, clock: Clock | None = None, days: int = config.DIGEST_DAYS_AHEAD,
+                 batch_size: int = config.DIGEST_BATCH_SIZE, send_hour: int = config.DIGEST_SEND_HOUR,
+                 send_attempts: int = 3, retry_delay: float = 30):
+        self.pool = pool
+        self.clock = clock or Clock()
+        self.days = days
+        self.batch_size = batch_size
+        self.send_hour = send_hour
+        self.send_attempts = send_attempts
+        self.retry_delay = retry_delay
+        self.dead_letters: list[tuple[Digest, SendFailure]] = []
+
+    async def _checkpoint(self, run_date: date) -> DigestCheckpoint:
+        async with sessionmanager.session() as db:
+            stmt = select(DigestCheckpoint).filter(DigestCheckpoint.run_date == run_date)
+            checkpoint = (await db.execute(stmt)).scalar_one_or_none()
+            if checkpoint is None:
+                checkpoint = DigestCheckpoint(run_date=run_date, last_user_id=0, sent=0)
+                db.add(checkpoint)
+                try:
+                    await db.commit()
+                    await db.refresh(checkpoint)
+                except IntegrityError:
+                    await db.rollback()
+                    checkpoint = (await db.execute(stmt)).scalar_one()
+            return checkpoint
+
+    async def _save_checkpoint(self, run_date: date, last_user_id: int, sent: int, completed: bool = False) -> None:
+        async with sessionmanager.session() as db:
+            stmt = select(DigestCheckpoint).filter(DigestCheckpoint.run_date == run_date)
+            checkpoint = (await db.execute(stmt)).scalar_one()
+            checkpoint.last_user_id = last_user_id
+            checkpoint.sent = sent
+            if completed:
+                checkpoint.completed_at = self.clock.now()
+            await db.commit()
+
+    async def load_batch(self, today: date, after_user_id: int) -> list[Digest]:
+        window = birthday_window(today, self.days)
+        user_ids = (
+            select(Contact.user_id)
+            .filter(Contact.user_id > after_user_id, window)
+            .distinct()
+            .order_by(Contact.user_id)
+            .limit(self.batch_size)
+        )
+        stmt = (
+            select(Contact.user_id, User.email, User.username, Contact.first_name, Contact.last_name,
+                   Contact.birthday)
+            .join(User, User.id == Contact.user_id)
+            .filter(Contact.user_id.in_(user_ids), window)
+            .order_by(Contact.user_id)
+        )
+        async with sessionmanager.session() as db:
+            rows = (await db.execute(stmt)).all()
+
+        digests = []
+        for user_id, user_rows in groupby(rows, key=lambda row: row.user_id):
+            user_rows = list(user_rows)
+            digest = Digest(user_id, user_rows[0].email, user_rows[0].username)
+            for row in user_rows:
+                upcoming = next_birthday(row.birthday, today)
+                digest.contacts.append({'first_name': row.first_name, 'last_name': row.last_name,
+                                        'date': upcoming, 'days_left': (upcoming - today).days})
+            digest.contacts.sort(key=lambda contact: contact['days_left'])
+            digests.append(digest)
+        return digests
+
+    def build_message(self, digest: Digest) -> EmailMessage:
+        return build_message(
+            subject='Upcoming birthdays',
+            recipient=digest.email,
+            template_name='birthday_digest.html',
+            template_body={'username': digest.username, 'days': self.days, 'contacts': digest.contacts},
+        )
+
+    async def _send(self, messages: list[EmailMessage]) -> list[SendFailure]:
+        # One chunk per pooled connection, each sent over a single SMTP session.
+        chunk = -(-len(messages) // self.pool.size)
+        results = await asyncio.gather(*(self.pool.send_many(messages[i:i + chunk])
+                                         for i in range(0, len(messages), chunk)))
+        return [failure for failures in results for failure in failures]
+
+    async def send_batch(self, digests: list[Digest]) -> list[Digest]:
+        # Returns the digests that were delivered.
+        with tracer.span('birthday digest batch', **{'digest.size': len(digests)}):
+            failures = await self._send([self.build_message(digest) for digest in digests])
+            for attempt in range(1, self.send_attempts):
+                retry = [failure.message for failure in failures if not failure.permanent]
+                if not retry:
+                    break
+                await self.clock.sleep(self.retry_delay * attempt)
+                failures = [failure for failure in failures if failure.permanent] + await self._send(retry)
+
+        failed = {failure.message['To']: failure for failure in failures}
+        for digest in digests:
+            if digest.email in failed:
+                logger.error("Birthday digest to user %s failed: %s", digest.user_id, failed[digest.email].error)
+                self.dead_letters.append((digest, failed[digest.email]))
+        return [digest for digest in digests if digest.email not in failed]
+
+    async def run(self, run_date: date | None = None) -> int:
+        run_date = run_date or self.clock.now().date()
+        checkpoint = await self._checkpoint(run_date)
+        if checkpoint.completed_at is not None:
+            logger.info("Birthday digest for %s already sent", run_date)
+            return 0
+
+        cursor, sent = checkpoint.last_user_id, checkpoint.sent
+        if cursor:
+            logger.info("Resuming birthday digest for %s after user %s", run_date, cursor)
+        batch = await self.load_batch(run_date, cursor)
+        while batch:
+            cursor = batch[-1].user_id
+            # Read the next batch while this one is being sent.
+            next_batch = asyncio.create_task(self.load_batch(run_date, cursor))
+            try:
+                delivered = await self.send_batch(batch)
+            except BaseException:
+                next_batch.cancel()
+                raise
+            sent += len(delivered)
+            await self._save_checkpoint(run_date, cursor, sent)
+            logger.info("Birthday digest for %s: %d sent", run_date, sent)
+            batch = await next_batch
+
+        await self._save_checkpoint(run_date, cursor, sent, completed=True)
+        logger.info("Birthday digest for %s finished, %d emails sent", run_date, sent)
+        return sent
+
+    async def run_forever(self, retry_delay: float = 60) -> None:
+        while True:
+            now = self.clock.now()
+            scheduled = datetime.combine(now.date(), time(self.send_hour), tzinfo=timezone.utc)
+            if now >= scheduled:
+                try:
+                    await self.run(now.date())
+                except Exception as err:
+                    # The checkpoint keeps the progress; try again shortly.
+                    logger.error("Birthday digest for %s failed: %s", now.date(), err)
+                    await self.clock.sleep(retry_delay)
+                    continue
+                scheduled += timedelta(days=1)
+            await self.clock.sleep((scheduled - self.clock.now()).total_seconds())
@@ -0,0 +1,53 @@
+import re
+import unicodedata
+
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+SOUNDEX_CODES = {**dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+                 'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'}
+
+
+def fold(value: str) -> str:
+    # Drops accents but keeps letters of every script, so Cyrillic names fold too.
+    value = unicodedata.normalize('NFKD', value).casefold()
+    return ''.join(char for char in value if char.isalpha())
+
+
+def soundex(word: str) -> str:
+    if not word:
+        return ''
+    code, last = word[0], SOUNDEX_CODES.get(word[0], '')
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != last:
+            code += digit
+        if char not in 'hw':
+            last = digit
+    return (code + '000')[:4]
+
+
+def phonetic(word: str) -> str:
+    # Soundex only knows Latin letters; other scripts block on their first letters.
+    return soundex(word) if word.isascii() else word[:4]
+
+
+def email_key(email: str) -> str | None:
+    local, _, domain = email.strip().lower().rpartition('@')
+    local = local.split('+', 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local, domain = local.replace('.', ''), 'gmail.com'
+    return f'{local}@{domain}' if local and domain else None
+
+
+def phone_key(phone: str) -> str | None:
+    digits = re.sub(r'\D', '', phone)
+    # Keep the subscriber part so +38 050... and 050... end up in one block.
+    return digits[-9:] if len(digits) >= 7 else None
+
+
+def name_key(first_name: str, last_name: str) -> str | None:
+    # Sorted so swapped first and last names share a key.
+    return ''.join(phonetic(part) for part in sorted((fold(first_name), fold(last_name)))) or None
+
+
+def full_name(first_name: str, last_name: str) -> str:
+    return ' '.join(part for part in sorted((fold(first_name), fold(last_name))) if part)
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from src.entity.models import Contact
+from src.services.blocking import full_name
+
+MAX_BLOCK_SIZE = 200
+
+EMAIL_WEIGHT = 0.95
+PHONE_WEIGHT = 0.85
+NAME_WEIGHT = 0.7
+BIRTHDAY_WEIGHT = 0.3
+
+
+def score_pair(a: Contact, b: Contact, names: dict[int, str]) -> float:
+    # Noisy-or of the individual signals: each match independently makes the
+    # pair more likely to be the same person.
+    signals = []
+    if a.email_key and a.email_key == b.email_key:
+        signals.append(EMAIL_WEIGHT)
+    if a.phone_key and a.phone_key == b.phone_key:
+        signals.append(PHONE_WEIGHT)
+    # Two blank names are not evidence of anything.
+    similarity = SequenceMatcher(None, names[a.id], names[b.id]).ratio() if names[a.id] and names[b.id] else 0
+    if similarity >= 0.8:
+        signals.append(NAME_WEIGHT * similarity)
+    if a.birthday == b.birthday:
+        signals.append(BIRTHDAY_WEIGHT)
+    missing = 1.0
+    for signal in signals:
+        missing *= 1 - signal
+    return 1 - missing
+
+
+def candidate_pairs(contacts: list[Contact]) -> set[tuple[int, int]]:
+    blocks: dict[tuple[str, str], list[int]] = defaultdict(list)
+    for contact in contacts:
+        for field in ('email_key', 'phone_key', 'name_key'):
+            key = getattr(contact, field)
+            if key:
+                blocks[(field, key)].append(contact.id)
+
+    pairs = set()
+    for ids in blocks.values():
+        # A huge block is a placeholder value (e.g. a shared office number), not a person.
+        if 1 < len(ids) <= MAX_BLOCK_SIZE:
+            pairs.update(combinations(sorted(ids), 2))
+    return pairs
+
+
+def find_clusters(contacts: list[Contact], threshold: float) -> list[tuple[list[Contact], float]]:
+    by_id = {contact.id: contact for contact in contacts}
+    names = {contact.id: full_name(contact.first_name, contact.last_name) for contact in contacts}
+    parent = {contact_id: contact_id for contact_id in by_id}
+
+    def find(contact_id: int) -> int:
+        while parent[contact_id] != contact_id:
+            parent[contact_id] = parent[parent[contact_id]]
+            contact_id = parent[contact_id]
+        return contact_id
+
+    best: dict[int, float] = {}
+    for a, b in candidate_pairs(contacts):
+        score = score_pair(by_id[a], by_id[b], names)
+        if score >= threshold:
+            root_a, root_b = find(a), find(b)
+            parent[root_b] = root_a
+            best[root_a] = max(best.get(root_a, 0), best.pop(root_b, 0), score)
+
+    groups: dict[int, list[Contact]] = defaultdict(list)
+    for contact_id, contact in by_id.items():
+        groups[find(contact_id)].append(contact)
+    clusters = [(sorted(group, key=lambda c: c.id), round(best[root], 3))
+                for root, group in groups.items() if len(group) > 1]
+    return sorted(clusters, key=lambda cluster: (-cluster[1], cluster[0][0].id))
@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import json
+import logging
+from abc import ABC, abstractmethod
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.conf.config import config
+from src.database.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW = object()
+
+
+def render_event(event_type: str, data: str) -> str:
+    return f'event: {event_type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    # One open stream. Events are queued as ready-to-send frames; a client that
+    # falls `maxsize` events behind is dropped and told to resync instead of
+    # letting its queue grow without bound.
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, frame: str) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker(ABC):
+    # Fans events out to the streams open in this worker. Each user's channel
+    # is listened to once per worker no matter how many tabs are connected.
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[Subscription]] = {}
+
+    @abstractmethod
+    async def publish(self, user_id: int, event_type: str, data: dict) -> None:
+        ...
+
+    async def _listen(self, user_id: int) -> None:
+        pass
+
+    async def _unlisten(self, user_id: int) -> None:
+        pass
+
+    def _dispatch(self, user_id: int, event_type: str, data: str) -> None:
+        subscribers = self._subscribers.get(user_id)
+        if not subscribers:
+            return
+        frame = render_event(event_type, data)
+        for subscription in subscribers:
+            subscription.put(frame)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, user_id: int):
+        subscription = Subscription(self.queue_size)
+        subscribers = self._subscribers.setdefault(user_id, set())
+        subscribers.add(subscription)
+        try:
+            if len(subscribers) == 1:
+                await self._listen(user_id)
+            yield subscription
+        finally:
+            subscribers.discard(subscription)
+            if not subscribers and self._subscribers.get(user_id) is subscribers:
+                del self._subscribers[user_id]
+                await self._unlisten(user_id)
+
+    async def stream(self, user_id: int, heartbeat: float = config.EVENTS_HEARTBEAT_INTERVAL):
+        async with self.subscribe(user_id) as subscription:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': heartbeat\n\n'
+                    continue
+                if frame is OVERFLOW:
+                    # The client fell behind: it catches up through /contacts/changes.
+                    yield render_event('resync', '{}')
+                    return
+                yield frame
+
+    def metrics(self) -> dict:
+        return {
+            'users': len(self._subscribers),
+            'connections': sum(len(subscribers) for subscribers in self._subscribers.values()),
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryBroker(Broker):
+
+    async def publish(self, user_id: int, event_type: str, data: dict) -> None:
+        self._dispatch(user_id, event_type, json.dumps(data, default=str))
+
+
+class RedisBroker(Broker):
+    # Publishes on a per-user channel. Each worker keeps a single pub/sub
+    # connection, subscribed only to the users that have a stream open here.
+
+    def __init__(self, client: Redis, queue_size: int, prefix: str = 'contacts'):
+        super().__init__(queue_size)
+        self.client = client
+        self.prefix = prefix
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+
+    def _channel(self, user_id: int) -> str:
+        return f'{self.prefix}:{user_id}'
+
+    async def publish(self, user_id: int, event_type: str, data: dict) -> None:
+        message = f'{event_type}\n{json.dumps(data, default=str)}'
+        try:
+            await self.client.publish(self._channel(user_id), message)
+        except RedisError as err:
+            logger.warning("Failed to publish %s for user %s: %s", event_type, user_id, err)
+
+    async def _listen(self, user_id: int) -> None:
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._channel(user_id))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _unlisten(self, user_id: int) -> None:
+        try:
+            await self._pubsub.unsubscribe(self._channel(user_id))
+        except RedisError as err:
+            logger.warning("Failed to unsubscribe user %s: %s", user_id, err)
+
+    async def _read(self) -> None:
+        while self._subscribers:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except RedisError as err:
+                logger.warning("Event subscription failed, retrying: %s", err)
+                await asyncio.sleep(1)
+                continue
+            if message is None or message['type'] != 'message':
+                continue
+            user_id = int(message['channel'].rpartition(b':')[2])
+            event_type, _, data = message['data'].decode().partition('\n')
+            self._dispatch(user_id, event_type, data)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+
+def get_event_broker() -> Broker:
+    if config.EVENTS_BACKEND == 'memory':
+        return InMemoryBroker(config.EVENTS_QUEUE_SIZE)
+    return RedisBroker(redis_client, config.EVENTS_QUEUE_SIZE)
+
+
+event_broker = get_event_broker()
@@ -0,0 +1,124 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+from src.conf.config import config
+from src.database.redis import redis_client
+from src.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[], Awaitable[tuple[int, Any]]]
+
+
+class IdempotencyStore:
+    # Remembers the response to a request made with an Idempotency-Key so a
+    # retry is answered from Redis. Duplicates arriving while the first one
+    # is running wait for its result: inside a worker through single-flight,
+    # across workers through a Redis lock, which is kept alive for as long as
+    # the handler runs.
+
+    def __init__(self, client: Redis, prefix: str, ttl: int, lock_timeout: float):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.single_flight = SingleFlight()
+
+    def _key(self, user_id: int, key: str) -> str:
+        return f'{self.prefix}:{user_id}:{key}'
+
+    @staticmethod
+    def fingerprint(request: Request, body: Any) -> str:
+        payload = json.dumps([request.method, request.url.path, body], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def _read(self, key: str) -> dict | None:
+        raw = await self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def _wait_for_record(self, key: str) -> dict | None:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            record = await self._read(key)
+            if record is not None:
+                return record
+        return None
+
+    async def _keep_locked(self, lock) -> None:
+        # A lock that expired under a slow handler would let a retry on another
+        # worker run the request a second time.
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            try:
+                await lock.reacquire()
+            except LockError as err:
+                logger.warning("Lost idempotency lock %s: %s", lock.name, err)
+                return
+
+    async def _execute(self, key: str, fingerprint: str, handler: Handler) -> tuple[dict, bool]:
+        lock = self.client.lock(f'{key}:lock', timeout=self.lock_timeout)
+        if not await lock.acquire(blocking=False):
+            record = await self._wait_for_record(key)
+            if record is None:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                    detail='A request with this Idempotency-Key is still in progress')
+            return record, True
+        keeper = asyncio.create_task(self._keep_locked(lock))
+        try:
+            record = await self._read(key)
+            if record is not None:
+                return record, True
+            try:
+                status_code, content = await handler()
+            except HTTPException as err:
+                # Client errors are part of the outcome; server errors may be retried.
+                if err.status_code >= 500:
+                    raise
+                status_code, content = err.status_code, {'detail': err.detail}
+            record = {'fingerprint': fingerprint, 'status': status_code, 'content': content}
+            await self.client.set(key, json.dumps(record), ex=self.ttl)
+            return record, False
+        finally:
+            keeper.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await keeper
+            try:
+                await lock.release()
+            except LockError:
+                pass
+
+    async def respond(self, idempotency_key: str | None, user_id: int, request: Request, body: BaseModel,
+                      handler: Handler) -> JSONResponse:
+        if idempotency_key is None:
+            status_code, content = await handler()
+            return JSONResponse(content, status_code=status_code)
+
+        fingerprint = self.fingerprint(request, body.model_dump(mode='json'))
+        key = self._key(user_id, idempotency_key)
+
+        record, replayed = await self._read(key), True
+        if record is None:
+            (record, replayed), shared = await self.single_flight.do(
+                key, lambda: self._execute(key, fingerprint, handler))
+            replayed = replayed or shared
+        if record['fingerprint'] != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                                detail='Idempotency-Key was already used for a different request')
+        headers = {'Idempotent-Replayed': 'true'} if replayed else None
+        return JSONResponse(record['content'], status_code=record['status'], headers=headers)
+
+
+idempotency_store = IdempotencyStore(redis_client, 'idempotency', config.IDEMPOTENCY_TTL,
+                                     config.IDEMPOTENCY_LOCK_TIMEOUT)
@@ -0,0 +1,322 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from src.conf.config import config
+from src.database.redis import redis_client
+from src.services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+handlers: dict[str, Callable[..., Awaitable[Any]]] = {}
+
+# The dedup key is claimed and the job added in one step, so a crash in
+# between cannot leave the key set with no job behind it.
+ENQUEUE_SCRIPT = '''
+if #KEYS == 2 and not redis.call('SET', KEYS[2], ARGV[2], 'NX', 'EX', ARGV[3]) then
+    return 0
+end
+redis.call('XADD', KEYS[1], '*', 'job', ARGV[1])
+return 1
+'''
+
+# Moves due retries back to the stream; ZREM and XADD together, so a job is
+# neither lost nor added twice.
+PROMOTE_SCRIPT = '''
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], 0, ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, data in ipairs(due) do
+    redis.call('ZREM', KEYS[1], data)
+    redis.call('XADD', KEYS[2], '*', 'job', data)
+end
+return #due
+'''
+
+
+def register_job(name: str, handler: Callable[..., Awaitable[Any]]) -> None:
+    handlers[name] = handler
+
+
+@dataclass
+class Job:
+    name: str
+    payload: dict
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    attempts: int = 0
+    dedup_key: str | None = None
+    receipt: str | None = None
+    # traceparent of the span that enqueued the job, so its spans join that trace.
+    trace: str | None = None
+
+    def dumps(self) -> str:
+        return json.dumps({'id': self.id, 'name': self.name, 'payload': self.payload, 'attempts': self.attempts,
+                           'dedup_key': self.dedup_key, 'trace': self.trace})
+
+    @classmethod
+    def loads(cls, data: str | bytes, receipt: str | None = None) -> 'Job':
+        return cls(**json.loads(data), receipt=receipt)
+
+
+class JobQueue(ABC):
+
+    @abstractmethod
+    async def enqueue(self, name: str, payload: dict, dedup_key: str | None = None,
+                      dedup_ttl: int = config.JOBS_DEDUP_TTL) -> str | None:
+        ...
+
+    @abstractmethod
+    async def reserve(self, consumer: str, count: int, block_ms: int) -> list[Job]:
+        ...
+
+    @abstractmethod
+    async def ack(self, job: Job) -> None:
+        ...
+
+    @abstractmethod
+    async def retry(self, job: Job, delay: float) -> None:
+        ...
+
+    @abstractmethod
+    async def dead(self, job: Job, error: str) -> None:
+        ...
+
+    @abstractmethod
+    async def metrics(self) -> dict:
+        ...
+
+
+class RedisStreamQueue(JobQueue):
+    # Ready jobs live in a stream read through a consumer group, so a job that
+    # was delivered but never acked is re-claimed after the visibility timeout.
+    # Retries wait in a sorted set scored by their due time.
+
+    def __init__(self, client: Redis, prefix: str, visibility_timeout: int):
+        self.client = client
+        self.stream = f'{prefix}:stream'
+        self.group = f'{prefix}:workers'
+        self.delayed = f'{prefix}:delayed'
+        self.dead_stream = f'{prefix}:dead'
+        self.dedup_prefix = f'{prefix}:dedup:'
+        self.visibility_timeout = visibility_timeout
+        self._group_ready = False
+        self._enqueue = client.register_script(ENQUEUE_SCRIPT)
+        self._promote = client.register_script(PROMOTE_SCRIPT)
+
+    async def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            await self.client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as err:
+            if 'BUSYGROUP' not in str(err):
+                raise
+        self._group_ready = True
+
+    async def enqueue(self, name: str, payload: dict, dedup_key: str | None = None,
+                      dedup_ttl: int = config.JOBS_DEDUP_TTL) -> str | None:
+        job = Job(name=name, payload=payload, dedup_key=dedup_key, trace=tracer.traceparent())
+        keys = [self.stream, self.dedup_prefix + dedup_key] if dedup_key else [self.stream]
+        if not await self._enqueue(keys=keys, args=[job.dumps(), job.id, dedup_ttl]):
+            logger.info("Duplicate job %s skipped for key %s", name, dedup_key)
+            return None
+        return job.id
+
+    async def _promote_delayed(self) -> None:
+        await self._promote(keys=[self.delayed, self.stream], args=[time.time(), 100])
+
+    async def reserve(self, consumer: str, count: int, block_ms: int) -> list[Job]:
+        await self._ensure_group()
+        await self._promote_delayed()
+
+        claimed = await self.client.xautoclaim(self.stream, self.group, consumer,
+                                               min_idle_time=self.visibility_timeout * 1000, count=count)
+        entries = [entry for entry in claimed[1] if entry]
+        if not entries:
+            response = await self.client.xreadgroup(self.group, consumer, {self.stream: '>'}, count=count,
+                                                    block=block_ms)
+            entries = [entry for _, stream_entries in response for entry in stream_entries]
+
+        jobs = []
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            jobs.append(Job.loads(fields[b'job'], receipt=entry_id))
+        return jobs
+
+    def _remove(self, job: Job, pipe) -> None:
+        pipe.xack(self.stream, self.group, job.receipt)
+        pipe.xdel(self.stream, job.receipt)
+
+    async def ack(self, job: Job) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._remove(job, pipe)
+            await pipe.execute()
+
+    async def retry(self, job: Job, delay: float) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._remove(job, pipe)
+            pipe.zadd(self.delayed, {job.dumps(): time.time() + delay})
+            await pipe.execute()
+
+    async def dead(self, job: Job, error: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._remove(job, pipe)
+            pipe.xadd(self.dead_stream, {'job': job.dumps(), 'error': error})
+            if job.dedup_key:
+                pipe.delete(self.dedup_prefix + job.dedup_key)
+            await pipe.execute()
+
+    async def metrics(self) -> dict:
+        await self._ensure_group()
+        pending = await self.client.xpending(self.stream, self.group)
+        return {
+            'ready': await self.client.xlen(self.stream) - pending['pending'],
+            'in_flight': pending['pending'],
+            'delayed': await self.client.zcard(self.delayed),
+            'dead': await self.client.xlen(self.dead_stream),
+        }
+
+
+class InMemoryQueue(JobQueue):
+
+    def __init__(self):
+        self._ready: asyncio.Queue[Job] = asyncio.Queue()
+        self._delayed: list[tuple[float, int, Job]] = []
+        self._in_flight: dict[str, Job] = {}
+        self._dedup: dict[str, float] = {}
+        self.dead_jobs: list[tuple[Job, str]] = []
+
+    async def enqueue(self, name: str, payload: dict, dedup_key: str | None = None,
+                      dedup_ttl: int = config.JOBS_DEDUP_TTL) -> str | None:
+        now = time.monotonic()
+        if dedup_key:
+            if self._dedup.get(dedup_key, 0) > now:
+                return None
+            self._dedup[dedup_key] = now + dedup_ttl
+        job = Job(name=name, payload=payload, dedup_key=dedup_key, trace=tracer.traceparent())
+        self._ready.put_nowait(job)
+        return job.id
+
+    async def reserve(self, consumer: str, count: int, block_ms: int) -> list[Job]:
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._ready.put_nowait(heapq.heappop(self._delayed)[2])
+
+        jobs = []
+        try:
+            if self._ready.empty():
+                jobs.append(await asyncio.wait_for(self._ready.get(), timeout=block_ms / 1000))
+            while len(jobs) < count and not self._ready.empty():
+                jobs.append(self._ready.get_nowait())
+        except asyncio.TimeoutError:
+            pass
+        for job in jobs:
+            job.receipt = job.id
+            self._in_flight[job.id] = job
+        return jobs
+
+    async def ack(self, job: Job) -> None:
+        self._in_flight.pop(job.id, None)
+
+    async def retry(self, job: Job, delay: float) -> None:
+        self._in_flight.pop(job.id, None)
+        heapq.heappush(self._delayed, (time.monotonic() + delay, id(job), job))
+
+    async def dead(self, job: Job, error: str) -> None:
+        self._in_flight.pop(job.id, None)
+        self.dead_jobs.append((job, error))
+        if job.dedup_key:
+            self._dedup.pop(job.dedup_key, None)
+
+    async def metrics(self) -> dict:
+        return {
+            'ready': self._ready.qsize(),
+            'in_flight': len(self._in_flight),
+            'delayed': len(self._delayed),
+            'dead': len(self.dead_jobs),
+        }
+
+
+class Worker:
+
+    def __init__(self, queue: JobQueue, concurrency: int = config.JOBS_CONCURRENCY,
+                 max_attempts: int = config.JOBS_MAX_ATTEMPTS, backoff_base: float = config.JOBS_BACKOFF_BASE,
+                 backoff_max: float = config.JOBS_BACKOFF_MAX, name: str | None = None):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.name = name or f'{socket.gethostname()}-{os.getpid()}'
+        self._running = False
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base * 2 ** attempts, self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def execute(self, job: Job) -> None:
+        handler = handlers.get(job.name)
+        if handler is None:
+            logger.error("No handler registered for job %s", job.name)
+            await self.queue.dead(job, 'unknown job')
+            return
+        try:
+            with tracer.span(f'job {job.name}', 'consumer', parent=job.trace, **{'job.id': job.id,
+                                                                             'job.attempts': job.attempts}):
+                await handler(**job.payload)
+        except Exception as err:
+            job.attempts += 1
+            if job.attempts >= self.max_attempts:
+                logger.error("Job %s (%s) failed permanently: %s", job.name, job.id, err)
+                await self.queue.dead(job, str(err))
+            else:
+                delay = self.backoff(job.attempts)
+                logger.warning("Job %s (%s) failed, retry %d in %.1fs: %s", job.name, job.id, job.attempts, delay, err)
+                await self.queue.retry(job, delay)
+            return
+        await self.queue.ack(job)
+
+    async def run(self) -> None:
+        self._running = True
+        tasks: set[asyncio.Task] = set()
+        logger.info("Worker %s started with concurrency %d", self.name, self.concurrency)
+        while self._running:
+            free = self.concurrency - len(tasks)
+            if free <= 0:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                jobs = await self.queue.reserve(self.name, free, block_ms=1000)
+            except Exception as err:
+                logger.error("Failed to reserve jobs: %s", err)
+                await asyncio.sleep(1)
+                continue
+            for job in jobs:
+                task = asyncio.create_task(self.execute(job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        logger.info("Worker %s stopped", self.name)
+
+    def stop(self) -> None:
+        self._running = False
+
+
+def get_job_queue() -> JobQueue:
+    if config.JOBS_BACKEND == 'memory':
+        return InMemoryQueue()
+    return RedisStreamQueue(redis_client, config.JOBS_PREFIX, config.JOBS_VISIBILITY_TIMEOUT)
+
+
+job_queue = get_job_queue()
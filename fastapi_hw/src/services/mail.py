@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
+from pathlib import Path
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+from src.conf.config import config
+from src.services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FOLDER = Path(__file__).parent / 'templates'
+
+# Errors about one message; the connection can still send the next one.
+MESSAGE_ERRORS = (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPNotSupported,
+                  ValueError)
+CONNECTION_ERRORS = (aiosmtplib.SMTPException, OSError)
+
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
+    cache_size=-1,
+)
+
+
+@lru_cache(maxsize=None)
+def get_template(template_name: str) -> Template:
+    return template_env.get_template(template_name)
+
+
+def precompile_templates() -> None:
+    for template_name in template_env.list_templates(extensions=['html']):
+        get_template(template_name)
+
+
+def build_message(subject: str, recipient: str, template_name: str, template_body: dict) -> EmailMessage:
+    message = EmailMessage()
+    message['Subject'] = subject
+    message['From'] = formataddr((config.MAIL_FROM_NAME, config.MAIL_FROM))
+    message['To'] = recipient
+    message.set_content(get_template(template_name).render(**template_body), subtype='html')
+    return message
+
+
+@dataclass
+class SendFailure:
+    message: EmailMessage
+    error: Exception
+
+    @property
+    def permanent(self) -> bool:
+        # A 5xx reply or an address that cannot be sent will fail again; a 4xx
+        # reply or a lost connection may not.
+        if isinstance(self.error, aiosmtplib.SMTPRecipientsRefused):
+            return all(refused.code >= 500 for refused in self.error.recipients)
+        if isinstance(self.error, aiosmtplib.SMTPResponseException):
+            return self.error.code >= 500
+        return isinstance(self.error, (aiosmtplib.SMTPNotSupported, ValueError))
+
+
+class PooledConnection:
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+
+    def __init__(self, hostname: str, port: int, username: str | None, password: str | None, use_tls: bool,
+                 start_tls: bool, validate_certs: bool, size: int, idle_timeout: float, timeout: float = 30):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.validate_certs = validate_certs
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: list[PooledConnection] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            validate_certs=self.validate_certs,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        logger.info("SMTP connection opened to %s:%s", self.hostname, self.port)
+        return PooledConnection(smtp)
+
+    @staticmethod
+    async def _discard(conn: PooledConnection) -> None:
+        if conn.smtp.is_connected:
+            try:
+                await conn.smtp.quit()
+            except aiosmtplib.SMTPException:
+                conn.smtp.close()
+
+    async def _acquire(self) -> PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.smtp.is_connected and time.monotonic() - conn.last_used < self.idle_timeout:
+                return conn
+            await self._discard(conn)
+        return await self._connect()
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        async with self._slots:
+            conn = await self._acquire()
+            try:
+                yield conn
+            except Exception:
+                await self._discard(conn)
+                raise
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+
+    async def _send_one(self, conn: PooledConnection, message: EmailMessage) -> None:
+        with tracer.span('smtp send', 'client', child_only=True, **{'smtp.host': self.hostname}):
+            try:
+                await conn.smtp.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                logger.warning("SMTP connection dropped, reconnecting")
+                conn.smtp.close()
+                await conn.smtp.connect()
+                await conn.smtp.send_message(message)
+
+    async def send_many(self, messages: list[EmailMessage]) -> list[SendFailure]:
+        # A message the server refuses is reported and the rest of the batch is
+        # still sent over the same connection. When the connection fails, the
+        # messages not sent yet are reported with that error.
+        failures: list[SendFailure] = []
+        unsent = messages
+        try:
+            async with self.connection() as conn:
+                for index, message in enumerate(messages):
+                    try:
+                        await self._send_one(conn, message)
+                    except MESSAGE_ERRORS as err:
+                        logger.warning("SMTP server refused the message to %s: %s", message['To'], err)
+                        failures.append(SendFailure(message, err))
+                    except CONNECTION_ERRORS:
+                        unsent = messages[index:]
+                        raise
+        except CONNECTION_ERRORS as err:
+            logger.warning("SMTP connection to %s:%s failed, %d messages not sent: %s",
+                           self.hostname, self.port, len(unsent), err)
+            failures.extend(SendFailure(message, err) for message in unsent)
+        return failures
+
+    async def send(self, message: EmailMessage) -> None:
+        failures = await self.send_many([message])
+        if failures:
+            raise failures[0].error
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+
+mail_pool = SMTPPool(
+    hostname=config.MAIL_SERVER,
+    port=config.MAIL_PORT,
+    username=config.MAIL_USERNAME if config.MAIL_USE_CREDENTIALS else None,
+    password=config.MAIL_PASSWORD if config.MAIL_USE_CREDENTIALS else None,
+    use_tls=config.MAIL_SSL_TLS,
+    start_tls=config.MAIL_STARTTLS,
+    validate_certs=config.MAIL_VALIDATE_CERTS,
+    size=config.MAIL_POOL_SIZE,
+    idle_timeout=config.MAIL_POOL_IDLE_TIMEOUT,
+)
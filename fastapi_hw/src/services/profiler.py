@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import hmac
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+from src.conf.config import config
+
+PROFILE_KEY = (config.SECRET_KEY_JWT + '_profile').encode()
+IDLE = ('<idle>', '', 0)
+AWAIT = ('<await>', '', 0)
+
+Frame = tuple[str, str, int]
+
+
+def frame_key(frame: FrameType) -> Frame:
+    code = frame.f_code
+    return code.co_qualname, code.co_filename, code.co_firstlineno
+
+
+def coroutine_frames(coro) -> list[FrameType]:
+    # Follows the await chain of a suspended coroutine down to the innermost
+    # frame, which is where the task is waiting.
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'ag_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'ag_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return frames
+
+
+def thread_frames(thread_id: int, root: FrameType | None) -> list[FrameType]:
+    frame = sys._current_frames().get(thread_id)
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            break
+        frame = frame.f_back
+    return frames[::-1]
+
+
+class Sampler:
+    # Samples the event loop from a background thread. A task that is running
+    # is recorded with its real thread stack; a suspended task with its await
+    # chain, ending in <await>. Time spent waiting on Postgres or Redis is
+    # thus charged to the awaiting code, not lost in the selector.
+    #
+    # Each sample is weighted by the time measured since the previous one,
+    # not by `interval`: while the loop runs CPU-bound code this thread waits
+    # for the GIL, and its ticks come much further apart.
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, thread_id: int, interval: float,
+                 task: asyncio.Task | None = None):
+        self.loop = loop
+        self.thread_id = thread_id
+        self.interval = interval
+        self.task = task
+        self.samples: Counter[tuple[Frame, ...]] = Counter()  # seconds per stack
+        self.started = self.finished = self._last = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def _task_stack(self, task: asyncio.Task, current: asyncio.Task | None) -> tuple[Frame, ...]:
+        frames = coroutine_frames(task.get_coro())
+        if task is current and frames:
+            stack = [frame_key(frame) for frame in thread_frames(self.thread_id, frames[0])]
+        else:
+            stack = [frame_key(frame) for frame in frames] + [AWAIT]
+        return (task.get_name(), '', 0), *stack
+
+    def sample(self) -> None:
+        now = time.perf_counter()
+        elapsed, self._last = now - self._last, now
+        current = asyncio.current_task(self.loop)
+        if self.task is not None:
+            tasks = [self.task]
+        else:
+            try:
+                tasks = list(asyncio.all_tasks(self.loop))
+            except RuntimeError:
+                return
+            if current is None:
+                self.samples[(IDLE,)] += elapsed
+        for task in tasks:
+            if not task.done():
+                self.samples[self._task_stack(task, current)] += elapsed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        self.started = self._last = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.finished = time.perf_counter()
+
+    def collapsed(self) -> str:
+        # Folded stacks, the input format of flamegraph.pl, in microseconds.
+        lines = [';'.join(name for name, _, _ in stack) + f' {round(seconds * 1e6)}'
+                 for stack, seconds in self.samples.items()]
+        return '\n'.join(sorted(lines)) + '\n'
+
+    def speedscope(self, name: str) -> dict:
+        frames: dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, seconds in self.samples.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(seconds)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': [{'name': name, 'file': file, 'line': line} for name, file, line in frames]},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights,
+            }],
+            'name': name,
+            'exporter': 'hw_13 sampling profiler',
+        }
+
+
+def start_sampler(interval: float, task: asyncio.Task | None = None) -> Sampler:
+    # Must be called from the event loop thread.
+    sampler = Sampler(asyncio.get_running_loop(), threading.get_ident(), interval, task)
+    sampler.start()
+    return sampler
+
+
+def create_profile_token(ttl: int = config.PROFILER_TOKEN_TTL) -> str:
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(PROFILE_KEY, expires.encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+
+def verify_profile_token(token: str) -> bool:
+    expires, _, signature = token.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(PROFILE_KEY, expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
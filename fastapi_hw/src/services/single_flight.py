@@ -0,0 +1,131 @@
+import asyncio
+import math
+import pickle
+import random
+import time
+from typing import Any, Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+from src.conf.config import config
+
+
+class SingleFlight:
+    # Coalesces concurrent calls for the same key inside one process: the
+    # first caller runs the loader, the others await its result.
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                # Only the leader was cancelled: take over the load.
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+
+class CachedLoader:
+    # Read-through Redis cache with request coalescing. Entries store the time
+    # the loader took so hot keys can be refreshed early with probability
+    # growing towards expiry (XFetch), instead of all expiring at once. An
+    # optional Redis lock coalesces misses across processes too.
+
+    def __init__(self, cache: Redis, prefix: str, ttl: int, beta: float = config.CACHE_EARLY_REFRESH_BETA,
+                 use_lock: bool = config.CACHE_USE_REDIS_LOCK, lock_timeout: float = 5.0):
+        self.cache = cache
+        self.prefix = prefix
+        self.ttl = ttl
+        self.beta = beta
+        self.use_lock = use_lock
+        self.lock_timeout = lock_timeout
+        self.single_flight = SingleFlight()
+
+    def _key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    def _should_refresh(self, delta: float, expiry: float) -> bool:
+        return time.time() - delta * self.beta * math.log(random.random() or 1e-12) >= expiry
+
+    async def _store(self, key: str, value: Any, delta: float) -> bytes:
+        raw = pickle.dumps(value)
+        entry = pickle.dumps((raw, delta, time.time() + self.ttl))
+        await self.cache.set(self._key(key), entry, ex=self.ttl)
+        return raw
+
+    async def _read(self, key: str) -> tuple[bytes, float, float] | None:
+        entry = await self.cache.get(self._key(key))
+        return pickle.loads(entry) if entry is not None else None
+
+    async def _wait_for_value(self, key: str) -> bytes | None:
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = await self._read(key)
+            if entry is not None:
+                return entry[0]
+        return None
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], stale: bytes | None):
+        lock = None
+        if self.use_lock:
+            lock = self.cache.lock(f'{self._key(key)}:lock', timeout=self.lock_timeout)
+            if not await lock.acquire(blocking=False):
+                # Another process is loading this key: serve the stale copy or wait for its result.
+                raw = stale if stale is not None else await self._wait_for_value(key)
+                if raw is not None:
+                    return None, raw
+                lock = None
+        try:
+            start = time.monotonic()
+            value = await loader()
+            if value is None:
+                return None, None
+            raw = await self._store(key, value, time.monotonic() - start)
+            return value, raw
+        finally:
+            if lock is not None:
+                try:
+                    await lock.release()
+                except LockError:
+                    pass
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = await self._read(key)
+        stale = None
+        if entry is not None:
+            raw, delta, expiry = entry
+            if not self._should_refresh(delta, expiry):
+                return pickle.loads(raw)
+            stale = raw
+
+        (value, raw), shared = await self.single_flight.do(key, lambda: self._load(key, loader, stale))
+        if value is not None and not shared:
+            return value
+        return pickle.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        await self._store(key, value, 0.0)
+
+    async def delete(self, key: str) -> None:
+        await self.cache.delete(self._key(key))
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO
+from urllib.request import urlopen
+
+import cloudinary
+import cloudinary.uploader
+
+from src.conf.config import BASE_DIR, config
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageBackend(ABC):
+    # Backends implement blocking IO; the public coroutines run it in a thread
+    # so uploads never block the event loop.
+
+    @abstractmethod
+    def save_sync(self, key: str, file: BinaryIO) -> str:
+        ...
+
+    @abstractmethod
+    def read_sync(self, key: str) -> bytes:
+        ...
+
+    async def save(self, key: str, file: BinaryIO) -> str:
+        return await asyncio.to_thread(self.save_sync, key, file)
+
+    async def read(self, key: str) -> bytes:
+        return await asyncio.to_thread(self.read_sync, key)
+
+
+class CloudinaryStorage(StorageBackend):
+
+    def __init__(self, cloud_name: str, api_key: int, api_secret: str):
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+
+    def save_sync(self, key: str, file: BinaryIO) -> str:
+        res = cloudinary.uploader.upload_large(file, public_id=key, overwrite=True, chunk_size=6 * CHUNK_SIZE)
+        return cloudinary.CloudinaryImage(key).build_url(version=res.get('version'))
+
+    def read_sync(self, key: str) -> bytes:
+        with urlopen(cloudinary.CloudinaryImage(key).build_url()) as response:
+            return response.read()
+
+
+class LocalStorage(StorageBackend):
+
+    def __init__(self, base_dir: str | Path, base_url: str):
+        self.base_dir = Path(base_dir)
+        self.base_url = base_url
+
+    def _path(self, key: str) -> Path:
+        path = (self.base_dir / key).resolve()
+        if not path.is_relative_to(self.base_dir.resolve()):
+            raise ValueError(f'Invalid storage key: {key}')
+        return path
+
+    def save_sync(self, key: str, file: BinaryIO) -> str:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(file, out, CHUNK_SIZE)
+            os.replace(tmp_name, path)
+        except Exception:
+            os.unlink(tmp_name)
+            raise
+        return f'{self.base_url}{key}?v={int(time.time())}'
+
+    def read_sync(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+
+def get_storage() -> StorageBackend:
+    if config.AVATAR_STORAGE == 'local':
+        return LocalStorage(BASE_DIR / config.AVATAR_LOCAL_DIR, config.AVATAR_LOCAL_URL)
+    return CloudinaryStorage(config.CLD_NAME, config.CLD_API_KEY, config.CLD_API_SECRET)
+
+
+storage = get_storage()
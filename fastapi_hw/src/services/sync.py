@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class Cursor:
+    ts: datetime = EPOCH
+    id: int = 0
+
+
+@dataclass
+class SyncToken:
+    # Separate keyset cursors for updated contacts and for tombstones.
+    contacts: Cursor = field(default_factory=Cursor)
+    tombstones: Cursor = field(default_factory=Cursor)
+
+
+def encode_sync_token(token: SyncToken) -> str:
+    data = {
+        'c': [token.contacts.ts.isoformat(), token.contacts.id],
+        't': [token.tombstones.ts.isoformat(), token.tombstones.id],
+    }
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+
+def decode_sync_token(value: str) -> SyncToken:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value.encode()))
+        return SyncToken(
+            contacts=Cursor(datetime.fromisoformat(data['c'][0]), int(data['c'][1])),
+            tombstones=Cursor(datetime.fromisoformat(data['t'][0]), int(data['t'][1])),
+        )
+    except (binascii.Error, ValueError, KeyError, IndexError, TypeError):
+        raise ValueError('Invalid sync token')
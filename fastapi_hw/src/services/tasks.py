@@ -0,0 +1,9 @@
+from src.services.avatar import avatar_service
+from src.services.email import send_email
+from src.services.jobs import register_job
+from src.services.reset_pass import send_email_pass
+
+
+register_job('send_email', send_email)
+register_job('send_email_pass', send_email_pass)
+register_job('avatar_thumbnail', avatar_service.create_thumbnail)
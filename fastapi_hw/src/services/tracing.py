@@ -0,0 +1,299 @@
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from src.conf.config import config
+
+logger = logging.getLogger(__name__)
+
+STOP = object()
+KINDS = {'internal': 1, 'server': 2, 'client': 3, 'producer': 4, 'consumer': 5}
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    name: str
+    parent_id: str | None = None
+    kind: str = 'internal'
+    sampled: bool = True
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    error: bool = False
+
+    @property
+    def traceparent(self) -> str:
+        return f'00-{self.trace_id}-{self.span_id}-{"01" if self.sampled else "00"}'
+
+    def set(self, key: str, value) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar('current_span', default=None)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    parts = value.split('-') if value else []
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == '01'
+
+
+class SpanExporter(ABC):
+
+    @abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        ...
+
+
+class FileExporter(SpanExporter):
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.writelines(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+
+
+class OTLPExporter(SpanExporter):
+    # OTLP/HTTP with the JSON encoding, accepted by the OpenTelemetry collector
+    # and most tracing backends on :4318.
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _value(value) -> dict:
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def _span(self, span: Span) -> dict:
+        data = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': KINDS[span.kind],
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': [{'key': key, 'value': self._value(value)} for key, value in span.attributes.items()],
+            'status': {'code': 2 if span.error else 0},
+        }
+        if span.parent_id:
+            data['parentSpanId'] = span.parent_id
+        return data
+
+    def export(self, spans: list[Span]) -> None:
+        body = json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'src.services.tracing'}, 'spans': [self._span(s) for s in spans]}],
+        }]}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class BatchProcessor:
+    # Finished spans are handed to a background thread that exports them in
+    # batches, so a request never waits on the file or the collector. When
+    # the exporter falls behind, new spans are dropped instead of queued.
+
+    def __init__(self, exporter: SpanExporter, max_queue: int = 10000, batch_size: int = 512,
+                 flush_interval: float = 2.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def _ensure_thread(self) -> None:
+        # A forked worker inherits the processor but not its thread.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def on_end(self, span: Span) -> None:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as err:
+            logger.warning("Failed to export %d spans: %s", len(batch), err)
+
+    def _run(self) -> None:
+        batch: list[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                span = None
+            if span is STOP:
+                break
+            if span is not None:
+                batch.append(span)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._export(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._export(batch)
+
+    def shutdown(self) -> None:
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(STOP)
+            self._thread.join(timeout=5)
+
+
+class Tracer:
+    # The sampling decision is made once, at the root span, and inherited by
+    # every child, including spans of jobs started from a traced request.
+
+    def __init__(self, processor: BatchProcessor | None, sample_rate: float):
+        self.processor = processor
+        self.sample_rate = sample_rate
+        self.enabled = processor is not None
+
+    def start_span(self, name: str, kind: str = 'internal', parent: str | None = None, child_only: bool = False,
+                   **attributes) -> Span | None:
+        if not self.enabled:
+            return None
+        current = current_span.get()
+        remote = parse_traceparent(parent) if current is None else None
+        if current is not None:
+            trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+        elif remote is not None:
+            trace_id, parent_id, sampled = remote
+        elif child_only:
+            return None
+        else:
+            trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < self.sample_rate
+        return Span(trace_id, os.urandom(8).hex(), name, parent_id, kind, sampled,
+                    attributes=attributes if sampled else {})
+
+    def end_span(self, span: Span | None, error: BaseException | None = None) -> None:
+        if span is None or not span.sampled:
+            return
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = True
+            span.attributes['error'] = repr(error)
+        self.processor.on_end(span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, kind: str = 'internal', parent: str | None = None, child_only: bool = False,
+             **attributes):
+        span = self.start_span(name, kind, parent, child_only, **attributes)
+        if span is None:
+            yield None
+            return
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as err:
+            self.end_span(span, err)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            current_span.reset(token)
+
+    @staticmethod
+    def traceparent() -> str | None:
+        span = current_span.get()
+        return span.traceparent if span is not None else None
+
+
+def get_tracer() -> Tracer:
+    if not config.TRACING_ENABLED:
+        return Tracer(None, 0.0)
+    if config.TRACING_EXPORTER == 'otlp':
+        exporter = OTLPExporter(config.TRACING_OTLP_ENDPOINT, config.TRACING_SERVICE_NAME)
+    else:
+        exporter = FileExporter(config.TRACING_FILE)
+    return Tracer(BatchProcessor(exporter), config.TRACING_SAMPLE_RATE)
+
+
+tracer = get_tracer()
+
+
+def instrument_sqlalchemy(engine) -> None:
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._trace_span = tracer.start_span('db.query', 'client', child_only=True,
+                                                **{'db.system': engine.dialect.name, 'db.statement': statement[:500]})
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        tracer.end_span(getattr(context, '_trace_span', None))
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        if context is not None:
+            tracer.end_span(getattr(context, '_trace_span', None), exception_context.original_exception)
+
+
+def instrument_redis(client) -> None:
+    # Wraps one client instance, so clients nobody asked to trace stay untouched.
+    execute_command = client.execute_command
+
+    if inspect.iscoroutinefunction(execute_command):
+        @functools.wraps(execute_command)
+        async def traced(*args, **options):
+            with tracer.span(f'redis {args[0]}', 'client', child_only=True, **{'db.system': 'redis'}):
+                return await execute_command(*args, **options)
+    else:
+        @functools.wraps(execute_command)
+        def traced(*args, **options):
+            with tracer.span(f'redis {args[0]}', 'client', child_only=True, **{'db.system': 'redis'}):
+                return execute_command(*args, **options)
+
+    client.execute_command = traced
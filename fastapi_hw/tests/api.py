@@ -0,0 +1,70 @@
+import asyncio
+from datetime import date
+
+import httpx
+from sqlalchemy import insert
+
+from main import app
+from src.database.db import sessionmanager
+from src.entity.models import Base, User
+from src.services.auth import auth_service
+
+
+async def reset_database() -> None:
+    async with sessionmanager._engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def create_user(email: str) -> tuple[int, dict[str, str]]:
+    # Returns the user id and the headers that authenticate as that user.
+    async with sessionmanager._engine.begin() as conn:
+        result = await conn.execute(insert(User).values(
+            username=email.split('@')[0], email=email, password='x', avatar='https://example.com/avatar.png',
+            confirmed=True, created_at=date.today(), updated_at=date.today()))
+    await auth_service.user_cache.delete(email)
+    token = await auth_service.create_access_token({'sub': email})
+    return result.inserted_primary_key[0], {'Authorization': f'Bearer {token}'}
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+class StreamingRequest:
+    # Drives the app directly over ASGI, so a response that never ends (an
+    # event stream) can be read chunk by chunk and then disconnected.
+
+    def __init__(self, path: str, headers: dict[str, str]):
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'test'), (b'user-agent', b'test')] + [
+                (key.lower().encode(), value.encode()) for key, value in headers.items()],
+            'client': ('127.0.0.1', 1234), 'server': ('test', 80),
+        }
+        self.status: int | None = None
+        self.chunks: asyncio.Queue[bytes] = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message['type'] == 'http.response.body':
+            await self.chunks.put(message.get('body', b''))
+
+    async def __aenter__(self):
+        self.task = asyncio.create_task(app(self.scope, self.receive, self.send))
+        return self
+
+    async def read(self, timeout: float = 5) -> str:
+        return (await asyncio.wait_for(self.chunks.get(), timeout)).decode()
+
+    async def __aexit__(self, *exc_info):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 5)
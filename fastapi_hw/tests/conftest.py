@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import fakeredis
+import redis
+import redis.asyncio
+
+# Config is read and the Redis clients are created when src is imported, so
+# the test environment must be in place before any test module imports it.
+ENVIRONMENT = {
+    'DB_URL': f'sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.sqlite3',
+    'SECRET_KEY_JWT': 'test-secret',
+    'ALGORITHM': 'HS256',
+    'MAIL_USERNAME': 'test@example.com',
+    'MAIL_PASSWORD': 'test',
+    'MAIL_FROM': 'test@example.com',
+    'MAIL_PORT': '465',
+    'MAIL_SERVER': 'localhost',
+    'REDIS_DOMAIN': 'localhost',
+    'REDIS_PORT': '6379',
+    'REDIS_PASSWORD': '',
+    'CLD_NAME': 'test',
+    'CLD_API_KEY': '0',
+    'CLD_API_SECRET': 'test',
+    'LOG_LEVEL': 'WARNING',
+    'JOBS_BACKEND': 'memory',
+    'EVENTS_BACKEND': 'memory',
+    'CACHE_USE_REDIS_LOCK': 'False',
+    'ADMIN_EMAILS': '["admin@example.com"]',
+    'STATIC_DIR': tempfile.mkdtemp(),
+}
+
+for key, value in ENVIRONMENT.items():
+    os.environ[key] = value
+
+redis.Redis = fakeredis.FakeRedis
+redis.asyncio.Redis = fakeredis.FakeAsyncRedis
+
+# users.created_at/updated_at default to now(), which SQLite cannot read back as a date.
+from benchmarks.environment import use_date_defaults  # noqa: E402
+
+use_date_defaults()
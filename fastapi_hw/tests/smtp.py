@@ -0,0 +1,47 @@
+import socket
+
+from aiosmtpd.controller import Controller
+
+
+class RecordingHandler:
+    # Accepts every recipient except refused@example.com, and defers the
+    # addresses in `defer` with a 451 once each.
+
+    def __init__(self, defer: tuple[str, ...] = ()):
+        self.messages: list[tuple[str, str]] = []
+        self.connections = 0
+        self.deferred = set(defer)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == 'refused@example.com':
+            return '550 No such user'
+        if address in self.deferred:
+            self.deferred.discard(address)
+            return '451 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos[0], envelope.content.decode('utf-8', 'replace')))
+        return '250 Message accepted'
+
+    @property
+    def recipients(self) -> list[str]:
+        return [recipient for recipient, _ in self.messages]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(handler: RecordingHandler) -> Controller:
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    return controller
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+import httpx
+
+from src.middleware.admission import AdmissionControlMiddleware, AdmissionController
+
+
+class GatedApp:
+    # Every request records its path and then waits for the gate, so the test
+    # decides how long requests stay in flight.
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.entered: list[str] = []
+
+    async def __call__(self, scope, receive, send):
+        self.entered.append(scope['path'])
+        await self.gate.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'ok'})
+
+
+async def wait_until(condition, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.001)
+
+
+class AdmissionControlTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_client(self, max_in_flight: int, reserved: int, max_queue: int, queue_timeout: float = 5):
+        self.app = GatedApp()
+        self.controller = AdmissionController(max_in_flight, reserved, max_queue, queue_timeout)
+        middleware = AdmissionControlMiddleware(self.app, controller=self.controller, retry_after=7)
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url='http://test')
+
+    def request(self, client: httpx.AsyncClient, path: str) -> asyncio.Task:
+        return asyncio.create_task(client.get(path))
+
+    async def test_reserved_slots_only_admit_critical(self):
+        async with self.make_client(max_in_flight=2, reserved=1, max_queue=0) as client:
+            first = self.request(client, '/contacts/all')
+            await wait_until(lambda: self.controller.in_flight == 1)
+
+            shed = await client.get('/contacts/all')
+            self.assertEqual(shed.status_code, 503)
+            self.assertEqual(shed.headers['Retry-After'], '7')
+
+            critical = self.request(client, '/auth/login')
+            await wait_until(lambda: self.controller.in_flight == 2)
+            self.app.gate.set()
+            self.assertEqual([(await first).status_code, (await critical).status_code], [200, 200])
+        self.assertEqual(self.controller.in_flight, 0)
+
+    async def test_bounded_queue(self):
+        async with self.make_client(max_in_flight=1, reserved=0, max_queue=2) as client:
+            running = self.request(client, '/contacts/all')
+            await wait_until(lambda: self.controller.in_flight == 1)
+            queued = [self.request(client, '/contacts/all') for _ in range(2)]
+            await wait_until(lambda: self.controller.metrics()['queued']['normal'] == 2)
+
+            shed = await client.get('/contacts/all')
+            self.assertEqual(shed.status_code, 503)
+
+            self.app.gate.set()
+            responses = await asyncio.gather(running, *queued)
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+        totals = self.controller.metrics()['totals']['normal']
+        self.assertEqual((totals['admitted'], totals['queued'], totals['shed']), (3, 2, 1))
+
+    async def test_queue_timeout(self):
+        async with self.make_client(max_in_flight=1, reserved=0, max_queue=5, queue_timeout=0.05) as client:
+            running = self.request(client, '/contacts/all')
+            await wait_until(lambda: self.controller.in_flight == 1)
+            response = await client.get('/contacts/all')
+            self.assertEqual(response.status_code, 503)
+            self.app.gate.set()
+            await running
+        self.assertEqual(self.controller.metrics()['totals']['normal']['timed_out'], 1)
+
+    async def test_waiters_admitted_by_priority(self):
+        async with self.make_client(max_in_flight=1, reserved=0, max_queue=5) as client:
+            running = self.request(client, '/contacts/all')
+            await wait_until(lambda: self.controller.in_flight == 1)
+            low = self.request(client, '/contacts/search')
+            await wait_until(lambda: self.controller.metrics()['queued']['low'] == 1)
+            normal = self.request(client, '/contacts/all')
+            await wait_until(lambda: self.controller.metrics()['queued']['normal'] == 1)
+            critical = self.request(client, '/auth/refresh_token')
+            await wait_until(lambda: self.controller.metrics()['queued']['critical'] == 1)
+
+            self.app.gate.set()
+            await asyncio.gather(running, low, normal, critical)
+        self.assertEqual(self.app.entered, ['/contacts/all', '/auth/refresh_token', '/contacts/all', '/contacts/search'])
+
+    async def test_streams_are_exempt(self):
+        async with self.make_client(max_in_flight=1, reserved=0, max_queue=0) as client:
+            running = self.request(client, '/contacts/all')
+            await wait_until(lambda: self.controller.in_flight == 1)
+            stream = self.request(client, '/contacts/stream')
+            await wait_until(lambda: '/contacts/stream' in self.app.entered)
+            self.app.gate.set()
+            self.assertEqual([(await running).status_code, (await stream).status_code], [200, 200])
@@ -0,0 +1,123 @@
+import asyncio
+import unittest
+from datetime import date, datetime, timezone
+
+from sqlalchemy import insert, select
+
+from src.database.db import sessionmanager
+from src.entity.models import Base, Contact, DigestCheckpoint, User
+from src.services.birthdays import BirthdayDigest, FakeClock
+from src.services.mail import SMTPPool
+from tests.smtp import RecordingHandler, start_server
+
+TODAY = date(2026, 3, 10)
+
+
+class StoppingClock(FakeClock):
+    # A FakeClock that parks the scheduler once it would sleep past `until`.
+
+    def __init__(self, now: datetime, until: datetime):
+        super().__init__(now)
+        self.until = until
+        self.parked = asyncio.Event()
+
+    async def sleep(self, seconds: float) -> None:
+        await super().sleep(seconds)
+        if self.current >= self.until:
+            self.parked.set()
+            await asyncio.Event().wait()
+
+
+class BirthdayDigestTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        async with sessionmanager._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        self.handler = RecordingHandler()
+        self.controller = start_server(self.handler)
+        self.pool = SMTPPool('127.0.0.1', self.controller.port, None, None, use_tls=False, start_tls=False,
+                             validate_certs=False, size=2, idle_timeout=60, timeout=5)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        self.controller.stop()
+        await sessionmanager._engine.dispose()
+
+    async def add_users(self, users: dict[str, list[tuple[str, date]]]) -> None:
+        # users: email -> [(first name, birthday)]
+        async with sessionmanager._engine.begin() as conn:
+            for user_id, (email, contacts) in enumerate(users.items(), start=1):
+                await conn.execute(insert(User).values(id=user_id, username=email.split('@')[0], email=email,
+                                                       password='x', created_at=TODAY, updated_at=TODAY))
+                for index, (first_name, birthday) in enumerate(contacts):
+                    await conn.execute(insert(Contact).values(
+                        first_name=first_name, last_name='Contact', email=f'{first_name}{index}@example.com',
+                        phone='0501234567', birthday=birthday, description='Test contact', user_id=user_id))
+
+    def digest(self, clock: FakeClock | None = None, **options) -> BirthdayDigest:
+        clock = clock or FakeClock(datetime(2026, 3, 10, 8, tzinfo=timezone.utc))
+        return BirthdayDigest(self.pool, clock, days=7, batch_size=2, send_hour=8, retry_delay=30, **options)
+
+    async def checkpoint(self, run_date: date) -> DigestCheckpoint:
+        async with sessionmanager.session() as db:
+            stmt = select(DigestCheckpoint).filter(DigestCheckpoint.run_date == run_date)
+            return (await db.execute(stmt)).scalar_one()
+
+    async def test_window_matches_birthdays_endpoint(self):
+        await self.add_users({
+            'ann@example.com': [('Today', date(1990, 3, 10)), ('Week', date(1985, 3, 17)), ('Late', date(1980, 3, 18))],
+            'bob@example.com': [('Soon', date(2000, 3, 12))],
+            'eve@example.com': [('Past', date(1999, 3, 9))],
+        })
+        self.assertEqual(await self.digest().run(TODAY), 2)
+        self.assertEqual(sorted(self.handler.recipients), ['ann@example.com', 'bob@example.com'])
+        body = dict(self.handler.messages)['ann@example.com']
+        self.assertIn('Today Contact', body)
+        self.assertIn('Week Contact', body)
+        self.assertNotIn('Late Contact', body)
+        self.assertIsNotNone((await self.checkpoint(TODAY)).completed_at)
+
+    async def test_refused_recipient_does_not_block_digest(self):
+        await self.add_users({
+            'ann@example.com': [('Ann', date(1990, 3, 11))],
+            'refused@example.com': [('Rex', date(1990, 3, 11))],
+            'bob@example.com': [('Bob', date(1990, 3, 11))],
+            'cat@example.com': [('Cat', date(1990, 3, 11))],
+        })
+        digest = self.digest()
+        self.assertEqual(await digest.run(TODAY), 3)
+        self.assertEqual(sorted(self.handler.recipients), ['ann@example.com', 'bob@example.com', 'cat@example.com'])
+        self.assertEqual([dead.email for dead, _ in digest.dead_letters], ['refused@example.com'])
+
+        checkpoint = await self.checkpoint(TODAY)
+        self.assertEqual((checkpoint.last_user_id, checkpoint.sent), (4, 3))
+        self.assertIsNotNone(checkpoint.completed_at)
+        # The finished run is not repeated, so nobody gets the digest twice.
+        self.assertEqual(await self.digest().run(TODAY), 0)
+        self.assertEqual(len(self.handler.messages), 3)
+
+    async def test_deferred_recipient_is_retried(self):
+        self.handler.deferred.add('bob@example.com')
+        await self.add_users({'ann@example.com': [('Ann', date(1990, 3, 11))],
+                              'bob@example.com': [('Bob', date(1990, 3, 11))]})
+        clock = FakeClock(datetime(2026, 3, 10, 8, tzinfo=timezone.utc))
+        digest = self.digest(clock)
+        self.assertEqual(await digest.run(TODAY), 2)
+        self.assertEqual(sorted(self.handler.recipients), ['ann@example.com', 'bob@example.com'])
+        self.assertEqual(digest.dead_letters, [])
+        self.assertEqual(clock.current, datetime(2026, 3, 10, 8, 0, 30, tzinfo=timezone.utc))
+
+    async def test_schedule_sends_once_a_day(self):
+        await self.add_users({'ann@example.com': [('Ann', date(1990, 3, 11))]})
+        clock = StoppingClock(datetime(2026, 3, 10, 6, tzinfo=timezone.utc),
+                              until=datetime(2026, 3, 12, 0, tzinfo=timezone.utc))
+        task = asyncio.create_task(self.digest(clock).run_forever())
+        await asyncio.wait_for(clock.parked.wait(), timeout=10)
+        task.cancel()
+
+        # 10 March at 08:00, then 11 March at 08:00; the contact is in both windows.
+        self.assertEqual(self.handler.recipients, ['ann@example.com', 'ann@example.com'])
+        for run_date in (date(2026, 3, 10), date(2026, 3, 11)):
+            self.assertEqual((await self.checkpoint(run_date)).sent, 1)
+        self.assertEqual(clock.current, datetime(2026, 3, 12, 8, tzinfo=timezone.utc))
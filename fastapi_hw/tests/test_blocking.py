@@ -0,0 +1,33 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+
+from src.services.blocking import email_key, full_name, name_key
+from src.services.duplicates import candidate_pairs, find_clusters
+
+
+def contact(id, first_name, last_name, email, phone='', birthday=date(1990, 1, 1)):
+    return SimpleNamespace(id=id, first_name=first_name, last_name=last_name, email=email, phone=phone,
+                           birthday=birthday, email_key=email_key(email), phone_key=None,
+                           name_key=name_key(first_name, last_name))
+
+
+class BlockingKeyTests(unittest.TestCase):
+
+    def test_non_latin_names_keep_their_letters(self):
+        self.assertEqual(full_name('Олена', 'Коваль'), 'коваль олена')
+        self.assertEqual(name_key('Олена', 'Коваль'), name_key('Коваль', 'Олена'))
+        self.assertNotEqual(name_key('Олена', 'Коваль'), name_key('Іван', 'Петренко'))
+
+    def test_accents_are_folded(self):
+        self.assertEqual(name_key('José', 'García'), name_key('Jose', 'Garcia'))
+
+    def test_empty_keys_are_none(self):
+        self.assertIsNone(name_key('', '-'))
+        self.assertIsNone(email_key(''))
+        self.assertEqual(full_name('', '...'), '')
+
+    def test_blank_names_do_not_match(self):
+        contacts = [contact(1, '-', '-', 'a@example.com'), contact(2, '.', '.', 'b@example.com')]
+        self.assertEqual(candidate_pairs(contacts), set())
+        self.assertEqual(find_clusters(contacts, 0.1), [])
@@ -0,0 +1,99 @@
+import unittest
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+
+from src.database.db import sessionmanager
+from src.entity.models import Contact, ContactTombstone
+from src.repository.contacts import get_duplicate_candidates
+from tests.api import client, create_user, reset_database
+
+
+def contact(first_name: str, last_name: str, email: str, phone: str, description: str = 'Met at work') -> dict:
+    return {'first_name': first_name, 'last_name': last_name, 'email': email, 'phone': phone,
+            'birthday': '1990-03-10', 'description': description}
+
+
+class DuplicateTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await reset_database()
+        self.user_id, self.headers = await create_user('dedupe@example.com')
+        _, self.other_headers = await create_user('other@example.com')
+
+    async def asyncTearDown(self):
+        await sessionmanager._engine.dispose()
+
+    async def add(self, body: dict, headers: dict | None = None) -> int:
+        async with client() as api:
+            response = await api.post('/contacts/', json=body, headers=headers or self.headers)
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    async def add_people(self) -> tuple[int, int, int, int]:
+        ann = await self.add(contact('Anna', 'Kowalski', 'anna.kowalski@gmail.com', '+380501234567'))
+        # Same mailbox and number, written differently.
+        copy = await self.add(contact('Ana', 'Kowalsky', 'annakowalski+work@gmail.com', '050 123 4567',
+                                      'From the gym'))
+        bob = await self.add(contact('Robert', 'Smith', 'bob@example.com', '0671112233'))
+        # Someone else's copy of Ann, out of reach.
+        foreign = await self.add(contact('Anna', 'Kowalski', 'anna.kowalski@gmail.com', '+380501234567'),
+                                 self.other_headers)
+        return ann, copy, bob, foreign
+
+    async def test_candidates_share_a_key(self):
+        ann, copy, _, _ = await self.add_people()
+        await self.add(contact('Roberta', 'Lopez', 'roberta@example.com', '0931234000'))
+        async with sessionmanager.session() as db:
+            candidates = await get_duplicate_candidates(db, SimpleNamespace(id=self.user_id))
+        self.assertEqual(sorted(candidate.id for candidate in candidates), [ann, copy])
+
+    async def test_duplicates_endpoint(self):
+        ann, copy, _, _ = await self.add_people()
+        async with client() as api:
+            response = await api.get('/contacts/duplicates', headers=self.headers)
+            strict = await api.get('/contacts/duplicates', params={'threshold': 1.0}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        (cluster,) = response.json()
+        self.assertEqual([item['id'] for item in cluster['contacts']], [ann, copy])
+        self.assertGreater(cluster['score'], 0.95)
+        self.assertEqual(strict.json(), [])
+
+    async def test_merge_keeps_primary_and_leaves_tombstones(self):
+        ann, copy, bob, _ = await self.add_people()
+        async with client() as api:
+            response = await api.post('/contacts/duplicates/merge', json={'primary_id': ann, 'duplicate_ids': [copy]},
+                                      headers=self.headers)
+            listed = await api.get('/contacts/all', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['id'], response.json()['description']), (ann, 'Met at work; From the gym'))
+        self.assertEqual(sorted(item['id'] for item in listed.json()), [ann, bob])
+        async with sessionmanager.session() as db:
+            tombstones = (await db.execute(select(ContactTombstone.contact_id, ContactTombstone.user_id))).all()
+        self.assertEqual([tuple(row) for row in tombstones], [(copy, self.user_id)])
+
+    async def assert_unchanged(self, count: int):
+        async with sessionmanager.session() as db:
+            self.assertEqual(await db.scalar(select(func.count()).select_from(Contact)), count)
+            self.assertEqual(await db.scalar(select(func.count()).select_from(ContactTombstone)), 0)
+
+    async def test_merge_with_a_foreign_contact_changes_nothing(self):
+        ann, copy, _, foreign = await self.add_people()
+        async with client() as api:
+            response = await api.post('/contacts/duplicates/merge',
+                                      json={'primary_id': ann, 'duplicate_ids': [copy, foreign]}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        await self.assert_unchanged(4)
+
+    async def test_long_descriptions_are_not_cut(self):
+        ann = await self.add(contact('Anna', 'Kowalski', 'ann@example.com', '0501234567', 'a' * 200))
+        copy = await self.add(contact('Anna', 'Kowalski', 'ann@example.org', '0501234567', 'b' * 200))
+        merge = {'primary_id': ann, 'duplicate_ids': [copy]}
+        async with client() as api:
+            rejected = await api.post('/contacts/duplicates/merge', json=merge, headers=self.headers)
+            await self.assert_unchanged(2)
+            merged = await api.post('/contacts/duplicates/merge', json={**merge, 'description': 'Kept this one'},
+                                    headers=self.headers)
+        self.assertEqual(rejected.status_code, 400)
+        self.assertIn('longer than 250 characters', rejected.json()['detail'])
+        self.assertEqual((merged.status_code, merged.json()['description']), (200, 'Kept this one'))
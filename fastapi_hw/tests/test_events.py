@@ -0,0 +1,81 @@
+import asyncio
+import json
+import unittest
+
+from src.database.db import sessionmanager
+from src.services.events import OVERFLOW, InMemoryBroker, Subscription, event_broker
+from tests.api import StreamingRequest, create_user, reset_database
+
+
+class SubscriptionTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_overflow_replaces_backlog_with_marker(self):
+        subscription = Subscription(maxsize=2)
+        for frame in ('a', 'b', 'c', 'd'):
+            subscription.put(frame)
+        self.assertTrue(subscription.overflowed)
+        self.assertIs(await subscription.get(), OVERFLOW)
+        self.assertTrue(subscription.queue.empty())
+
+
+class InMemoryBrokerTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.broker = InMemoryBroker(queue_size=3)
+
+    async def test_publish_reaches_every_subscription_of_the_user(self):
+        async with self.broker.subscribe(1) as first, self.broker.subscribe(1) as second, \
+                self.broker.subscribe(2) as other:
+            await self.broker.publish(1, 'contact.created', {'id': 5})
+            expected = 'event: contact.created\ndata: {"id": 5}\n\n'
+            self.assertEqual(await first.get(), expected)
+            self.assertEqual(await second.get(), expected)
+            self.assertTrue(other.queue.empty())
+            self.assertEqual(self.broker.metrics(), {'users': 2, 'connections': 3})
+        self.assertEqual(self.broker.metrics(), {'users': 0, 'connections': 0})
+
+    async def test_stream_sends_events_and_heartbeats(self):
+        stream = self.broker.stream(1, heartbeat=0.01)
+        self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+        self.assertEqual(await anext(stream), ': heartbeat\n\n')
+        await self.broker.publish(1, 'contact.deleted', {'id': 7})
+        self.assertEqual(await anext(stream), 'event: contact.deleted\ndata: {"id": 7}\n\n')
+        await stream.aclose()
+        self.assertEqual(self.broker.metrics()['connections'], 0)
+
+    async def test_slow_client_is_told_to_resync(self):
+        stream = self.broker.stream(1, heartbeat=5)
+        await anext(stream)
+        for contact_id in range(5):
+            await self.broker.publish(1, 'contact.updated', {'id': contact_id})
+        self.assertEqual(await anext(stream), 'event: resync\ndata: {}\n\n')
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertEqual(self.broker.metrics()['connections'], 0)
+
+
+class StreamEndpointTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await reset_database()
+        self.user_id, self.headers = await create_user('stream@example.com')
+
+    async def asyncTearDown(self):
+        await sessionmanager._engine.dispose()
+
+    async def test_stream_holds_no_database_connection(self):
+        pool = sessionmanager._engine.pool
+        async with StreamingRequest('/contacts/stream', self.headers) as response:
+            self.assertEqual(await response.read(), 'retry: 3000\n\n')
+            self.assertEqual(response.status, 200)
+            self.assertEqual(pool.checkedout(), 0)
+
+            await event_broker.publish(self.user_id, 'contact.created', {'id': 1})
+            frame = await response.read()
+            self.assertEqual(json.loads(frame.split('data: ', 1)[1]), {'id': 1})
+        self.assertEqual(event_broker.metrics()['connections'], 0)
+
+    async def test_stream_requires_token(self):
+        async with StreamingRequest('/contacts/stream', {}) as response:
+            await response.read()
+            self.assertEqual(response.status, 401)
@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import fakeredis
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from src.database.db import sessionmanager
+from src.services.idempotency import IdempotencyStore
+from tests.api import client, create_user, reset_database
+
+
+class Body(BaseModel):
+    name: str
+
+
+def request(path: str = '/contacts/'):
+    return SimpleNamespace(method='POST', url=SimpleNamespace(path=path))
+
+
+class CountingHandler:
+    # Holds every call until the gate opens, so concurrent requests overlap.
+
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        return 201, {'id': self.calls}
+
+
+class IdempotencyStoreTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.store = self.make_store()
+
+    def make_store(self, lock_timeout: float = 5) -> IdempotencyStore:
+        # Stores sharing a server stand for separate workers.
+        return IdempotencyStore(fakeredis.FakeAsyncRedis(server=self.server), 'test', 60, lock_timeout)
+
+    async def test_retry_is_replayed(self):
+        handler = CountingHandler()
+        first = await self.store.respond('key', 1, request(), Body(name='a'), handler)
+        second = await self.store.respond('key', 1, request(), Body(name='a'), handler)
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual((first.status_code, first.body), (second.status_code, second.body))
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+
+    async def test_keys_are_per_user(self):
+        handler = CountingHandler()
+        await self.store.respond('key', 1, request(), Body(name='a'), handler)
+        await self.store.respond('key', 2, request(), Body(name='a'), handler)
+        self.assertEqual(handler.calls, 2)
+
+    async def test_key_reused_for_another_request_is_rejected(self):
+        handler = CountingHandler()
+        await self.store.respond('key', 1, request(), Body(name='a'), handler)
+        for path, name in (('/contacts/', 'b'), ('/contacts/batch', 'a')):
+            with self.assertRaises(HTTPException) as raised:
+                await self.store.respond('key', 1, request(path), Body(name=name), handler)
+            self.assertEqual(raised.exception.status_code, 422)
+        self.assertEqual(handler.calls, 1)
+
+    async def test_client_errors_are_stored_server_errors_are_not(self):
+        async def rejected():
+            raise HTTPException(status_code=404, detail='Contact not found')
+
+        response = await self.store.respond('missing', 1, request(), Body(name='a'), rejected)
+        self.assertEqual((response.status_code, response.body), (404, b'{"detail":"Contact not found"}'))
+
+        async def failing():
+            raise HTTPException(status_code=503, detail='Unavailable')
+
+        with self.assertRaises(HTTPException):
+            await self.store.respond('failed', 1, request(), Body(name='a'), failing)
+        handler = CountingHandler()
+        await self.store.respond('failed', 1, request(), Body(name='a'), handler)
+        self.assertEqual(handler.calls, 1)
+
+    async def test_concurrent_requests_run_once(self):
+        handler = CountingHandler()
+        handler.gate.clear()
+        workers = [self.store, self.store, self.make_store(), self.make_store()]
+        calls = [asyncio.create_task(store.respond('key', 1, request(), Body(name='a'), handler))
+                 for store in workers]
+        await asyncio.sleep(0.05)
+        handler.gate.set()
+        responses = await asyncio.gather(*calls)
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual({response.body for response in responses}, {b'{"id":1}'})
+        self.assertEqual(sum('Idempotent-Replayed' in response.headers for response in responses), 3)
+
+    async def test_lock_outlives_its_timeout_while_handler_runs(self):
+        handler = CountingHandler(delay=0.5)
+        first_worker, second_worker = self.make_store(lock_timeout=0.15), self.make_store(lock_timeout=0.15)
+        first = asyncio.create_task(first_worker.respond('key', 1, request(), Body(name='a'), handler))
+        await asyncio.sleep(0.3)
+        # Past the lock timeout: the retry must still see the request as running.
+        with self.assertRaises(HTTPException) as raised:
+            await second_worker.respond('key', 1, request(), Body(name='a'), handler)
+        self.assertEqual(raised.exception.status_code, 409)
+        await first
+        replay = await second_worker.respond('key', 1, request(), Body(name='a'), handler)
+        self.assertEqual(replay.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(handler.calls, 1)
+
+
+class IdempotentEndpointTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await reset_database()
+        _, self.headers = await create_user('idempotent@example.com')
+
+    async def asyncTearDown(self):
+        await sessionmanager._engine.dispose()
+
+    async def test_create_contact_is_replayed(self):
+        contact = {'first_name': 'Ann', 'last_name': 'Lee', 'email': 'ann@example.com', 'phone': '0501234567',
+                   'birthday': '1990-03-10', 'description': 'Friend'}
+        headers = {**self.headers, 'Idempotency-Key': 'create-ann'}
+        async with client() as api:
+            first = await api.post('/contacts/', json=contact, headers=headers)
+            second = await api.post('/contacts/', json=contact, headers=headers)
+            other = await api.post('/contacts/', json={**contact, 'first_name': 'Bob'}, headers=headers)
+            listed = await api.get('/contacts/all', headers=self.headers)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((second.status_code, second.json()), (201, first.json()))
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(other.status_code, 422)
+        self.assertEqual(len(listed.json()), 1)
@@ -0,0 +1,141 @@
+import asyncio
+import unittest
+
+import fakeredis
+
+from src.services.jobs import InMemoryQueue, Job, RedisStreamQueue, Worker, handlers, register_job
+
+
+class Handler:
+    # Fails the first `failures` calls, then succeeds.
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+        self.done = asyncio.Event()
+
+    async def __call__(self, **payload):
+        self.calls.append(payload)
+        if len(self.calls) <= self.failures:
+            raise RuntimeError(f'failure {len(self.calls)}')
+        self.done.set()
+
+
+class JobTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def register(self, name: str, handler: Handler) -> None:
+        register_job(name, handler)
+        self.addCleanup(handlers.pop, name)
+
+
+class InMemoryQueueTests(JobTestCase):
+
+    async def test_dedup(self):
+        queue = InMemoryQueue()
+        self.assertIsNotNone(await queue.enqueue('test', {}, dedup_key='a'))
+        self.assertIsNone(await queue.enqueue('test', {}, dedup_key='a'))
+        self.assertIsNotNone(await queue.enqueue('test', {}, dedup_key='b'))
+        self.assertEqual((await queue.metrics())['ready'], 2)
+
+    async def test_reserve_and_ack(self):
+        queue = InMemoryQueue()
+        await queue.enqueue('test', {'n': 1})
+        await queue.enqueue('test', {'n': 2})
+        jobs = await queue.reserve('consumer', count=5, block_ms=10)
+        self.assertEqual([job.payload['n'] for job in jobs], [1, 2])
+        self.assertEqual(await queue.metrics(), {'ready': 0, 'in_flight': 2, 'delayed': 0, 'dead': 0})
+        for job in jobs:
+            await queue.ack(job)
+        self.assertEqual((await queue.metrics())['in_flight'], 0)
+
+    async def test_reserve_times_out_when_empty(self):
+        self.assertEqual(await InMemoryQueue().reserve('consumer', count=1, block_ms=10), [])
+
+
+class WorkerTests(JobTestCase):
+
+    def setUp(self):
+        self.queue = InMemoryQueue()
+        self.worker = Worker(self.queue, concurrency=2, max_attempts=3, backoff_base=10, backoff_max=60)
+
+    async def reserve_one(self) -> Job:
+        [job] = await self.queue.reserve('consumer', count=1, block_ms=10)
+        return job
+
+    async def test_success_is_acked(self):
+        handler = Handler()
+        self.register('ok', handler)
+        await self.queue.enqueue('ok', {'x': 1})
+        await self.worker.execute(await self.reserve_one())
+        self.assertEqual(handler.calls, [{'x': 1}])
+        self.assertEqual(await self.queue.metrics(), {'ready': 0, 'in_flight': 0, 'delayed': 0, 'dead': 0})
+
+    async def test_failure_is_retried_later(self):
+        self.register('flaky', Handler(failures=1))
+        await self.queue.enqueue('flaky', {})
+        job = await self.reserve_one()
+        await self.worker.execute(job)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(await self.queue.metrics(), {'ready': 0, 'in_flight': 0, 'delayed': 1, 'dead': 0})
+        # Backed off by 10-20s: not due yet.
+        self.assertEqual(await self.queue.reserve('consumer', count=1, block_ms=10), [])
+
+    async def test_dead_after_max_attempts(self):
+        self.register('broken', Handler(failures=10))
+        await self.queue.enqueue('broken', {}, dedup_key='broken')
+        job = await self.reserve_one()
+        job.attempts = 2
+        await self.worker.execute(job)
+        [(dead, error)] = self.queue.dead_jobs
+        self.assertEqual((dead.id, error), (job.id, 'failure 1'))
+        # A dead job frees its dedup key, so it can be enqueued again.
+        self.assertIsNotNone(await self.queue.enqueue('broken', {}, dedup_key='broken'))
+
+    async def test_unknown_job_is_dead(self):
+        await self.queue.enqueue('missing', {})
+        await self.worker.execute(await self.reserve_one())
+        self.assertEqual(self.queue.dead_jobs[0][1], 'unknown job')
+
+    def test_backoff(self):
+        for attempts, limit in ((1, 20), (2, 40), (3, 60), (10, 60)):
+            delay = self.worker.backoff(attempts)
+            self.assertTrue(limit / 2 <= delay <= limit, (attempts, delay))
+
+    async def test_run_retries_until_success(self):
+        handler = Handler(failures=2)
+        self.register('flaky', handler)
+        worker = Worker(self.queue, concurrency=2, max_attempts=5, backoff_base=0.001, backoff_max=0.01)
+        await self.queue.enqueue('flaky', {})
+        task = asyncio.create_task(worker.run())
+        await asyncio.wait_for(handler.done.wait(), timeout=10)
+        worker.stop()
+        await asyncio.wait_for(task, timeout=5)
+        self.assertEqual(len(handler.calls), 3)
+        self.assertEqual(await self.queue.metrics(), {'ready': 0, 'in_flight': 0, 'delayed': 0, 'dead': 0})
+
+
+class RedisStreamQueueTests(JobTestCase):
+
+    def setUp(self):
+        self.client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+        self.queue = RedisStreamQueue(self.client, 'test-jobs', visibility_timeout=300)
+
+    async def test_dedup(self):
+        self.assertIsNotNone(await self.queue.enqueue('test', {}, dedup_key='a'))
+        self.assertIsNone(await self.queue.enqueue('test', {}, dedup_key='a'))
+        self.assertEqual(await self.client.xlen(self.queue.stream), 1)
+        self.assertLessEqual(await self.client.ttl(self.queue.dedup_prefix + 'a'), 3600)
+
+    async def test_retry_and_dead(self):
+        job_id = await self.queue.enqueue('test', {'n': 1}, dedup_key='a')
+        [job] = await self.queue.reserve('consumer', count=1, block_ms=10)
+        self.assertEqual((job.id, job.payload), (job_id, {'n': 1}))
+
+        await self.queue.retry(job, delay=0)
+        self.assertEqual(await self.queue.metrics(), {'ready': 0, 'in_flight': 0, 'delayed': 1, 'dead': 0})
+        [job] = await self.queue.reserve('consumer', count=1, block_ms=10)
+        self.assertEqual(job.id, job_id)
+
+        await self.queue.dead(job, 'boom')
+        self.assertEqual(await self.queue.metrics(), {'ready': 0, 'in_flight': 0, 'delayed': 0, 'dead': 1})
+        self.assertFalse(await self.client.exists(self.queue.dedup_prefix + 'a'))
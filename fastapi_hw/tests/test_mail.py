@@ -0,0 +1,59 @@
+import unittest
+
+import aiosmtplib
+
+from src.services.mail import SMTPPool, build_message
+from tests.smtp import RecordingHandler, free_port, start_server
+
+
+def make_pool(port: int) -> SMTPPool:
+    return SMTPPool('127.0.0.1', port, None, None, use_tls=False, start_tls=False, validate_certs=False,
+                    size=2, idle_timeout=60, timeout=5)
+
+
+def message(recipient: str):
+    return build_message('Test', recipient, 'verify_email.html', {'host': 'http://test/', 'username': 'u', 'token': 't'})
+
+
+class SMTPPoolTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.handler = RecordingHandler()
+        self.controller = start_server(self.handler)
+        self.pool = make_pool(self.controller.port)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    def tearDown(self):
+        self.controller.stop()
+
+    async def test_reuses_connection(self):
+        self.assertEqual(await self.pool.send_many([message('a@example.com'), message('b@example.com')]), [])
+        await self.pool.send(message('c@example.com'))
+        self.assertEqual(self.handler.recipients, ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertEqual(self.handler.connections, 1)
+
+    async def test_refused_message_does_not_stop_batch(self):
+        batch = [message('a@example.com'), message('refused@example.com'), message('b@example.com')]
+        failures = await self.pool.send_many(batch)
+        self.assertEqual([failure.message['To'] for failure in failures], ['refused@example.com'])
+        self.assertTrue(failures[0].permanent)
+        self.assertEqual(self.handler.recipients, ['a@example.com', 'b@example.com'])
+
+        # The connection survives the refusal.
+        await self.pool.send(message('c@example.com'))
+        self.assertEqual(self.handler.connections, 1)
+
+    async def test_send_raises_on_failure(self):
+        with self.assertRaises(aiosmtplib.SMTPRecipientsRefused):
+            await self.pool.send(message('refused@example.com'))
+
+
+class UnreachableServerTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_all_messages_reported(self):
+        pool = make_pool(free_port())
+        failures = await pool.send_many([message('a@example.com'), message('b@example.com')])
+        self.assertEqual(len(failures), 2)
+        self.assertFalse(any(failure.permanent for failure in failures))
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import unittest
+from unittest import mock
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+import backfill_contacts
+from src.conf.config import BASE_DIR, config
+from src.database.db import DataBaseSessionManager
+
+# These run the real migrations, which need Postgres: point TEST_POSTGRES_URL
+# (postgresql+asyncpg://...) at a scratch database. Its public schema is dropped.
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+
+def migrate(revision: str, direction: str = 'upgrade') -> None:
+    alembic_config = Config()
+    alembic_config.set_main_option('script_location', str(BASE_DIR / 'migrations'))
+    with mock.patch.object(config, 'DB_URL', POSTGRES_URL):
+        getattr(command, direction)(alembic_config, revision)
+
+
+def sql(statement: str, params: dict | None = None) -> list:
+    async def run():
+        engine = create_async_engine(POSTGRES_URL, poolclass=NullPool)
+        try:
+            async with engine.begin() as conn:
+                result = await conn.execute(text(statement), params or {})
+                return result.all() if result.returns_rows else []
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def run_backfill(batch_size: int) -> bool:
+    async def run():
+        manager = DataBaseSessionManager(POSTGRES_URL)
+        try:
+            with mock.patch.object(backfill_contacts, 'sessionmanager', manager):
+                await backfill_contacts.backfill(batch_size, pause=0)
+                return await backfill_contacts.verify()
+        finally:
+            await manager._engine.dispose()
+    return asyncio.run(run())
+
+
+def add_contact(first_name: str, user_id: int | None) -> int:
+    return sql("""
+        INSERT INTO contacts (first_name, last_name, email, phone, birthday, description, user_id)
+        VALUES (:first_name, 'Lee', 'lee@example.com', '0501234567', '1990-03-10', '', :user_id) RETURNING id
+    """, {'first_name': first_name, 'user_id': user_id})[0].id
+
+
+@unittest.skipUnless(POSTGRES_URL, 'TEST_POSTGRES_URL is not set')
+class PartitionedContactsMigrationTests(unittest.TestCase):
+
+    def setUp(self):
+        sql('DROP SCHEMA public CASCADE')
+        sql('CREATE SCHEMA public')
+        migrate('8e41f6c3a907')
+        for user_id in (1, 2):
+            sql("""INSERT INTO users (id, username, email, password, created_at, updated_at)
+                   VALUES (:id, :name, :email, 'x', current_date, current_date)""",
+                {'id': user_id, 'name': f'user{user_id}', 'email': f'user{user_id}@example.com'})
+
+    def partitioned(self) -> list[tuple]:
+        return [tuple(row) for row in sql('SELECT id, user_id, first_name FROM contacts_p ORDER BY id')]
+
+    def test_empty_table_swaps_without_backfill(self):
+        migrate('head')
+        self.assertEqual(sql("SELECT relkind::text FROM pg_class WHERE relname = 'contacts'")[0].relkind, 'p')
+
+    def test_trigger_keeps_partitioned_table_in_sync(self):
+        kept, moved, deleted = add_contact('Kept', 1), add_contact('Moved', 1), add_contact('Deleted', 2)
+        migrate('b7d2e19a4c6f')
+        self.assertIsNone(sql('SELECT completed_at FROM contacts_backfill')[0].completed_at)
+
+        added = add_contact('Added', 2)
+        sql("UPDATE contacts SET first_name = 'Renamed' WHERE id = :id", {'id': kept})
+        sql('UPDATE contacts SET user_id = 2 WHERE id = :id', {'id': moved})
+        sql('DELETE FROM contacts WHERE id = :id', {'id': deleted})
+        # Rows written since step 1 are copied; older untouched rows wait for the backfill.
+        self.assertEqual(self.partitioned(), [(kept, 1, 'Renamed'), (moved, 2, 'Moved'), (added, 2, 'Added')])
+
+    def test_swap_waits_for_backfill(self):
+        ids = [add_contact(f'Contact{index}', 1 + index % 2) for index in range(5)]
+        orphan = add_contact('Orphan', None)
+        migrate('b7d2e19a4c6f')
+
+        with self.assertRaisesRegex(RuntimeError, 'backfill is not finished'):
+            migrate('c3a8f5d1e072')
+        self.assertEqual(sql("SELECT relkind::text FROM pg_class WHERE relname = 'contacts'")[0].relkind, 'r')
+
+        self.assertTrue(run_backfill(batch_size=2))
+        self.assertTrue(run_backfill(batch_size=2))  # finished runs can be repeated
+        with self.assertLogs('alembic.runtime.migration', logging.WARNING) as logs:
+            migrate('c3a8f5d1e072')
+        self.assertIn('1 contacts without a user', logs.output[0])
+
+        self.assertEqual([row.id for row in sql('SELECT id FROM contacts ORDER BY id')], ids)
+        self.assertEqual(len(sql('SELECT 1 FROM contacts_old WHERE id = :id', {'id': orphan})), 1)
+        new_id = add_contact('New', 1)
+        self.assertGreater(new_id, orphan)
+
+        migrate('b7d2e19a4c6f', 'downgrade')
+        self.assertEqual(sql("SELECT relkind::text FROM pg_class WHERE relname = 'contacts'")[0].relkind, 'r')
+        self.assertEqual([row.id for row in sql('SELECT id FROM contacts ORDER BY id')], ids + [orphan, new_id])
+        migrate('head')
+
+    def blocking_key_indexes(self) -> list[tuple]:
+        return [tuple(row) for row in sql("""
+            SELECT c.relname, i.indisvalid, count(inh.inhrelid) AS partitions FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid LEFT JOIN pg_inherits inh ON inh.inhparent = c.oid
+            WHERE c.relname LIKE 'ix_contacts_user_id_%_key' GROUP BY c.relname, i.indisvalid ORDER BY c.relname
+        """)]
+
+    def test_blocking_key_indexes_are_built_per_partition(self):
+        migrate('c3a8f5d1e072')
+        add_contact('Ann', 1)
+        migrate('d9f4b2a6e815')
+        built = [('ix_contacts_user_id_email_key', True, 16), ('ix_contacts_user_id_name_key', True, 16),
+                 ('ix_contacts_user_id_phone_key', True, 16)]
+        self.assertEqual(self.blocking_key_indexes(), built)
+
+        # An upgrade stopped half way: one index is missing, a partition's build failed.
+        migrate('c3a8f5d1e072', 'stamp')
+        sql('DROP INDEX ix_contacts_user_id_phone_key')
+        sql('CREATE INDEX ix_contacts_03_user_id_phone_key ON contacts_03 (user_id, phone_key)')
+        sql("UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'ix_contacts_03_user_id_phone_key'::regclass")
+        migrate('d9f4b2a6e815')
+        self.assertEqual(self.blocking_key_indexes(), built)
+
+        migrate('c3a8f5d1e072', 'downgrade')
+        self.assertEqual(sql("SELECT relname FROM pg_class WHERE relname LIKE 'ix_contacts_%_key'"), [])
@@ -0,0 +1,106 @@
+import asyncio
+import pickle
+import unittest
+from unittest import mock
+
+import fakeredis
+
+from src.services.single_flight import CachedLoader, SingleFlight
+
+
+class CountingLoader:
+    # Holds every load until the gate opens, so concurrent callers overlap.
+
+    def __init__(self, value='value'):
+        self.value = value
+        self.calls = 0
+        self.gate = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.gate.wait()
+        return self.value
+
+
+class SingleFlightTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_load_once(self):
+        flight, loader = SingleFlight(), CountingLoader()
+        calls = [asyncio.create_task(flight.do('key', loader)) for _ in range(10)]
+        await asyncio.sleep(0)
+        loader.gate.set()
+        results = await asyncio.gather(*calls)
+        self.assertEqual(loader.calls, 1)
+        self.assertEqual({value for value, _ in results}, {'value'})
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 9)
+
+    async def test_error_reaches_every_caller(self):
+        flight = SingleFlight()
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise ValueError('boom')
+
+        calls = [asyncio.create_task(flight.do('key', failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_follower_takes_over_from_cancelled_leader(self):
+        flight, loader = SingleFlight(), CountingLoader()
+        leader = asyncio.create_task(flight.do('key', loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do('key', loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        loader.gate.set()
+        self.assertEqual(await follower, ('value', False))
+        self.assertEqual(loader.calls, 2)
+
+
+class CachedLoaderTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+        self.cache = CachedLoader(self.redis, 'test', ttl=60, beta=1.0, use_lock=True)
+
+    async def test_concurrent_misses_load_once(self):
+        loader = CountingLoader()
+        calls = [asyncio.create_task(self.cache.get('key', loader)) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        loader.gate.set()
+        self.assertEqual(set(await asyncio.gather(*calls)), {'value'})
+        self.assertEqual(loader.calls, 1)
+
+        self.assertEqual(await self.cache.get('key', loader), 'value')
+        self.assertEqual(loader.calls, 1)
+
+    async def test_early_refresh_near_expiry(self):
+        loader = CountingLoader('old')
+        loader.gate.set()
+        await self.cache.get('key', loader)
+        raw, _, expiry = await self.cache._read('key')
+        # An entry that took 1s to load: a draw below e**-60 moves the check more than 60s ahead, past the expiry.
+        await self.redis.set('test:key', pickle.dumps((raw, 1.0, expiry)))
+
+        loader.value = 'new'
+        with mock.patch('random.random', return_value=0.9):
+            self.assertEqual(await self.cache.get('key', loader), 'old')
+        self.assertEqual(loader.calls, 1)
+        with mock.patch('random.random', return_value=1e-30):
+            self.assertEqual(await self.cache.get('key', loader), 'new')
+        self.assertEqual(loader.calls, 2)
+
+    async def test_stale_value_while_another_process_refreshes(self):
+        loader = CountingLoader('old')
+        loader.gate.set()
+        await self.cache.get('key', loader)
+
+        await self.redis.set('test:key:lock', 'other-process', ex=5)
+        loader.value = 'new'
+        with mock.patch.object(self.cache, '_should_refresh', return_value=True):
+            self.assertEqual(await self.cache.get('key', loader), 'old')
+        self.assertEqual(loader.calls, 1)
@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+from sqlalchemy import select
+
+from src.conf.config import BASE_DIR, config
+from src.database.db import sessionmanager
+from src.entity.models import User
+from src.services import avatar
+from src.services.avatar import AvatarService, make_thumbnail
+from src.services.storage import LocalStorage, get_storage
+from tests.api import create_user, reset_database
+
+
+def image_bytes(size: tuple[int, int], format: str = 'PNG') -> bytes:
+    out = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(out, format=format)
+    return out.getvalue()
+
+
+class LocalStorageTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = LocalStorage(self.directory.name, '/media/')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    async def test_save_and_read(self):
+        url = await self.storage.save('hw_13/ann@example.com', io.BytesIO(b'first'))
+        self.assertRegex(url, r'^/media/hw_13/ann@example.com\?v=\d+$')
+        await self.storage.save('hw_13/ann@example.com', io.BytesIO(b'second'))
+        self.assertEqual(await self.storage.read('hw_13/ann@example.com'), b'second')
+        # Written through a temporary file that is renamed into place.
+        self.assertEqual(os.listdir(Path(self.directory.name) / 'hw_13'), ['ann@example.com'])
+
+    async def test_key_cannot_escape_the_directory(self):
+        with self.assertRaises(ValueError):
+            await self.storage.save('../outside', io.BytesIO(b'data'))
+
+    def test_relative_directory_is_resolved_against_the_project(self):
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            with mock.patch.multiple(config, AVATAR_STORAGE='local', AVATAR_LOCAL_DIR='media'):
+                storage = get_storage()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(storage.base_dir, BASE_DIR / 'media')
+
+
+class ThumbnailTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await reset_database()
+        await create_user('ann@example.com')
+        self.directory = tempfile.TemporaryDirectory()
+        self.service = AvatarService(LocalStorage(self.directory.name, '/media/'), size=64)
+
+    async def asyncTearDown(self):
+        avatar.get_pool().shutdown()
+        avatar._pool = None
+        self.directory.cleanup()
+        await sessionmanager._engine.dispose()
+
+    def test_make_thumbnail_crops_to_a_square_jpeg(self):
+        with Image.open(io.BytesIO(make_thumbnail(image_bytes((300, 120)), 64))) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('JPEG', (64, 64)))
+
+    async def test_create_thumbnail_stores_it_and_updates_the_user(self):
+        await self.service.upload('ann@example.com', io.BytesIO(image_bytes((400, 300))))
+        url = await self.service.create_thumbnail('ann@example.com')
+
+        self.assertTrue(url.startswith('/media/hw_13/ann@example.com_64x64?v='))
+        stored = Path(self.directory.name) / 'hw_13' / 'ann@example.com_64x64'
+        with Image.open(stored) as thumbnail:
+            self.assertEqual(thumbnail.size, (64, 64))
+        async with sessionmanager.session() as db:
+            user = (await db.execute(select(User).filter_by(email='ann@example.com'))).scalar_one()
+        self.assertEqual(user.avatar, url)
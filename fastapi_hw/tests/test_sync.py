@@ -0,0 +1,109 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+
+from src.database.db import sessionmanager
+from src.entity.models import Contact, ContactTombstone
+from src.repository.contacts import sync_horizon
+from src.services.sync import Cursor, SyncToken, decode_sync_token, encode_sync_token
+from tests.api import client, create_user, reset_database
+
+
+class SyncTokenTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        token = SyncToken(contacts=Cursor(datetime(2026, 10, 19, 12, 30, 5, 120000, timezone.utc), 42),
+                          tombstones=Cursor(datetime(2026, 10, 18, tzinfo=timezone.utc), 7))
+        self.assertEqual(decode_sync_token(encode_sync_token(token)), token)
+        self.assertEqual(decode_sync_token(encode_sync_token(SyncToken())), SyncToken())
+
+    def test_invalid_token(self):
+        for value in ('garbage', encode_sync_token(SyncToken())[:-4], 'eyJjIjpbXX0='):
+            with self.assertRaises(ValueError):
+                decode_sync_token(value)
+
+    def test_horizon_uses_the_database_clock(self):
+        stmt = select(Contact.id).filter(Contact.updated_at < sync_horizon(2))
+        self.assertIn('now() - make_interval(secs =>', str(stmt.compile(dialect=postgresql.dialect())))
+
+
+class ContactChangesTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        await reset_database()
+        _, self.headers = await create_user('sync@example.com')
+        self.start = datetime.now(timezone.utc) - timedelta(minutes=10)
+
+    async def asyncTearDown(self):
+        await sessionmanager._engine.dispose()
+
+    async def add(self, name: str, minutes: int) -> int:
+        async with client() as api:
+            response = await api.post('/contacts/', headers=self.headers, json={
+                'first_name': name, 'last_name': 'Lee', 'email': f'{name.lower()}@example.com', 'phone': '0501234567',
+                'birthday': '1990-03-10', 'description': 'A friend'})
+        contact_id = response.json()['id']
+        async with sessionmanager.session() as db:
+            await db.execute(update(Contact).filter_by(id=contact_id)
+                             .values(updated_at=self.start + timedelta(minutes=minutes)))
+            await db.commit()
+        return contact_id
+
+    async def changes(self, since: str | None = None, limit: int = 500) -> dict:
+        params = {'limit': limit} | ({'since': since} if since else {})
+        async with client() as api:
+            response = await api.get('/contacts/changes', params=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_pages_follow_the_token(self):
+        ids = [await self.add(name, minutes) for name, minutes in (('Ann', 3), ('Bob', 1), ('Cid', 2), ('Dan', 5))]
+        # Bob, Cid, Ann, Dan by time.
+        expected = [ids[1], ids[2], ids[0], ids[3]]
+
+        pages, since = [], None
+        while True:
+            page = await self.changes(since, limit=3)
+            pages.append(([contact['id'] for contact in page['updated']], page['has_more']))
+            since = page['next_token']
+            if not page['has_more']:
+                break
+        self.assertEqual(pages, [(expected[:3], True), (expected[3:], False)])
+        self.assertEqual((await self.changes(since))['updated'], [])
+
+    async def test_deletes_come_back_as_tombstones(self):
+        kept, deleted = await self.add('Ann', 1), await self.add('Bob', 2)
+        since = (await self.changes())['next_token']
+        async with client() as api:
+            self.assertEqual((await api.delete(f'/contacts/{deleted}', headers=self.headers)).status_code, 204)
+        async with sessionmanager.session() as db:
+            await db.execute(update(ContactTombstone).values(deleted_at=self.start + timedelta(minutes=3)))
+            await db.commit()
+
+        page = await self.changes(since)
+        self.assertEqual((page['updated'], page['deleted']), ([], [deleted]))
+        self.assertEqual((await self.changes(page['next_token']))['deleted'], [])
+        self.assertEqual([contact['id'] for contact in (await self.changes())['updated']], [kept])
+
+    async def test_recent_changes_wait_for_the_safety_window(self):
+        await self.add('Ann', 1)
+        async with client() as api:
+            await api.post('/contacts/', headers=self.headers, json={
+                'first_name': 'Bob', 'last_name': 'Lee', 'email': 'bob@example.com', 'phone': '0501234567',
+                'birthday': '1990-03-10', 'description': 'A friend'})
+        page = await self.changes()
+        self.assertEqual([contact['first_name'] for contact in page['updated']], ['Ann'])
+        # The cursor stays before Bob, so the next sync picks him up once he is old enough.
+        async with sessionmanager.session() as db:
+            await db.execute(update(Contact).filter_by(first_name='Bob')
+                             .values(updated_at=self.start + timedelta(minutes=2)))
+            await db.commit()
+        self.assertEqual([contact['first_name'] for contact in (await self.changes(page['next_token']))['updated']],
+                         ['Bob'])
+
+    async def test_invalid_token_is_rejected(self):
+        async with client() as api:
+            response = await api.get('/contacts/changes', params={'since': 'garbage'}, headers=self.headers)
+        self.assertEqual((response.status_code, response.json()['detail']), (400, 'Invalid sync token'))
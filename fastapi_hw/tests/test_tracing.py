@@ -0,0 +1,128 @@
+import threading
+import unittest
+from unittest import mock
+
+import httpx
+
+from src.middleware.tracing import TracingMiddleware
+from src.services.jobs import InMemoryQueue, Worker, handlers, register_job
+from src.services.tracing import BatchProcessor, Span, SpanExporter, Tracer, current_span
+
+REMOTE_TRACE = '0af7651916cd43dd8448eb211c80319c'
+REMOTE_PARENT = 'b7ad6b7169203331'
+
+
+class MemoryExporter(SpanExporter):
+    # Holds an export until `release` is set, to back the processor up.
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.exporting = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def export(self, spans: list[Span]) -> None:
+        self.exporting.set()
+        self.release.wait(5)
+        self.spans.extend(spans)
+
+
+class TracingTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def use_tracer(self, sample_rate: float = 1.0) -> None:
+        self.exporter = MemoryExporter()
+        self.processor = BatchProcessor(self.exporter, flush_interval=0.01)
+        self.tracer = Tracer(self.processor, sample_rate)
+        for module in ('src.middleware.tracing', 'src.services.jobs'):
+            patcher = mock.patch(f'{module}.tracer', self.tracer)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def exported(self) -> dict[str, Span]:
+        self.processor.shutdown()
+        return {span.name: span for span in self.exporter.spans}
+
+
+class MiddlewareTests(TracingTestCase):
+
+    def client(self) -> httpx.AsyncClient:
+        async def app(scope, receive, send):
+            with self.tracer.span('db.query', 'client', child_only=True):
+                pass
+            await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=TracingMiddleware(app)), base_url='http://test')
+
+    async def test_request_span_is_the_parent(self):
+        self.use_tracer()
+        async with self.client() as client:
+            response = await client.get('/contacts/')
+        spans = self.exported()
+        request, query = spans['HTTP GET'], spans['db.query']
+        self.assertIsNone(request.parent_id)
+        self.assertEqual((query.trace_id, query.parent_id), (request.trace_id, request.span_id))
+        self.assertEqual((request.kind, request.attributes['http.status_code']), ('server', 204))
+        self.assertEqual(response.headers['traceparent'], request.traceparent)
+
+    async def test_incoming_traceparent_is_continued(self):
+        self.use_tracer(sample_rate=0.0)
+        async with self.client() as client:
+            await client.get('/contacts/', headers={'traceparent': f'00-{REMOTE_TRACE}-{REMOTE_PARENT}-01'})
+        request = self.exported()['HTTP GET']
+        # The caller sampled the trace, so it is kept whatever the local rate.
+        self.assertEqual((request.trace_id, request.parent_id), (REMOTE_TRACE, REMOTE_PARENT))
+
+    async def test_unsampled_requests_are_not_exported(self):
+        self.use_tracer(sample_rate=0.0)
+        async with self.client() as client:
+            responses = [await client.get('/contacts/') for _ in range(20)]
+            responses.append(await client.get('/contacts/', headers={
+                'traceparent': f'00-{REMOTE_TRACE}-{REMOTE_PARENT}-00'}))
+        self.assertEqual(self.exported(), {})
+        self.assertFalse(any('traceparent' in response.headers for response in responses))
+
+
+class JobTraceTests(TracingTestCase):
+
+    async def test_job_joins_the_trace_that_enqueued_it(self):
+        self.use_tracer()
+        queue = InMemoryQueue()
+        register_job('traced', self.handle)
+        self.addCleanup(handlers.pop, 'traced')
+
+        with self.tracer.span('HTTP POST', 'server') as request:
+            await queue.enqueue('traced', {})
+        self.assertIsNone(current_span.get())
+        [job] = await queue.reserve('consumer', count=1, block_ms=10)
+        await Worker(queue).execute(job)
+
+        spans = self.exported()
+        consumer, mail = spans['job traced'], spans['smtp.send']
+        self.assertEqual((consumer.kind, consumer.trace_id, consumer.parent_id),
+                         ('consumer', request.trace_id, request.span_id))
+        self.assertEqual((mail.trace_id, mail.parent_id), (request.trace_id, consumer.span_id))
+
+    async def handle(self):
+        with self.tracer.span('smtp.send', 'client', child_only=True):
+            pass
+
+
+class BatchProcessorTests(unittest.TestCase):
+
+    def test_spans_are_dropped_when_the_queue_is_full(self):
+        exporter = MemoryExporter()
+        exporter.release.clear()
+        processor = BatchProcessor(exporter, max_queue=2, batch_size=1, flush_interval=0.01)
+        spans = [Span('0' * 32, f'{index:016x}', f'span {index}', end_ns=1) for index in range(5)]
+
+        processor.on_end(spans[0])
+        self.assertTrue(exporter.exporting.wait(5))
+        # The exporter is stuck on the first span: two more fit in the queue.
+        for span in spans[1:]:
+            processor.on_end(span)
+        self.assertEqual(processor.dropped, 2)
+
+        exporter.release.set()
+        processor.shutdown()
+        self.assertEqual([span.name for span in exporter.spans], ['span 0', 'span 1', 'span 2'])
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from src.conf.config import config
+from src.conf.logging_config import setup_logging
+from src.database.db import sessionmanager
+from src.database.redis import redis_client
+from src.services.jobs import Worker, job_queue
+from src.services.tracing import instrument_redis, instrument_sqlalchemy, tracer
+import src.services.tasks  # noqa
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run(concurrency: int):
+    if tracer.enabled:
+        instrument_sqlalchemy(sessionmanager._engine.sync_engine)
+        instrument_redis(redis_client)
+    worker = Worker(job_queue, concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+def run_process(concurrency: int):
+    setup_logging()
+    asyncio.run(run(concurrency))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run background job workers')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=config.JOBS_CONCURRENCY)
+    args = parser.parse_args()
+    setup_logging()
+
+    if config.JOBS_BACKEND == 'memory':
+        logger.warning("JOBS_BACKEND is 'memory': jobs enqueued by the API are not visible to this process")
+
+    if args.processes == 1:
+        run_process(args.concurrency)
+    else:
+        processes = [multiprocessing.Process(target=run_process, args=(args.concurrency,))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()